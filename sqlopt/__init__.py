@@ -0,0 +1 @@
+"""Support modules for the SQL Optimizer Suite Streamlit app."""
@@ -0,0 +1,290 @@
+"""Claude-powered analysis helpers used by the tool pages.
+
+Each helper builds its prompt and sends it through the shared core, so
+caching, rate limiting and fallbacks behave the same on every page.
+"""
+import os
+
+from sqlopt.antipatterns import describe_findings
+from sqlopt.core import (AI_CONCURRENCY, SEMANTIC_THRESHOLD, call_claude_api, get_semantic_cache,
+                         run_claude_batch)
+from sqlopt.fingerprint import aggregate
+from sqlopt.prompts import build_performance_prompt
+
+def ai_natural_language_to_sql(client, nl_query, schema_info):
+    """Convert natural language to SQL using Claude"""
+    prompt = f"""You are an expert SQL developer. Convert this natural language query to optimized SQL.
+
+DATABASE SCHEMA:
+{schema_info}
+
+NATURAL LANGUAGE QUERY:
+{nl_query}
+
+Please provide:
+1. An optimized SQL query
+2. Brief explanation of the optimization choices
+3. Any assumptions made about the data
+
+Format your response as:
+**SQL Query:**
+```sql
+[Your SQL here]
+```
+
+**Explanation:**
+[Your explanation here]
+
+**Optimizations Applied:**
+- [Optimization 1]
+- [Optimization 2]
+- etc.
+"""
+    
+    return call_claude_api(client, prompt, max_tokens=1500)
+
+def ai_natural_language_to_sql_cached(client, nl_query, schema_info, threshold=SEMANTIC_THRESHOLD):
+    """Answer from the semantic cache when a near-duplicate question was seen, else ask Claude
+
+    Returns the response and the cache match (None when Claude was called).
+    """
+    semantic_cache = get_semantic_cache()
+    match = semantic_cache.lookup(schema_info, nl_query, threshold)
+    if match:
+        return match["answer"], match
+    
+    response = ai_natural_language_to_sql(client, nl_query, schema_info)
+    if not response.startswith("❌"):
+        semantic_cache.add(schema_info, nl_query, response)
+    return response, None
+
+def ai_analyze_query_performance(client, sql_query, stream=False):
+    """Analyze SQL query performance using Claude"""
+    return call_claude_api(client, build_performance_prompt(sql_query), max_tokens=2500,
+                           stream=stream, label="Performance Analysis")
+
+def ai_analyze_queries_batch(client, sql_queries, concurrency=AI_CONCURRENCY):
+    """Analyze many SQL queries concurrently using Claude"""
+    prompts = [build_performance_prompt(sql_query) for sql_query in sql_queries]
+    return run_claude_batch(client, prompts, max_tokens=2500, concurrency=concurrency)
+
+def ai_explain_execution_plan(client, execution_plan, database_engine="PostgreSQL", stream=False):
+    """Explain execution plan using Claude"""
+    prompt = f"""You are a database expert. Explain this {database_engine} execution plan in plain English that a developer can understand.
+
+EXECUTION PLAN:
+{execution_plan}
+
+Please provide:
+1. **Overall Strategy:** High-level description of what the database is doing
+
+2. **Step-by-Step Breakdown:**
+   - Explain each operation in the plan
+   - Identify the sequence of operations
+   - Highlight cost and performance implications
+
+3. **Performance Analysis:**
+   - Identify expensive operations
+   - Point out potential bottlenecks
+   - Explain cost estimates
+
+4. **Optimization Suggestions:**
+   - What indexes might help
+   - Alternative query approaches
+   - Configuration improvements
+
+Make the explanation accessible to developers who aren't database experts.
+"""
+    
+    return call_claude_api(client, prompt, max_tokens=2000, stream=stream, label="Plan Explanation")
+
+def describe_rule_findings(findings):
+    """Prompt block listing what the local rule checker already found, so Claude skips it"""
+    if not findings:
+        return ""
+    return f"""
+ALREADY FOUND BY LOCAL RULE CHECKS (shown to the developer separately; do not repeat them):
+{describe_findings(findings)}
+Focus on what these rules cannot decide: logic errors, data integrity, other security risks, and
+performance problems that need schema or workload context.
+"""
+
+def build_review_prompt(sql_code, code_type="Query", findings=None):
+    """Build the code review prompt for one piece of SQL code"""
+    return f"""You are a senior database developer reviewing this {code_type} for code quality, security, and performance.
+
+SQL CODE:
+```sql
+{sql_code}
+```
+{describe_rule_findings(findings)}
+Please provide a comprehensive review covering:
+
+1. **🚨 CRITICAL ISSUES:**
+   - Security vulnerabilities (SQL injection, etc.)
+   - Major performance problems
+   - Data integrity risks
+
+2. **⚠️ WARNINGS:**
+   - Performance concerns
+   - Maintainability issues
+   - Best practice violations
+
+3. **💡 SUGGESTIONS:**
+   - Code improvements
+   - Optimization opportunities
+   - Style and readability
+
+4. **✨ IMPROVED VERSION:**
+   - Provide a corrected/optimized version
+   - Explain the key changes made
+
+5. **📊 QUALITY SCORE:**
+   - Overall rating (1-10)
+   - Breakdown by category (Security, Performance, Maintainability)
+
+Be specific about issues and provide actionable recommendations.
+"""
+
+def ai_review_sql_code(client, sql_code, code_type="Query", stream=False, findings=None):
+    """Review SQL code using Claude"""
+    return call_claude_api(client, build_review_prompt(sql_code, code_type, findings), max_tokens=3000,
+                           stream=stream, label="Code Review")
+
+def ai_review_sql_code_batch(client, sql_codes, code_type="Query", concurrency=AI_CONCURRENCY, findings=None):
+    """Review many pieces of SQL code concurrently using Claude"""
+    findings = findings or [None] * len(sql_codes)
+    prompts = [build_review_prompt(sql_code, code_type, file_findings)
+               for sql_code, file_findings in zip(sql_codes, findings)]
+    return run_claude_batch(client, prompts, max_tokens=3000, concurrency=concurrency)
+
+# Map-reduce analysis for inputs larger than one prompt
+CHUNK_TOKEN_BUDGET = int(os.getenv("SQLOPT_CHUNK_TOKENS", "6000"))
+
+def describe_chunk(chunk, index, total):
+    """Header telling Claude where a chunk sits in the full input"""
+    header = f"PART {index} OF {total} (lines {chunk.start_line}-{chunk.end_line})"
+    if chunk.context:
+        header += f"\nPARENT OPERATORS: {chunk.context}"
+    return header
+
+def ai_review_sql_code_chunked(client, chunks, code_type="Query", stream=False, concurrency=AI_CONCURRENCY,
+                               findings=None):
+    """Review chunks of a large SQL script concurrently, then merge them into one review"""
+    findings = findings or []
+    map_prompts = [f"""You are a senior database developer reviewing one part of a larger {code_type}.
+
+{describe_chunk(chunk, i, len(chunks))}
+
+SQL CODE:
+```sql
+{chunk.text}
+```
+{describe_rule_findings([f for f in findings if chunk.start_line <= f.line <= chunk.end_line])}
+List only what you find in this part, citing line numbers from the full script:
+- 🚨 Critical issues (security, major performance, data integrity)
+- ⚠️ Warnings (performance, maintainability, best practices)
+- 💡 Suggestions
+Be concise; another reviewer will merge your notes with the other parts.
+""" for i, chunk in enumerate(chunks, 1)]
+    partial_reviews = run_claude_batch(client, map_prompts, max_tokens=1200, concurrency=concurrency)
+    
+    merge_prompt = f"""You are a senior database developer. The {code_type} below was too large to review at once,
+so it was split into {len(chunks)} parts that were reviewed separately. Merge these partial reviews into one review.
+
+{chr(10).join(f"--- REVIEW OF PART {i} ---{chr(10)}{review}" for i, review in enumerate(partial_reviews, 1))}
+
+Deduplicate findings that repeat across parts and provide a comprehensive review covering:
+
+1. **🚨 CRITICAL ISSUES**
+2. **⚠️ WARNINGS**
+3. **💡 SUGGESTIONS**
+4. **✨ IMPROVED VERSION:** corrected versions of the affected fragments only
+5. **📊 QUALITY SCORE:** overall rating (1-10) with a breakdown by Security, Performance, Maintainability
+
+Keep the original line numbers so developers can find each issue.
+"""
+    return call_claude_api(client, merge_prompt, max_tokens=3000, stream=stream, label="Code Review (merged)")
+
+def ai_explain_execution_plan_chunked(client, chunks, database_engine="PostgreSQL", stream=False,
+                                      concurrency=AI_CONCURRENCY):
+    """Explain subtrees of a large execution plan concurrently, then merge them into one explanation"""
+    map_prompts = [f"""You are a database expert. Explain one fragment of a large {database_engine} execution plan.
+
+{describe_chunk(chunk, i, len(chunks))}
+
+PLAN FRAGMENT:
+{chunk.text}
+
+Summarize what these operators do, their costs and row estimates, and any expensive or suspicious
+operations (sequential scans, bad estimates, large sorts or hashes). Be concise; another expert will
+merge your notes with the other fragments.
+""" for i, chunk in enumerate(chunks, 1)]
+    partial_explanations = run_claude_batch(client, map_prompts, max_tokens=1000, concurrency=concurrency)
+    
+    merge_prompt = f"""You are a database expert. A {database_engine} execution plan was too large to explain at once,
+so it was split into {len(chunks)} subtree fragments that were explained separately. Merge these notes into
+one explanation that a developer can understand.
+
+{chr(10).join(f"--- FRAGMENT {i} ---{chr(10)}{note}" for i, note in enumerate(partial_explanations, 1))}
+
+Please provide:
+1. **Overall Strategy:** High-level description of what the database is doing
+2. **Step-by-Step Breakdown:** The main operations in execution order
+3. **Performance Analysis:** The most expensive operations and bottlenecks across the whole plan
+4. **Optimization Suggestions:** Indexes, query rewrites and configuration changes
+"""
+    return call_claude_api(client, merge_prompt, max_tokens=2000, stream=stream, label="Plan Explanation (merged)")
+
+INDEX_ADVISOR_MAX_TEMPLATES = 50
+
+def describe_workload(queries_list, max_templates=INDEX_ADVISOR_MAX_TEMPLATES):
+    """Workload as weighted templates, heaviest first, for the index advisor prompt"""
+    templates = aggregate(q for q in queries_list if q.strip())
+    total = sum(t.calls for t in templates) or 1
+    lines = [f"Template {i} (executed {t.calls} times, {t.calls / total:.0%} of workload): {t.template}"
+             for i, t in enumerate(templates[:max_templates], 1)]
+    if len(templates) > max_templates:
+        rest = templates[max_templates:]
+        lines.append(f"... plus {len(rest)} rarer templates covering {sum(t.calls for t in rest)} executions")
+    return "\n".join(lines)
+
+def ai_generate_index_recommendations(client, queries_list, current_indexes=""):
+    """Generate index recommendations using Claude"""
+    prompt = f"""You are a database optimization expert. Analyze these SQL queries and provide index recommendations.
+
+CURRENT INDEXES:
+{current_indexes if current_indexes else "None provided"}
+
+QUERY WORKLOAD (statements grouped into templates, literals replaced by ?):
+{describe_workload(queries_list)}
+
+Please provide:
+
+1. **📊 WORKLOAD ANALYSIS:**
+   - Common patterns in the queries
+   - Frequently accessed columns, weighted by how often each template runs
+   - Join patterns and WHERE clause analysis
+
+2. **📈 HIGH PRIORITY INDEXES:**
+   - Most impactful indexes to create
+   - Expected performance improvement
+   - Rationale for each recommendation
+
+3. **📋 MEDIUM PRIORITY INDEXES:**
+   - Additional beneficial indexes
+   - Situational improvements
+
+4. **🗑️ INDEXES TO CONSIDER REMOVING:**
+   - Unused or redundant indexes
+   - Maintenance overhead reduction
+
+5. **📝 IMPLEMENTATION SCRIPT:**
+   ```sql
+   -- Provide CREATE INDEX statements
+   ```
+
+Focus on indexes that will have the biggest impact on query performance.
+"""
+    
+    return call_claude_api(client, prompt, max_tokens=2500)
@@ -0,0 +1,241 @@
+"""Alert rules for the Regression Detector, evaluated for every series at once.
+
+The Configuration tab's thresholds, plus optional per-query overrides, are
+compiled into a ``rules × series`` array (``compile_thresholds``). On each
+monitor check, the latest window of every series is reduced to one value
+per rule, and ``AlertEngine.tick`` compares the whole array in one
+vectorized step. The rules are:
+
+- ``response``: mean latency in ms
+- ``regression``: percent above the EWMA baseline
+- ``error_rate``: percent of calls that failed
+
+To keep alerts from flapping:
+
+- an alert fires after ``FIRE_AFTER`` consecutive breaching checks;
+- it clears only once the value drops ``HYSTERESIS`` below its threshold;
+- a firing alert is repeated at most every ``RENOTIFY_S`` seconds.
+
+``coalesce`` turns one check's new alerts into notifications, one per
+probable root cause: alerts of the same rule whose regressions started in
+the same hour, or which began in the same check, are reported together.
+``send_notifications`` hands them to the email and Slack settings and
+appends them to ``alerts.jsonl`` for the dashboard.
+"""
+import json
+import os
+import smtplib
+import time
+import urllib.request
+from collections import deque, namedtuple
+from email.message import EmailMessage
+
+import numpy as np
+
+RULES = ("response", "regression", "error_rate")
+# Rule -> (configuration key, unit, description)
+RULE_SETTINGS = {
+    "response": ("response_threshold_ms", "ms", "slow responses"),
+    "regression": ("regression_threshold_pct", "%", "latency regressions"),
+    "error_rate": ("error_threshold_pct", "%", "high error rates"),
+}
+ALERT_WINDOW_S = 600
+MIN_CALLS = 20
+FIRE_AFTER = 2
+HYSTERESIS = 0.1
+RENOTIFY_S = 4 * 3600
+ALERTS_FILE = "alerts.jsonl"
+ALERTS_KEPT = 1000
+
+SMTP_HOST = os.getenv("SQLOPT_SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SQLOPT_SMTP_PORT", "25"))
+SMTP_FROM = os.getenv("SQLOPT_SMTP_FROM", "sqlopt@localhost")
+SLACK_WEBHOOK_URL = os.getenv("SQLOPT_SLACK_WEBHOOK_URL", "")
+
+# Index arrays into the rules × series state: (rule rows, series columns)
+AlertEvents = namedtuple("AlertEvents", ["fired", "resolved", "repeated"])
+
+
+def compile_thresholds(config, series):
+    """rules × series thresholds from the saved settings, with per-query overrides
+
+    ``config["overrides"]`` maps a fingerprint, a full label or a label's query id
+    (the part before ":") to the settings that differ for that query.
+    """
+    thresholds = np.empty((len(RULES), len(series)))
+    for r, rule in enumerate(RULES):
+        thresholds[r] = config[RULE_SETTINGS[rule][0]]
+    overrides = config.get("overrides") or {}
+    if overrides:
+        ids = {}
+        for entry in series:
+            ids.setdefault(entry.label.partition(":")[0], entry.id)
+            ids[entry.label] = ids[entry.fingerprint] = entry.id
+        for key, settings in overrides.items():
+            if key not in ids:
+                continue
+            for r, rule in enumerate(RULES):
+                value = settings.get(RULE_SETTINGS[rule][0])
+                if value is not None:
+                    thresholds[r, ids[key]] = value
+    return thresholds
+
+
+def window_values(store, baseline_ms, now, window_s=ALERT_WINDOW_S):
+    """rules × series values over the latest window; NaN where a series made too few calls to judge"""
+    _, counts = store.matrix(now - window_s, now, "1m", "count")
+    _, totals = store.matrix(now - window_s, now, "1m", "total_ms")
+    _, errors = store.matrix(now - window_s, now, "1m", "errors")
+    calls = counts.sum(axis=1, dtype=np.float64)
+    values = np.full((len(RULES), len(calls)), np.nan)
+    judged = calls >= MIN_CALLS
+    mean = totals.sum(axis=1, dtype=np.float64)[judged] / calls[judged]
+    values[0, judged] = mean
+    baseline = np.full(len(calls), np.nan)
+    baseline[:min(len(baseline_ms), len(calls))] = baseline_ms[:len(calls)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values[1, judged] = (mean / baseline[judged] - 1) * 100
+    values[2, judged] = errors.sum(axis=1, dtype=np.float64)[judged] / calls[judged] * 100
+    return values
+
+
+class AlertEngine:
+    """Firing state of every rule for every series, advanced one check at a time"""
+
+    def __init__(self, fire_after=FIRE_AFTER, hysteresis=HYSTERESIS, renotify_s=RENOTIFY_S):
+        self.fire_after = fire_after
+        self.hysteresis = hysteresis
+        self.renotify_s = renotify_s
+        self.firing = np.zeros((len(RULES), 0), dtype=bool)
+        self.streak = np.zeros((len(RULES), 0), dtype=np.int32)
+        self.since = np.zeros((len(RULES), 0))
+        self.notified = np.zeros((len(RULES), 0))
+
+    def _grow(self, size):
+        extra = size - self.firing.shape[1]
+        if extra > 0:
+            self.firing = np.pad(self.firing, ((0, 0), (0, extra)))
+            self.streak = np.pad(self.streak, ((0, 0), (0, extra)))
+            self.since = np.pad(self.since, ((0, 0), (0, extra)))
+            self.notified = np.pad(self.notified, ((0, 0), (0, extra)))
+
+    def tick(self, values, thresholds, now):
+        """Compare rules × series values with their thresholds; returns the AlertEvents of this check
+
+        A series with no value (NaN) keeps its state.
+        """
+        self._grow(values.shape[1])
+        known = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            breach = known & (values > thresholds)
+            clear = known & (values < thresholds * (1 - self.hysteresis))
+        self.streak = np.where(breach, self.streak + 1, np.where(known, 0, self.streak))
+        fired = ~self.firing & (self.streak >= self.fire_after)
+        resolved = self.firing & clear
+        repeated = self.firing & ~resolved & (now - self.notified >= self.renotify_s)
+        self.firing = (self.firing | fired) & ~resolved
+        self.since[fired] = now
+        self.notified[fired | repeated] = now
+        return AlertEvents(np.nonzero(fired), np.nonzero(resolved), np.nonzero(repeated))
+
+    def active(self):
+        """(rule rows, series columns) of every firing alert"""
+        return np.nonzero(self.firing)
+
+
+def coalesce(events, values, thresholds, series, onsets, now):
+    """Notifications for one check: one per rule and probable root cause, plus one per rule for resolutions
+
+    onsets holds the start of each series' detected regression (NaN for none); alerts of the
+    same rule whose regressions began in the same hour share a cause, and the rest share this check.
+    """
+    notifications = []
+    for kind, (rules, columns) in (("fired", events.fired), ("repeated", events.repeated)):
+        if not len(rules):
+            continue
+        causes = np.where(np.isnan(onsets[columns]), now, onsets[columns]) // 3600 * 3600
+        keys = np.stack([rules, causes.astype(np.int64)], axis=1)
+        groups, group_of = np.unique(keys, axis=0, return_inverse=True)
+        for g, (rule, cause) in enumerate(groups):
+            members = np.flatnonzero(group_of.ravel() == g)
+            excess = values[rule, columns[members]] / thresholds[rule, columns[members]]
+            worst = columns[members[np.argmax(np.nan_to_num(excess, nan=-np.inf))]]
+            _, unit, description = RULE_SETTINGS[RULES[rule]]
+            since = f" since {_format_time(cause)} UTC" if cause != now // 3600 * 3600 else ""
+            notifications.append({
+                "at": now,
+                "kind": kind,
+                "rule": RULES[rule],
+                "cause_at": int(cause),
+                "queries": len(members),
+                "labels": [series[i].label for i in columns[members[:20]]],
+                "message": f"{'🔁' if kind == 'repeated' else '🔴'} {len(members)} "
+                           f"{'query' if len(members) == 1 else 'queries'} with {description}{since}; "
+                           f"worst: {series[worst].label} at {values[rule, worst]:,.0f}{unit} "
+                           f"(threshold {thresholds[rule, worst]:,.0f}{unit})",
+            })
+    rules, columns = events.resolved
+    for rule in np.unique(rules):
+        members = columns[rules == rule]
+        notifications.append({
+            "at": now,
+            "kind": "resolved",
+            "rule": RULES[rule],
+            "cause_at": int(now),
+            "queries": len(members),
+            "labels": [series[i].label for i in members[:20]],
+            "message": f"✅ {len(members)} {RULE_SETTINGS[RULES[rule]][2]} "
+                       f"alert{'s' if len(members) != 1 else ''} resolved",
+        })
+    return notifications
+
+
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.gmtime(timestamp))
+
+
+def send_notifications(notifications, config, directory):
+    """Deliver notifications by the configured channels and add them to the dashboard feed"""
+    for notification in notifications:
+        delivered = []
+        if config["email_alerts"] and config.get("alert_email") and SMTP_HOST:
+            message = EmailMessage()
+            message["Subject"] = f"[SQL Optimizer] {notification['message'][:120]}"
+            message["From"] = SMTP_FROM
+            message["To"] = config["alert_email"]
+            message.set_content(notification["message"] + "\n\n" + "\n".join(notification["labels"]))
+            try:
+                with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
+                    smtp.send_message(message)
+                delivered.append("email")
+            except (OSError, smtplib.SMTPException) as e:
+                notification["error"] = f"email: {e}"
+        if config["slack_alerts"] and SLACK_WEBHOOK_URL:
+            request = urllib.request.Request(SLACK_WEBHOOK_URL, json.dumps({"text": notification["message"]}).encode(),
+                                             {"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=10).close()
+                delivered.append("slack")
+            except OSError as e:
+                notification["error"] = f"slack: {e}"
+        notification["delivered"] = delivered
+    if not notifications:
+        return
+    path = os.path.join(directory, ALERTS_FILE)
+    with open(path, "a", encoding="utf-8") as f:
+        for notification in notifications:
+            f.write(json.dumps(notification) + "\n")
+    if os.path.getsize(path) > ALERTS_KEPT * 1024:
+        kept = read_notifications(directory, ALERTS_KEPT // 2)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(notification) + "\n" for notification in kept)
+        os.replace(path + ".tmp", path)
+
+
+def read_notifications(directory, limit=50):
+    """The latest notifications, oldest first"""
+    try:
+        with open(os.path.join(directory, ALERTS_FILE), encoding="utf-8") as f:
+            return [json.loads(line) for line in deque(f, maxlen=limit)]
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,505 @@
+"""Local, rule-based detection of SQL anti-patterns.
+
+Rules work on the ``sqlparse`` lexer's token stream plus a light pass that
+tracks parenthesised scopes, the clause each token sits in and the table
+aliases each query defines. Skipping sqlparse's full grouping keeps a
+typical file to about a millisecond, so every finding the rules can decide
+is free and Claude only has to review what they cannot. Directories of
+``.sql`` files are scanned with a process pool::
+
+    python -m sqlopt.antipatterns migrations/ reports/*.sql --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlparse import lexer
+from sqlparse import tokens as T
+
+from sqlopt.fingerprint import fingerprint
+
+Finding = namedtuple("Finding", ["rule", "severity", "line", "message", "fix"])
+Token = namedtuple("Token", ["ttype", "value", "upper", "line"])
+
+SEVERITIES = ("critical", "warning", "suggestion")
+
+RULE_TITLES = {
+    "select-star": "SELECT *",
+    "leading-wildcard": "Leading-Wildcard LIKE",
+    "function-on-column": "Function on Filtered Column",
+    "correlated-subquery": "Correlated Subquery",
+    "implicit-join": "Implicit Cross Join",
+    "n-plus-one": "N+1 Query Pattern",
+    "dynamic-sql": "SQL Injection",
+    "error-handling": "Missing Error Handling",
+}
+
+# Below this many files a process pool costs more to start than it saves
+POOL_MIN_FILES = 16
+
+_CLAUSES = {
+    "SELECT": "SELECT", "FROM": "FROM", "WHERE": "WHERE", "ON": "ON", "USING": "ON",
+    "GROUP BY": "GROUP BY", "HAVING": "HAVING", "ORDER BY": "ORDER BY", "LIMIT": "LIMIT",
+    "OFFSET": "LIMIT", "SET": "SET", "VALUES": "VALUES", "INTO": "INTO", "UPDATE": "UPDATE",
+    "RETURNING": "RETURNING", "UNION": "", "UNION ALL": "", "EXCEPT": "", "INTERSECT": "",
+    "BEGIN": "", "END": "", "IF": "", "WHILE": "", "DECLARE": "", "RETURN": "", "EXEC": "",
+    "EXECUTE": "", "AS": None,
+}
+_STATEMENT_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "MERGE", "DECLARE", "IF", "WHILE", "BEGIN", "END", "EXEC",
+                       "EXECUTE", "RETURN", "CREATE", "ALTER", "DROP", "SET"}
+_RANGE_KEYWORDS = {"BETWEEN", "IN", "NOT IN", "IS", "IS NOT"}
+_SKIPPED = {T.Whitespace, T.Newline, T.Comment.Single, T.Comment.Multiline, T.Comment.Single.Hint,
+            T.Comment.Multiline.Hint}
+
+
+class Scope:
+    """One parenthesised level of a script (or the script itself)"""
+
+    __slots__ = ("parent", "start", "end", "opener", "is_query", "clause", "aliases", "from_items")
+
+    def __init__(self, parent, start, opener):
+        self.parent = parent
+        self.start = start
+        self.end = None
+        self.opener = opener
+        self.is_query = parent is None
+        self.clause = ""
+        self.aliases = set()
+        self.from_items = []
+
+    def query(self):
+        """The innermost enclosing query scope (function-call parentheses are transparent)"""
+        scope = self
+        while not scope.is_query:
+            scope = scope.parent
+        return scope
+
+
+class Script:
+    """A tokenized SQL script with per-token scope and clause"""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.tokens = []
+        self.offsets = []
+        line = 1
+        offset = 0
+        for ttype, value in lexer.tokenize(sql):
+            if ttype not in _SKIPPED:
+                self.tokens.append(Token(ttype, value, value.upper(), line))
+                self.offsets.append(offset)
+            offset += len(value)
+            if "\n" in value:
+                line += value.count("\n")
+        self._walk()
+
+    def _walk(self):
+        tokens = self.tokens
+        root = current = Scope(None, -1, "")
+        self.scopes = [root]
+        self.scope_of = []
+        self.clause_of = []
+        self.statements = []
+        statement_start = 0
+        for i, token in enumerate(tokens):
+            value = token.upper
+            if value == ")" and current.parent is not None:
+                current.end = i
+                current = current.parent
+            elif token.ttype in T.Keyword:
+                if value in ("SELECT", "WITH") and current.start == i - 1:
+                    current.is_query = True
+                clause = "JOIN" if value.endswith("JOIN") else _CLAUSES.get(value)
+                if clause is not None:
+                    current.clause = clause
+                if clause == "FROM" or clause == "JOIN":
+                    current.from_items.append((value, i, []))
+            elif token.ttype in T.Name and current.clause in ("FROM", "JOIN", "UPDATE", "INTO"):
+                following = tokens[i + 1].value if i + 1 < len(tokens) else ""
+                if following != "." and following != "(":
+                    current.aliases.add(token.value.lower())
+                    if current.from_items and current.clause != "UPDATE" and current.clause != "INTO":
+                        current.from_items[-1][2].append(token.value.lower())
+            elif value == "," and current.clause == "FROM" and current.from_items:
+                current.from_items.append((",", i, []))
+            self.scope_of.append(current)
+            self.clause_of.append(current.clause)
+            if value == "(":
+                current = Scope(current, i, tokens[i - 1].upper if i else "")
+                self.scopes.append(current)
+            elif current is root and (value == ";" or (value == "GO" and token.ttype in T.Name)):
+                # Each statement gets its own top-level scope, so aliases do not leak between statements
+                self.statements.append((statement_start, i))
+                statement_start = i + 1
+                root = current = Scope(None, i, "")
+                self.scopes.append(root)
+        if statement_start < len(tokens):
+            self.statements.append((statement_start, len(tokens)))
+
+    def text(self, start, end):
+        """Source text of tokens[start:end]"""
+        if start >= end:
+            return ""
+        last = self.tokens[end - 1]
+        return self.sql[self.offsets[start]:self.offsets[end - 1] + len(last.value)]
+
+    def next_value(self, i):
+        return self.tokens[i + 1].upper if i + 1 < len(self.tokens) else ""
+
+
+# Rules
+
+RULES = {}
+
+
+def rule(name):
+    """Register a rule: a function taking a Script and yielding Findings"""
+    def register(check):
+        RULES[name] = check
+        return check
+    return register
+
+
+def _is_column(script, i):
+    token = script.tokens[i]
+    return (token.ttype in T.Name and token.ttype not in T.Name.Placeholder and not token.value.startswith("@")
+            and script.next_value(i) not in ("(", "."))
+
+
+@rule("select-star")
+def select_star(script):
+    tokens = script.tokens
+    for i, token in enumerate(tokens):
+        if token.ttype not in T.Wildcard or script.clause_of[i] != "SELECT" or i == 0:
+            continue
+        if tokens[i - 1].value == "(":
+            # COUNT(*)
+            continue
+        if script.scope_of[i].query().opener == "EXISTS":
+            continue
+        yield Finding("select-star", "warning", token.line,
+                      "SELECT * reads every column, defeats covering indexes and breaks when the table changes",
+                      "List only the columns the caller needs")
+
+
+@rule("leading-wildcard")
+def leading_wildcard(script):
+    tokens = script.tokens
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper not in ("LIKE", "ILIKE", "NOT LIKE", "NOT ILIKE"):
+            continue
+        pattern = tokens[i + 1]
+        if pattern.ttype in T.String and pattern.value.lstrip("NnEe")[1:2] in ("%", "_"):
+            yield Finding("leading-wildcard", "warning", token.line,
+                          f"{token.value} {pattern.value} starts with a wildcard, so no B-tree index can be used",
+                          "Anchor the pattern at the start, or use a full-text / trigram index")
+
+
+@rule("function-on-column")
+def function_on_column(script):
+    tokens = script.tokens
+    for scope in script.scopes:
+        if scope.is_query or scope.end is None or scope.start < 1:
+            continue
+        call = scope.start - 1
+        if tokens[call].ttype not in T.Name or script.clause_of[call] not in ("WHERE", "ON"):
+            continue
+        columns = [tokens[j].value for j in range(scope.start + 1, scope.end) if _is_column(script, j)]
+        if not columns:
+            continue
+        after = script.next_value(scope.end)
+        before = tokens[call - 1] if call else None
+        compared = (after in _RANGE_KEYWORDS or (scope.end + 1 < len(tokens)
+                                                  and tokens[scope.end + 1].ttype in T.Operator.Comparison)
+                    or (before is not None and before.ttype in T.Operator.Comparison))
+        if compared:
+            yield Finding("function-on-column", "warning", tokens[call].line,
+                          f"{tokens[call].value}({columns[0]}) in a {script.clause_of[call]} condition hides "
+                          f"{columns[0]} from its index, so every row is evaluated",
+                          "Compare the bare column (e.g. a date range instead of YEAR()), or index the expression")
+
+
+@rule("correlated-subquery")
+def correlated_subquery(script):
+    tokens = script.tokens
+    references = defaultdict(set)
+    for i in range(len(tokens) - 2):
+        if tokens[i + 1].value == "." and tokens[i].ttype in T.Name:
+            references[script.scope_of[i].query()].add(tokens[i].value.lower())
+    for scope in script.scopes:
+        if not scope.is_query or scope.parent is None or scope.opener in ("EXISTS", "NOT EXISTS"):
+            continue
+        outer = set()
+        parent = scope.parent.query()
+        while parent is not None:
+            outer |= parent.aliases
+            parent = parent.parent.query() if parent.parent is not None else None
+        correlated = sorted((references[scope] - scope.aliases) & outer)
+        if not correlated:
+            continue
+        where = "SELECT list" if script.clause_of[scope.start] == "SELECT" else f"{script.clause_of[scope.start]} clause"
+        yield Finding("correlated-subquery", "warning", tokens[scope.start].line,
+                      f"Subquery in the {where} is correlated with {', '.join(correlated)} and runs once per outer row",
+                      "Rewrite as a JOIN (with GROUP BY for aggregates) or a window function")
+
+
+@rule("implicit-join")
+def implicit_join(script):
+    tokens = script.tokens
+    # Equality predicates between two qualified columns, per query
+    links = defaultdict(lambda: defaultdict(set))
+    for i in range(len(tokens) - 6):
+        if (tokens[i + 1].value == "." and tokens[i + 3].value == "=" and tokens[i + 5].value == "."
+                and tokens[i].ttype in T.Name and tokens[i + 4].ttype in T.Name):
+            a, b = tokens[i].value.lower(), tokens[i + 4].value.lower()
+            query_links = links[script.scope_of[i].query()]
+            query_links[a].add(b)
+            query_links[b].add(a)
+    for scope in script.scopes:
+        groups = []
+        for keyword, index, names in scope.from_items:
+            if keyword == "FROM":
+                groups.append([(index, names)])
+            elif keyword == ",":
+                if groups:
+                    groups[-1].append((index, names))
+            elif keyword not in ("CROSS JOIN", "NATURAL JOIN") and not _has_join_condition(script, scope, index):
+                yield Finding("implicit-join", "warning", tokens[index].line,
+                              f"{tokens[index].value} {names[0] if names else ''} has no ON or USING condition "
+                              "and produces a Cartesian product", "Add the join condition")
+        for group in groups:
+            if len(group) > 1:
+                yield _comma_join(tokens, links[scope], group)
+
+
+def _comma_join(tokens, links, group):
+    items = [names for _, names in group if names]
+    reached = set(items[0]) if items else set()
+    grew = True
+    while grew:
+        grew = False
+        for names in items:
+            if not reached.issuperset(names) and any(links[name] & reached for name in names):
+                reached.update(names)
+                grew = True
+    unjoined = [names[-1] for names in items if not reached.intersection(names)]
+    line = tokens[group[0][0]].line
+    if unjoined:
+        return Finding("implicit-join", "warning", line,
+                       f"Comma join with no join predicate for {', '.join(unjoined)}: a Cartesian product",
+                       "Use explicit JOIN ... ON with the join condition, or CROSS JOIN if intended")
+    return Finding("implicit-join", "suggestion", line, "Comma-separated FROM list (implicit join)",
+                   "Use explicit JOIN ... ON so join conditions cannot be lost")
+
+
+def _has_join_condition(script, scope, index):
+    """Whether the JOIN at tokens[index] gets an ON or USING before the next join or clause"""
+    tokens = script.tokens
+    end = scope.end if scope.end is not None else len(tokens)
+    for i in range(index + 1, end):
+        if script.scope_of[i] is not scope:
+            continue
+        if tokens[i].value == ";":
+            return False
+        if tokens[i].ttype not in T.Keyword:
+            continue
+        value = tokens[i].upper
+        if value in ("ON", "USING"):
+            return True
+        if value.endswith("JOIN") or _CLAUSES.get(value) not in (None, "ON"):
+            return False
+    return False
+
+
+@rule("n-plus-one")
+def n_plus_one(script):
+    shapes = defaultdict(list)
+    for start, end in script.statements:
+        if start >= end or script.tokens[start].ttype not in T.Keyword.DML:
+            continue
+        text = script.text(start, end)
+        shapes[fingerprint(text).template].append((script.tokens[start].line, text))
+    for template, occurrences in shapes.items():
+        if len(occurrences) > 1 and len({text for _, text in occurrences}) > 1 and "?" in template:
+            lines = ", ".join(str(line) for line, _ in occurrences[:5])
+            yield Finding("n-plus-one", "warning", occurrences[0][0],
+                          f"{len(occurrences)} statements (lines {lines}{'...' if len(occurrences) > 5 else ''}) "
+                          f"differ only in literal values: `{template[:80]}` — the N+1 query pattern",
+                          "Fetch all rows at once with IN (...) or a JOIN, or batch the writes")
+
+    tokens = script.tokens
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper == "CURSOR" and any(t.upper == "FETCH" for t in tokens[i:]):
+            yield Finding("n-plus-one", "warning", token.line,
+                          "Cursor loop processes rows one at a time, issuing a statement per row",
+                          "Replace the loop with one set-based INSERT/UPDATE/DELETE ... FROM or JOIN")
+            break
+
+
+@rule("dynamic-sql")
+def dynamic_sql(script):
+    tokens = script.tokens
+    tainted = {}
+    for i, token in enumerate(tokens):
+        if token.upper in ("SET", "DECLARE", "SELECT") and i + 2 < len(tokens) and tokens[i + 1].value.startswith("@"):
+            variable = tokens[i + 1].value.lower()
+            j = i + 2
+            while j < len(tokens) and tokens[j].value != "=" and j < i + 6:
+                j += 1
+            inputs = [name for name in _concatenated_inputs(script, j + 1) if name.lower() != variable]
+            if inputs:
+                # Appending to an already tainted variable keeps the first injection point
+                line, earlier = tainted.get(variable, (token.line, []))
+                tainted[variable] = (line, list(dict.fromkeys(earlier + inputs)))
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper not in ("EXEC", "EXECUTE", "PREPARE"):
+            continue
+        j = i + 1
+        while j < len(tokens) and j < i + 5 and not tokens[j].value.startswith("@") \
+                and tokens[j].ttype not in T.String:
+            j += 1
+        if j >= len(tokens):
+            continue
+        if tokens[j].value.lower() in tainted:
+            line, inputs = tainted[tokens[j].value.lower()]
+            yield Finding("dynamic-sql", "critical", line,
+                          f"Dynamic SQL in {tokens[j].value} concatenates {', '.join(inputs)} and is executed on "
+                          f"line {token.line}: SQL injection",
+                          "Pass values as parameters (sp_executesql with a parameter list, EXECUTE ... USING)")
+        elif tokens[j].ttype in T.String and _concatenated_inputs(script, j):
+            yield Finding("dynamic-sql", "critical", token.line,
+                          f"{token.value} runs a string built by concatenating "
+                          f"{', '.join(_concatenated_inputs(script, j))}: SQL injection",
+                          "Pass values as parameters (EXECUTE ... USING, format() with %L, or quote_literal)")
+
+
+def _concatenated_inputs(script, start):
+    """Variables or columns concatenated into a string expression starting at tokens[start]"""
+    tokens = script.tokens
+    inputs = []
+    has_string = has_concat = False
+    depth = 0
+    for j in range(start, min(len(tokens), start + 200)):
+        token = tokens[j]
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0 and (token.value == ";" or (token.ttype in T.Keyword and token.upper in _STATEMENT_KEYWORDS)):
+            break
+        if token.ttype in T.String:
+            has_string = True
+        elif token.value in ("+", "||") or token.upper == "CONCAT":
+            has_concat = True
+        elif token.ttype in T.Name and script.next_value(j) != "(" and token.upper not in ("CAST", "CONVERT"):
+            inputs.append(token.value)
+    if has_string and has_concat and inputs:
+        return list(dict.fromkeys(inputs))
+    return []
+
+
+@rule("error-handling")
+def error_handling(script):
+    tokens = script.tokens
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper in ("CREATE", "ALTER", "CREATE OR REPLACE") and tokens[i + 1].upper in ("PROCEDURE", "PROC"):
+            body = {t.upper for t in tokens[i:]}
+            if body & {"INSERT", "UPDATE", "DELETE", "MERGE", "EXEC", "EXECUTE"} \
+                    and not body & {"TRY", "BEGIN TRY", "CATCH", "EXCEPTION"}:
+                yield Finding("error-handling", "suggestion", token.line,
+                              "Procedure modifies data or runs dynamic SQL without error handling",
+                              "Wrap the body in TRY...CATCH (or an EXCEPTION block) and roll back on failure")
+            return
+
+
+def analyze(sql, rules=None):
+    """Run the rules (all by default) over a script; findings sorted by line"""
+    if not sql.strip():
+        return []
+    script = Script(sql)
+    findings = set()
+    for name in rules or RULES:
+        findings.update(RULES[name](script))
+    return sorted(findings, key=lambda f: (f.line, SEVERITIES.index(f.severity), f.rule, f.message))
+
+
+def _analyze_named(item):
+    name, sql = item
+    started = time.perf_counter()
+    findings = analyze(sql)
+    return name, findings, (time.perf_counter() - started) * 1000
+
+
+def _analyze_path(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return _analyze_named((path, f.read()))
+
+
+def scan_texts(named_sql, workers=None):
+    """Analyze (name, sql) pairs, in a process pool when there are many; yields (name, findings, ms)"""
+    named_sql = list(named_sql)
+    if len(named_sql) < POOL_MIN_FILES or workers == 1:
+        yield from map(_analyze_named, named_sql)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_analyze_named, named_sql, chunksize=8)
+
+
+def scan_paths(paths, workers=None):
+    """Analyze .sql files, in a process pool when there are many; yields (path, findings, ms)"""
+    paths = list(paths)
+    if len(paths) < POOL_MIN_FILES or workers == 1:
+        yield from map(_analyze_path, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_analyze_path, paths, chunksize=8)
+
+
+def find_sql_files(roots):
+    """Expand files and directories into the .sql files they contain"""
+    for root in roots:
+        if os.path.isdir(root):
+            for directory, _, names in os.walk(root):
+                for name in sorted(names):
+                    if name.lower().endswith(".sql"):
+                        yield os.path.join(directory, name)
+        else:
+            yield root
+
+
+def describe_findings(findings):
+    """Findings as plain text lines, for prompts and reports"""
+    return "\n".join(f"- Line {f.line} [{f.severity}] {f.rule}: {f.message}" for f in findings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan SQL files for performance and security anti-patterns")
+    parser.add_argument("paths", nargs="+", help=".sql files or directories")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    files = 0
+    counts = defaultdict(int)
+    analysis_ms = 0.0
+    for path, findings, elapsed_ms in scan_paths(find_sql_files(args.paths), args.workers):
+        files += 1
+        analysis_ms += elapsed_ms
+        for finding in findings:
+            counts[finding.severity] += 1
+            if not args.quiet:
+                print(f"{path}:{finding.line}: {finding.severity}: [{finding.rule}] {finding.message}")
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{counts[severity]} {severity}" for severity in SEVERITIES)
+    print(f"\n{files} files in {elapsed:.2f}s ({analysis_ms / max(files, 1):.2f} ms per file): {summary}")
+    return 1 if counts["critical"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""Streaming per-query latency baselines.
+
+Baselines are updated incrementally from the metrics store's buckets, with
+no rescan of history, and keep two summaries per series. Both weight
+samples by ``exp(-age / window)``, so older samples are decayed by
+rescaling, and updates may arrive in any order:
+
+- an exponentially weighted mean and variance of per-call latency, kept as
+  three running sums per series;
+- a DDSketch of latency: weighted counts in logarithmic bins, giving
+  quantiles within ``RELATIVE_ACCURACY`` of the true value. The sketches
+  of all series are stored sparsely, as sorted ``series * BINS + bin``
+  keys with their weights, so a series costs only the bins its latency
+  actually reaches (tens, not ``BINS``). Weights that decay below
+  ``MIN_WEIGHT`` are dropped.
+
+Every summary is a set of sums, so two Baselines built by different
+workers, or over different time ranges, merge by adding arrays
+(``merge``). Updates and quantiles are vectorized across the fleet.
+
+Samples are bucket means from the store, weighted by their call counts, so
+the sketch describes latency at the store's bucket resolution.
+
+The full state (``save``) is only needed to resume without rescanning the
+store; readers that only need each series' mean and quantiles use the much
+smaller ``save_summary`` file.
+"""
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.02
+MIN_MS = 0.1
+MAX_MS = 1e6
+MIN_WEIGHT = 0.01
+DEFAULT_WINDOW_DAYS = 7
+QUANTILES = (0.5, 0.95, 0.99)
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_OFFSET = math.floor(math.log(MIN_MS) / math.log(_GAMMA))
+BINS = math.ceil(math.log(MAX_MS) / math.log(_GAMMA)) - _OFFSET + 1
+
+
+def sketch_bins(values_ms):
+    """DDSketch bin of each latency; values outside MIN_MS..MAX_MS fall in the end bins"""
+    values = np.clip(np.asarray(values_ms, dtype=np.float64), MIN_MS, MAX_MS)
+    return np.ceil(np.log(values) / math.log(_GAMMA)).astype(np.int64) - _OFFSET
+
+
+def sketch_quantiles(counts, quantiles=QUANTILES):
+    """Quantiles of each row of a series × BINS count array, NaN for empty rows"""
+    counts = np.atleast_2d(counts)
+    series, bins = np.nonzero(counts)
+    return sparse_quantiles(series * BINS + bins, counts[series, bins], len(counts), quantiles)
+
+
+def sparse_quantiles(keys, weights, size, quantiles=QUANTILES):
+    """size × quantiles array from sketches stored as sorted series * BINS + bin keys; NaN for empty series"""
+    keys = np.asarray(keys, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    values = np.full((size, len(quantiles)), np.nan)
+    used = weights > 0
+    keys, weights = keys[used], weights[used]
+    if not len(keys):
+        return values
+    series, bins = np.divmod(keys, BINS)
+    # Cumulative weight within each series' run of keys
+    starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+    lengths = np.diff(np.r_[starts, len(keys)])
+    cumulative = np.cumsum(weights)
+    within = cumulative - np.repeat(np.r_[0.0, cumulative][starts], lengths)
+    totals = np.repeat(within[starts + lengths - 1], lengths)
+    for j, quantile in enumerate(quantiles):
+        reached = np.flatnonzero(within >= quantile * totals)
+        owners, first = np.unique(series[reached], return_index=True)
+        # Midpoint of the bin (gamma^(k-1), gamma^k], relative error at most RELATIVE_ACCURACY
+        values[owners, j] = 2 * _GAMMA ** (bins[reached[first]] + _OFFSET) / (_GAMMA + 1)
+    return values
+
+
+def fit_series(array, size):
+    """A per-series array cut or NaN-padded to size series, so it lines up with the store's series list"""
+    if size is None:
+        return array
+    fitted = np.full(size, np.nan)
+    fitted[:min(size, len(array))] = array[:size]
+    return fitted
+
+
+def save_summary(summary, path):
+    """Write a summary() to an .npz file atomically"""
+    temporary = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temporary, **summary)
+    os.replace(temporary, path)
+
+
+def load_summary(path, size=None):
+    """A summary written by save_summary, fitted to size series"""
+    with np.load(path) as saved:
+        return {key: fit_series(saved[key], size) for key in saved.files}
+
+
+class Baselines:
+    """Per-series EWMA mean/variance and decayed DDSketch of latency, indexed by metrics store series id"""
+
+    def __init__(self, window_days=DEFAULT_WINDOW_DAYS, capacity=1024):
+        self.window_days = window_days
+        self.tau = window_days * 86400.0
+        self.lock = threading.Lock()
+        self.reference = None      # time the running sums and sketch weights are decayed to
+        self.updated_to = None     # end of the last store bucket consumed
+        self.sums = np.zeros((3, capacity))
+        self.keys = np.zeros(0, dtype=np.int64)       # sorted series * BINS + bin
+        self.weights = np.zeros(0)
+
+    # Updating
+
+    def _grow(self, size):
+        capacity = self.sums.shape[1]
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        self.sums = np.pad(self.sums, ((0, 0), (0, capacity - self.sums.shape[1])))
+
+    def _decay_to(self, reference):
+        if self.reference is None:
+            self.reference = reference
+        elif reference > self.reference:
+            scale = math.exp(-(reference - self.reference) / self.tau)
+            self.sums *= scale
+            self.weights *= scale
+            self.reference = reference
+
+    def _add_to_sketch(self, keys, weights):
+        keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        weights = np.bincount(inverse, np.concatenate([self.weights, weights]), minlength=len(keys))
+        kept = weights >= MIN_WEIGHT
+        self.keys, self.weights = keys[kept], weights[kept]
+
+    def update(self, ids, timestamps, total_ms, count):
+        """Add store buckets: `count` calls of series `ids` at unix times, taking total_ms between them"""
+        ids = np.asarray(ids, dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        count = np.asarray(count, dtype=np.float64)
+        busy = count > 0
+        ids, timestamps, count = ids[busy], timestamps[busy], count[busy]
+        if not len(ids):
+            return 0
+        mean = np.asarray(total_ms, dtype=np.float64)[busy] / count
+        with self.lock:
+            self._grow(int(ids.max()) + 1)
+            self._decay_to(float(timestamps.max()))
+            weights = count * np.exp(-(self.reference - timestamps) / self.tau)
+            np.add.at(self.sums[0], ids, weights)
+            np.add.at(self.sums[1], ids, weights * mean)
+            np.add.at(self.sums[2], ids, weights * mean * mean)
+            self._add_to_sketch(ids * BINS + sketch_bins(mean), weights)
+        return len(ids)
+
+    def catch_up(self, store, end=None):
+        """Consume the store's complete buckets since the last call: hours for long gaps, then minutes"""
+        end = int(time.time() if end is None else end)
+        start = self.updated_to
+        if start is None:
+            start = (end - int(self.tau)) // 3600 * 3600
+        added = 0
+        # Long gaps are read as whole hours, after the minutes up to the first hour boundary
+        if end - start > 86400:
+            next_hour = -(-start // 3600) * 3600
+            if next_hour > start:
+                added += self._consume(store, start, next_hour, "1m")
+            start = next_hour
+            hour_end = end // 3600 * 3600
+            added += self._consume(store, start, hour_end, "1h")
+            start = hour_end
+        minute_end = end // 60 * 60
+        if minute_end > start:
+            added += self._consume(store, start, minute_end, "1m")
+            start = minute_end
+        self.updated_to = start
+        return added
+
+    def _consume(self, store, start, end, resolution):
+        times, counts = store.matrix(start, end, resolution, "count")
+        _, totals = store.matrix(start, end, resolution, "total_ms")
+        ids, buckets = np.nonzero(counts)
+        return self.update(ids, times[buckets], totals[ids, buckets], counts[ids, buckets])
+
+    def merge(self, other):
+        """Add another Baselines with the same window, e.g. from another worker or time range"""
+        if other.window_days != self.window_days:
+            raise ValueError("Baselines with different windows cannot be merged")
+        with self.lock:
+            self._grow(other.sums.shape[1])
+            if other.reference is not None:
+                self._decay_to(other.reference)
+                scale = math.exp(-(self.reference - other.reference) / self.tau)
+                self.sums[:, :other.sums.shape[1]] += other.sums * scale
+                self._add_to_sketch(other.keys, other.weights * scale)
+            if other.updated_to is not None:
+                self.updated_to = max(self.updated_to or 0, other.updated_to)
+        return self
+
+    # Reading
+
+    def means(self, size=None):
+        """(mean_ms, std_ms) arrays of the EWMA, NaN for series without calls; cheaper than summary()"""
+        with self.lock:
+            weight, total, squares = self.sums.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(weight > 0, total / weight, np.nan)
+            std = np.sqrt(np.maximum(squares / weight - mean * mean, 0))
+        return fit_series(mean, size), fit_series(std, size)
+
+    def summary(self, quantiles=QUANTILES, size=None):
+        """Per-series baseline arrays: decayed calls, mean_ms, std_ms and p50/p95/p99_ms
+
+        With size, every array has exactly that many entries, NaN past the tracked series.
+        """
+        mean, std = self.means()
+        with self.lock:
+            calls = self.sums[0].copy()
+            found = sparse_quantiles(self.keys, self.weights, len(calls), quantiles)
+        summary = {"calls": calls, "mean_ms": mean, "std_ms": std}
+        for j, value in enumerate(found.T):
+            summary[f"p{quantiles[j] * 100:g}_ms"] = value
+        return {key: fit_series(value, size) for key, value in summary.items()}
+
+    def before(self, store, fingerprint, onset, quantiles=QUANTILES):
+        """One series' baseline as it stood at onset, rebuilt from the store's hourly buckets before it
+
+        Used for regressed series, whose running baseline has since absorbed the regression.
+        """
+        start = onset - int(self.tau)
+        times, counts = store.read(fingerprint, start, onset, "1h", "count")
+        _, totals = store.read(fingerprint, start, onset, "1h", "total_ms")
+        frozen = Baselines(self.window_days, capacity=1)
+        frozen.update(np.zeros(len(times), dtype=np.int64), times, totals, counts)
+        return {key: float(value[0]) for key, value in frozen.summary(quantiles, size=1).items()}
+
+    # Persistence
+
+    def save(self, path):
+        """Write the state to an .npz file atomically"""
+        temporary = f"{path}.{os.getpid()}.tmp.npz"
+        with self.lock:
+            np.savez(temporary, sums=self.sums, keys=self.keys, weights=self.weights,
+                     state=np.array([self.window_days, self.reference if self.reference is not None else np.nan,
+                                     np.nan if self.updated_to is None else self.updated_to]))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Baselines saved by save()"""
+        with np.load(path) as saved:
+            window_days, reference, updated_to = saved["state"]
+            baselines = cls(float(window_days), capacity=saved["sums"].shape[1])
+            baselines.sums = saved["sums"]
+            baselines.keys = saved["keys"]
+            baselines.weights = saved["weights"]
+        baselines.reference = None if np.isnan(reference) else float(reference)
+        baselines.updated_to = None if np.isnan(updated_to) else int(updated_to)
+        return baselines
@@ -0,0 +1,406 @@
+"""Offline, resumable batch analysis of whole query workloads.
+
+A job takes a file of SQL statements, groups the ones that differ only in
+literals into templates (see ``sqlopt.fingerprint``), and submits one
+performance-analysis request per template in bulk, Message Batches style.
+Every step is recorded in a local SQLite store (job, items, submitted
+batches), so a restarted process simply calls ``run`` again and picks up
+where it left off: unsent items are submitted, open batches are polled, and
+finished batches are collected.
+
+Two batch backends are available: the Anthropic Message Batches API and a
+local stand-in that works through its queue with any LLM backend (the
+offline stub by default), for tests and dry runs.
+
+Command line::
+
+    python -m sqlopt.batch_jobs submit slow_queries.sql --name nightly
+    python -m sqlopt.batch_jobs run <job_id>
+    python -m sqlopt.batch_jobs status
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import sqlparse
+
+from sqlopt.fingerprint import aggregate
+from sqlopt.llm_backends import DEFAULT_CLAUDE_MODEL, StubBackend
+from sqlopt.prompts import build_performance_prompt
+
+DEFAULT_BATCH_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sqlopt", "batches")
+MAX_REQUESTS_PER_BATCH = 10000
+ANALYSIS_MAX_TOKENS = 2500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    total_statements INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    custom_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    occurrences INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    batch_id TEXT,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, custom_id)
+);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(job_id, status);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+"""
+
+
+def read_statements(path):
+    """Split a .sql file into individual statements"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    return [s for s in (statement.strip() for statement in sqlparse.split(text)) if s]
+
+
+def deduplicate(statements):
+    """One (example statement, occurrences, query id) per template, most frequent first"""
+    templates = aggregate(statement for statement in statements if statement.strip().rstrip(";").strip())
+    return [(template.example, template.calls, template.query_id) for template in templates]
+
+
+class LocalBatchBackend:
+    """Stand-in for the Message Batches API that runs requests through an LLM backend
+
+    Batches are JSONL files in ``directory``; each poll answers up to
+    ``requests_per_poll`` outstanding requests, so progress is gradual and
+    survives restarts just like a real batch.
+    """
+
+    name = "local"
+
+    def __init__(self, directory, llm=None, requests_per_poll=100):
+        self.directory = os.path.join(directory, "local")
+        self.llm = llm or StubBackend()
+        self.requests_per_poll = requests_per_poll
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _files(self, batch_id):
+        base = os.path.join(self.directory, batch_id)
+        return base + ".requests.jsonl", base + ".results.jsonl"
+
+    def submit(self, requests):
+        batch_id = f"localbatch_{uuid.uuid4().hex[:20]}"
+        request_file, _ = self._files(batch_id)
+        with open(request_file + ".tmp", "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        os.replace(request_file + ".tmp", request_file)
+        return batch_id
+
+    def _load(self, batch_id):
+        request_file, result_file = self._files(batch_id)
+        with open(request_file, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        done = set()
+        if os.path.exists(result_file):
+            with open(result_file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["custom_id"])
+                    except ValueError:
+                        # A torn last line from an interrupted write is simply redone
+                        continue
+        return requests, done, result_file
+
+    def poll(self, batch_id):
+        """Advance the batch and report whether it has ended"""
+        requests, done, result_file = self._load(batch_id)
+        pending = [r for r in requests if r["custom_id"] not in done][:self.requests_per_poll]
+        with open(result_file, "a", encoding="utf-8") as f:
+            for request in pending:
+                params = request["params"]
+                prompt = params["messages"][0]["content"]
+                try:
+                    text = self.llm.complete(prompt, params["max_tokens"]).text
+                    entry = {"custom_id": request["custom_id"], "ok": True, "text": text}
+                except Exception as e:
+                    entry = {"custom_id": request["custom_id"], "ok": False, "text": str(e)}
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                done.add(request["custom_id"])
+        return {"ended": len(done) >= len(requests), "done": len(done), "total": len(requests)}
+
+    def results(self, batch_id):
+        """Yield (custom_id, succeeded, text or error) for finished requests"""
+        _, _, result_file = self._load(batch_id)
+        with open(result_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                yield entry["custom_id"], entry["ok"], entry["text"]
+
+
+class AnthropicBatchBackend:
+    """The Anthropic Message Batches API"""
+
+    name = "anthropic"
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, requests):
+        return self.client.messages.batches.create(requests=requests).id
+
+    def poll(self, batch_id):
+        batch = self.client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = counts.succeeded + counts.errored + counts.canceled + counts.expired
+        return {"ended": batch.processing_status == "ended", "done": done,
+                "total": done + counts.processing}
+
+    def results(self, batch_id):
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                yield entry.custom_id, True, entry.result.message.content[0].text
+            else:
+                yield entry.custom_id, False, entry.result.type
+
+
+class BatchJobStore:
+    """SQLite-backed job tracker driving one batch backend"""
+
+    def __init__(self, directory=DEFAULT_BATCH_DIR, backend=None, model=DEFAULT_CLAUDE_MODEL):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self.backend = backend or LocalBatchBackend(directory)
+        self.model = model
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create_job(self, statements, name="Batch analysis"):
+        """Group statements into templates and register a job for them; returns the job id"""
+        distinct = deduplicate(statements)
+        job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, name, backend, model, created_at, total_statements) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, name, self.backend.name, self.model, now, len(statements)),
+            )
+            conn.executemany(
+                "INSERT INTO items (job_id, custom_id, query, occurrences, status, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?)",
+                [(job_id, query_id, query, occurrences, now) for query, occurrences, query_id in distinct],
+            )
+        return job_id
+
+    def _submit_pending(self, job_id):
+        with self._connect() as conn:
+            pending = conn.execute(
+                "SELECT custom_id, query FROM items WHERE job_id = ? AND status = 'pending'", (job_id,)
+            ).fetchall()
+
+        for start in range(0, len(pending), MAX_REQUESTS_PER_BATCH):
+            chunk = pending[start:start + MAX_REQUESTS_PER_BATCH]
+            requests = [{
+                "custom_id": custom_id,
+                "params": {
+                    "model": self.model,
+                    "max_tokens": ANALYSIS_MAX_TOKENS,
+                    "messages": [{"role": "user", "content": build_performance_prompt(query)}],
+                },
+            } for custom_id, query in chunk]
+            batch_id = self.backend.submit(requests)
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO batches (batch_id, job_id, status, submitted_at) VALUES (?, ?, 'open', ?)",
+                    (batch_id, job_id, now),
+                )
+                conn.executemany(
+                    "UPDATE items SET status = 'submitted', batch_id = ?, updated_at = ? "
+                    "WHERE job_id = ? AND custom_id = ?",
+                    [(batch_id, now, job_id, custom_id) for custom_id, _ in chunk],
+                )
+
+    def _collect(self, job_id, batch_id):
+        now = time.time()
+        updates = [
+            ("succeeded" if ok else "errored", text if ok else None, None if ok else text, now, job_id, custom_id)
+            for custom_id, ok, text in self.backend.results(batch_id)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE items SET status = ?, result = ?, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND custom_id = ? AND status = 'submitted'",
+                updates,
+            )
+            conn.execute("UPDATE batches SET status = 'ended' WHERE batch_id = ?", (batch_id,))
+
+    def run_step(self, job_id):
+        """Submit unsent items, poll open batches once, collect finished ones; returns progress"""
+        self._submit_pending(job_id)
+        with self._connect() as conn:
+            open_batches = [row[0] for row in conn.execute(
+                "SELECT batch_id FROM batches WHERE job_id = ? AND status = 'open'", (job_id,)
+            )]
+        for batch_id in open_batches:
+            if self.backend.poll(batch_id)["ended"]:
+                self._collect(job_id, batch_id)
+
+        progress = self.progress(job_id)
+        if progress["complete"]:
+            with self._connect() as conn:
+                conn.execute("UPDATE jobs SET finished_at = COALESCE(finished_at, ?) WHERE job_id = ?",
+                             (time.time(), job_id))
+        return progress
+
+    def run(self, job_id, poll_interval=30.0, timeout=None, on_progress=None):
+        """Drive a job until every item has a result (or the timeout passes)"""
+        started = time.monotonic()
+        while True:
+            progress = self.run_step(job_id)
+            if on_progress:
+                on_progress(progress)
+            if progress["complete"]:
+                return progress
+            if timeout is not None and time.monotonic() - started >= timeout:
+                return progress
+            time.sleep(poll_interval)
+
+    def progress(self, job_id):
+        with self._connect() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        total = sum(counts.values())
+        finished = counts.get("succeeded", 0) + counts.get("errored", 0)
+        return {
+            "total": total,
+            "pending": counts.get("pending", 0),
+            "submitted": counts.get("submitted", 0),
+            "succeeded": counts.get("succeeded", 0),
+            "errored": counts.get("errored", 0),
+            "fraction": finished / total if total else 1.0,
+            "complete": finished == total,
+        }
+
+    def jobs(self):
+        """All jobs, newest first, with their progress"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, name, backend, created_at, finished_at, total_statements "
+                "FROM jobs ORDER BY created_at DESC"
+            ).fetchall()
+        return [{
+            "job_id": job_id,
+            "name": name,
+            "backend": backend,
+            "created_at": created_at,
+            "finished_at": finished_at,
+            "total_statements": total_statements,
+            **self.progress(job_id),
+        } for job_id, name, backend, created_at, finished_at, total_statements in rows]
+
+    def results(self, job_id, search=None, limit=None):
+        """Items of a job, most frequent statements first"""
+        sql = "SELECT query, occurrences, status, result, error FROM items WHERE job_id = ?"
+        params = [job_id]
+        if search:
+            sql += " AND query LIKE ?"
+            params.append(f"%{search}%")
+        sql += " ORDER BY occurrences DESC, custom_id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(("query", "occurrences", "status", "result", "error"), row)) for row in rows]
+
+
+def open_store(backend="local", directory=None, model=None):
+    """Job store wired to the named batch backend"""
+    directory = directory or os.getenv("SQLOPT_BATCH_DIR", DEFAULT_BATCH_DIR)
+    model = model or os.getenv("SQLOPT_CLAUDE_MODEL", DEFAULT_CLAUDE_MODEL)
+    if backend == "anthropic":
+        import anthropic
+
+        batch_backend = AnthropicBatchBackend(anthropic.Anthropic())
+    else:
+        batch_backend = LocalBatchBackend(directory)
+    return BatchJobStore(directory, batch_backend, model)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline batch analysis of SQL workloads")
+    parser.add_argument("--backend", choices=["local", "anthropic"], default="local")
+    parser.add_argument("--dir", default=None, help="job store directory (default: SQLOPT_BATCH_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="create a job from a .sql file and run it")
+    submit.add_argument("path")
+    submit.add_argument("--name", default=None)
+    submit.add_argument("--no-wait", action="store_true", help="only submit, do not wait for results")
+    submit.add_argument("--poll-interval", type=float, default=30.0)
+
+    run = commands.add_parser("run", help="resume a job until it completes")
+    run.add_argument("job_id")
+    run.add_argument("--poll-interval", type=float, default=30.0)
+
+    commands.add_parser("status", help="list jobs and their progress")
+
+    args = parser.parse_args(argv)
+    store = open_store(args.backend, args.dir)
+
+    def report(progress):
+        print(f"{progress['succeeded'] + progress['errored']}/{progress['total']} done "
+              f"({progress['errored']} errored, {progress['submitted']} in flight)", flush=True)
+
+    if args.command == "submit":
+        statements = read_statements(args.path)
+        job_id = store.create_job(statements, args.name or os.path.basename(args.path))
+        print(f"Job {job_id}: {len(statements)} statements, "
+              f"{store.progress(job_id)['total']} templates", flush=True)
+        if args.no_wait:
+            report(store.run_step(job_id))
+        else:
+            store.run(job_id, args.poll_interval, on_progress=report)
+    elif args.command == "run":
+        store.run(args.job_id, args.poll_interval, on_progress=report)
+    else:
+        for job in store.jobs():
+            print(f"{job['job_id']}  {job['name']:<30} {job['backend']:<9} "
+                  f"{job['succeeded'] + job['errored']}/{job['total']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
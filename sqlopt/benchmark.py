@@ -0,0 +1,324 @@
+"""Before/after query benchmarking against a database or a SQLite stand-in.
+
+``run_benchmark`` times each query on a ``BenchmarkTarget`` with warm-up
+runs, then N measured repetitions in interleaved order (ABAB..., reversed
+every other round) so cache warming and background drift hit every query
+alike. ``concurrency`` workers, each on its own connection, run the same
+schedule at once to measure the queries under contention. Every query gets
+a timeout. Reports include p50/p95/p99 latency, rows returned, and whether
+the rewritten queries return the same result as the first (original) one.
+
+Targets:
+
+- ``SQLiteTarget``: a SQLite file, or an in-memory image copied into each
+  worker connection (the app uses the index simulator's generated data)
+- ``EngineTarget``: any SQLAlchemy DSN, borrowing connections from the
+  pooled, read-only engines of ``sqlopt.connections``
+
+Command line::
+
+    python -m sqlopt.benchmark original.sql rewritten.sql --runs 20 --concurrency 4
+    python -m sqlopt.benchmark original.sql rewritten.sql --dsn postgresql+psycopg2://app@db/shop
+"""
+import argparse
+import hashlib
+import math
+import re
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from sqlopt.connections import ConnectionManager, QueryTimeout, is_timeout
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["label", "sql", "timings_ms", "rows", "ordered_digest",
+                                                 "unordered_digest", "errors", "timeouts"])
+
+DEFAULT_RUNS = 10
+DEFAULT_WARMUP = 1
+DEFAULT_TIMEOUT_S = 30.0
+
+# Floats are compared to this many significant digits, so a reordered SUM still matches
+FLOAT_DIGITS = 10
+
+_LEADING_COMMENTS = re.compile(r"\A(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+
+class BenchmarkTarget:
+    """Base class: subclasses open connections and run one query with a timeout"""
+
+    name = "base"
+
+    def connect(self, timeout_s):
+        """Context manager holding one client's connection for the whole benchmark"""
+        raise NotImplementedError
+
+    def execute(self, conn, sql, timeout_s):
+        """All rows of one query; raises QueryTimeout when it runs past timeout_s"""
+        raise NotImplementedError
+
+
+class SQLiteTarget(BenchmarkTarget):
+    """A SQLite database file, or a serialized in-memory database copied into each connection"""
+
+    name = "sqlite"
+
+    def __init__(self, path=None, image=None, label=None):
+        if (path is None) == (image is None):
+            raise ValueError("give either a database path or a serialized image")
+        self.path = path
+        self.image = image
+        self.label = label or path or "in-memory copy"
+
+    @classmethod
+    def from_connection(cls, conn, label=None):
+        """Snapshot of an open SQLite connection, e.g. the index simulator's generated data"""
+        return cls(image=conn.serialize(), label=label)
+
+    def connect(self, timeout_s):
+        if self.path is not None:
+            return closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False))
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.deserialize(self.image)
+        return closing(conn)
+
+    def execute(self, conn, sql, timeout_s):
+        deadline = time.perf_counter() + timeout_s
+        # The handler runs every few thousand VM steps; returning True interrupts the statement
+        conn.set_progress_handler(lambda: time.perf_counter() > deadline, 10000)
+        try:
+            return conn.execute(sql).fetchall()
+        except sqlite3.OperationalError as e:
+            if time.perf_counter() > deadline:
+                raise QueryTimeout(f"cancelled after {timeout_s:g}s") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+
+class EngineTarget(BenchmarkTarget):
+    """A database reached through a ConnectionManager's pooled engine"""
+
+    name = "engine"
+
+    def __init__(self, manager, dsn, label=None):
+        self.manager = manager
+        self.dsn = dsn
+        self.label = label or manager.engine(dsn).url.render_as_string(hide_password=True)
+
+    @contextmanager
+    def connect(self, timeout_s):
+        with self.manager.connect(self.dsn, timeout_s) as conn:
+            yield conn
+
+    def execute(self, conn, sql, timeout_s):
+        try:
+            return conn.exec_driver_sql(sql).fetchall()
+        except Exception as e:
+            if is_timeout(e):
+                raise QueryTimeout(f"cancelled after {timeout_s:g}s") from e
+            raise
+        finally:
+            # Each run starts a fresh transaction, and a failed one does not poison the next
+            conn.rollback()
+
+
+def is_read_only(sql):
+    """Whether a query starts with SELECT or WITH once leading comments are skipped"""
+    return _LEADING_COMMENTS.sub("", sql, count=1)[:6].upper().startswith(("SELECT", "WITH"))
+
+
+def _normalize(value):
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float) and math.isfinite(value) and value:
+        return round(value, FLOAT_DIGITS - 1 - int(math.floor(math.log10(abs(value)))))
+    return value
+
+
+def result_digests(rows):
+    """(ordered, unordered) digests of a result; equal unordered digests mean the same multiset of rows"""
+    lines = [repr(tuple(_normalize(value) for value in row)).encode() for row in rows]
+    ordered = hashlib.sha256(b"\n".join(lines)).hexdigest()
+    unordered = hashlib.sha256(b"\n".join(sorted(lines))).hexdigest()
+    return ordered, unordered
+
+
+def percentile(values, q):
+    """q-th quantile (0..1) of values with linear interpolation"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def latency_summary(result):
+    """p50/p95/p99, mean, min and max (ms) of a BenchmarkResult's measured runs"""
+    timings = result.timings_ms
+    if not timings:
+        return {"runs": 0, "p50": None, "p95": None, "p99": None, "mean": None, "min": None, "max": None}
+    return {
+        "runs": len(timings),
+        "p50": percentile(timings, 0.50),
+        "p95": percentile(timings, 0.95),
+        "p99": percentile(timings, 0.99),
+        "mean": statistics.fmean(timings),
+        "min": min(timings),
+        "max": max(timings),
+    }
+
+
+def equivalence(baseline, result):
+    """How result's rows compare with baseline's: identical, reordered, different, or unknown"""
+    if baseline.unordered_digest is None or result.unordered_digest is None:
+        return "not compared"
+    if baseline.ordered_digest == result.ordered_digest:
+        return "identical"
+    if baseline.unordered_digest == result.unordered_digest:
+        return "same rows, different order"
+    return f"different results ({baseline.rows:,} vs {result.rows:,} rows)"
+
+
+def _run_worker(target, queries, runs, warmup, timeout_s, offset, barrier):
+    """One client's samples: {label: {"timings", "rows", "digests", "errors", "timeouts"}}"""
+    samples = {label: {"timings": [], "rows": None, "digests": None, "errors": [], "timeouts": 0}
+               for label, _ in queries}
+    failed = set()
+    connected = False
+    try:
+        with target.connect(timeout_s) as conn:
+            connected = True
+
+            def run_once(label, sql, measured):
+                sample = samples[label]
+                started = time.perf_counter()
+                try:
+                    result = target.execute(conn, sql, timeout_s)
+                except QueryTimeout:
+                    # One timeout is enough; repeating it would only stretch the benchmark by N × timeout
+                    sample["timeouts"] += 1
+                    failed.add(label)
+                    return
+                except Exception as e:
+                    sample["errors"].append(str(e))
+                    failed.add(label)
+                    return
+                elapsed = (time.perf_counter() - started) * 1000
+                if sample["digests"] is None:
+                    sample["rows"] = len(result)
+                    sample["digests"] = result_digests(result)
+                if measured:
+                    sample["timings"].append(elapsed)
+
+            for _ in range(warmup):
+                for label, sql in queries:
+                    if label not in failed:
+                        run_once(label, sql, False)
+            try:
+                # The measured rounds overlap only when every worker has finished warming up
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            for round_number in range(runs):
+                # Alternate the order each round, and start each worker on a different foot
+                order = queries if (round_number + offset) % 2 == 0 else queries[::-1]
+                for label, sql in order:
+                    if label not in failed:
+                        run_once(label, sql, True)
+    except Exception:
+        if not connected:
+            # A worker that cannot connect must not leave the others waiting at the barrier
+            barrier.abort()
+        raise
+    return samples
+
+
+def run_benchmark(target, queries, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP, timeout_s=DEFAULT_TIMEOUT_S,
+                  concurrency=1):
+    """Time (label, sql) queries on a target; returns BenchmarkResults in query order
+
+    Only SELECT and WITH queries are run. Workers are threads: database drivers release the GIL
+    while a query executes, so they contend for the database rather than for Python.
+    """
+    queries = list(queries)
+    runnable = [(label, sql) for label, sql in queries if is_read_only(sql)]
+    concurrency = max(1, concurrency)
+    barrier = threading.Barrier(concurrency)
+    if concurrency == 1:
+        worker_samples = [_run_worker(target, runnable, runs, warmup, timeout_s, 0, barrier)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(_run_worker, target, runnable, runs, warmup, timeout_s, i, barrier)
+                       for i in range(concurrency)]
+            worker_samples = [future.result() for future in futures]
+
+    results = []
+    for label, sql in queries:
+        if (label, sql) not in runnable:
+            results.append(BenchmarkResult(label, sql, [], None, None, None,
+                                           ["only SELECT and WITH queries are benchmarked"], 0))
+            continue
+        timings, errors, timeouts, rows, digests = [], [], 0, None, (None, None)
+        for samples in worker_samples:
+            sample = samples[label]
+            timings.extend(sample["timings"])
+            errors.extend(sample["errors"])
+            timeouts += sample["timeouts"]
+            if sample["digests"] is not None and rows is None:
+                rows, digests = sample["rows"], sample["digests"]
+        results.append(BenchmarkResult(label, sql, timings, rows, digests[0], digests[1], errors, timeouts))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark an original query against rewritten versions")
+    parser.add_argument("queries", nargs="+", help="files with one query each; the first is the baseline")
+    parser.add_argument("--dsn", help="SQLAlchemy DSN to run against (default: a generated SQLite copy of --schema)")
+    parser.add_argument("--schema", default="E-commerce", help="sample schema for the generated stand-in")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_S, help="seconds per query run")
+    parser.add_argument("--concurrency", type=int, default=1, help="clients running the schedule at once")
+    args = parser.parse_args(argv)
+
+    queries = []
+    for path in args.queries:
+        with open(path, encoding="utf-8") as f:
+            queries.append((path, f.read().strip().rstrip(";")))
+    if args.dsn:
+        target = EngineTarget(ConnectionManager(pool_size=args.concurrency), args.dsn)
+    else:
+        from sqlopt.index_simulator import IndexSimulator
+        from sqlopt.schemas import SCHEMAS
+
+        simulator = IndexSimulator(SCHEMAS[args.schema])
+        queries = [(label, simulator.bind(sql)) for label, sql in queries]
+        target = SQLiteTarget.from_connection(simulator.conn, f"generated {args.schema} data")
+
+    results = run_benchmark(target, queries, args.runs, args.warmup, args.timeout, args.concurrency)
+    baseline = latency_summary(results[0])
+    print(f"{target.label}: {args.runs} runs × {args.concurrency} clients after {args.warmup} warm-up\n")
+    for result in results:
+        summary = latency_summary(result)
+        if not summary["runs"]:
+            reason = "timed out" if result.timeouts else "; ".join(result.errors[:1])
+            print(f"{result.label}: not measured ({reason})")
+            continue
+        speedup = f"  {baseline['p50'] / summary['p50']:.2f}x" if baseline["p50"] and summary["p50"] else ""
+        print(f"{result.label}: p50 {summary['p50']:.2f} ms  p95 {summary['p95']:.2f} ms  p99 {summary['p99']:.2f} ms"
+              f"  {result.rows:,} rows{speedup}")
+        if result is not results[0]:
+            print(f"    result vs {results[0].label}: {equivalence(results[0], result)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Change-point detection over many metric series at once.
+
+Each row of a ``series × buckets`` matrix (for example
+``MetricsStore.matrix(..., column="mean_ms")``) is tested for one shift in
+its mean with the CUSUM statistic. Latencies change multiplicatively, so the
+test runs on log values. For every split point the difference between the
+mean before and after is scaled by the pooled standard deviation of the two
+segments; the split with the largest score is the onset. Cumulative sums
+make every split of every series one vectorized pass, O(series × buckets),
+with empty buckets (NaN) left out of both segments.
+
+Confidence is one minus a Bonferroni-corrected two-sided p-value for the
+best split, so it accounts for having tried every bucket.
+"""
+import argparse
+import math
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_MIN_SIZE = 6
+DEFAULT_MIN_CONFIDENCE = 0.99
+DEFAULT_MIN_CHANGE = 0.2
+
+# One array per field, one entry per series; onset is -1 and magnitude 0 for series too short to test
+ChangePoints = namedtuple("ChangePoints", ["index", "onset", "before", "after", "magnitude", "score",
+                                           "confidence", "detected"])
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def detect_change_points(values, times=None, min_size=DEFAULT_MIN_SIZE, min_confidence=DEFAULT_MIN_CONFIDENCE,
+                         min_change=DEFAULT_MIN_CHANGE):
+    """The most significant mean shift in each row of a series × buckets matrix
+
+    index is the first bucket after the shift and onset its time (from times, when given).
+    before and after are the mean values either side; magnitude is after / before - 1.
+    A change is detected when its confidence and its relative size reach the minimums.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    rows, buckets = values.shape
+    observed = np.isfinite(values) & (values > 0)
+    logs = np.where(observed, np.log(np.where(observed, values, 1.0)), 0.0)
+
+    # Running count, sum and sum of squares of observed buckets up to each split point
+    n1 = np.cumsum(observed, axis=1, dtype=np.float64)[:, :-1]
+    s1 = np.cumsum(logs, axis=1)[:, :-1]
+    q1 = np.cumsum(logs * logs, axis=1)[:, :-1]
+    n = n1[:, -1:] + observed[:, -1:]
+    s = s1[:, -1:] + logs[:, -1:]
+    q = q1[:, -1:] + logs[:, -1:] ** 2
+    n2 = n - n1
+    valid = (n1 >= min_size) & (n2 >= min_size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean1 = s1 / n1
+        mean2 = (s - s1) / n2
+        # CUSUM statistic of a split: the mean difference weighted by segment sizes
+        weight = np.sqrt(n1 * n2 / n)
+        statistic = np.where(valid, np.abs(mean2 - mean1) * weight, -1.0)
+        split = statistic.argmax(axis=1)
+        pick = np.arange(rows), split
+        testable = statistic[pick] >= 0
+        # Pooled within-segment variance at the chosen split
+        residual = q - s1[pick][:, None] ** 2 / n1[pick][:, None] - (s - s1[pick][:, None]) ** 2 / n2[pick][:, None]
+        sigma = np.sqrt(np.maximum(residual[:, 0], 0) / np.maximum(n[:, 0] - 2, 1))
+        score = np.where(testable, statistic[pick] / np.maximum(sigma, 1e-9), 0.0)
+
+    p_values = np.minimum(_erfc(score / math.sqrt(2)).astype(np.float64) * np.maximum(valid.sum(axis=1), 1), 1.0)
+    confidence = np.where(testable, 1.0 - p_values, 0.0)
+    before = np.where(testable, np.exp(mean1[pick]), np.nan)
+    after = np.where(testable, np.exp(mean2[pick]), np.nan)
+    magnitude = np.where(testable, after / before - 1.0, 0.0)
+    index = np.where(testable, split + 1, -1)
+    if times is None:
+        onset = index
+    else:
+        times = np.asarray(times)
+        onset = np.where(testable, times[np.minimum(index, buckets - 1)], -1)
+    detected = testable & (confidence >= min_confidence) & (np.abs(magnitude) >= min_change)
+    return ChangePoints(index, onset, before, after, magnitude, score, confidence, detected)
+
+
+def main(argv=None):
+    from sqlopt.metrics_store import DEFAULT_METRICS_DIR, MetricsStore
+
+    parser = argparse.ArgumentParser(description="Find latency regressions in the per-query metrics store")
+    parser.add_argument("--metrics-dir", default=DEFAULT_METRICS_DIR, help="metrics store directory")
+    parser.add_argument("--days", type=float, default=30, help="history to scan")
+    parser.add_argument("--resolution", default="1h", choices=["1m", "1h", "1d"], help="bucket size")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--min-change", type=float, default=DEFAULT_MIN_CHANGE, help="relative change, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    store = MetricsStore(args.metrics_dir)
+    now = time.time()
+    times, values = store.matrix(now - args.days * 86400, now, args.resolution, "mean_ms")
+    started = time.perf_counter()
+    found = detect_change_points(values, times, min_confidence=args.min_confidence, min_change=args.min_change)
+    elapsed = time.perf_counter() - started
+    series = store.series()
+    for i in np.flatnonzero(found.detected & (found.magnitude > 0)):
+        onset = time.strftime("%Y-%m-%d %H:%M", time.gmtime(int(found.onset[i])))
+        print(f"{onset}  {found.before[i]:10.1f} ms -> {found.after[i]:10.1f} ms  "
+              f"{found.magnitude[i]:+7.0%}  {found.confidence[i]:.4f}  {series[i].label}")
+    print(f"\n{values.shape[0]:,} series x {values.shape[1]:,} buckets scanned in {elapsed:.2f}s: "
+          f"{int((found.detected & (found.magnitude > 0)).sum()):,} regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
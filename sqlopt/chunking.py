@@ -0,0 +1,151 @@
+"""Split oversized SQL code and execution plans into prompt-sized chunks.
+
+SQL is cut at statement boundaries (falling back to statement-starting lines
+inside very long procedure bodies); execution plans are cut at operator
+subtree boundaries, and every plan chunk remembers the chain of parent
+operators it hangs under. Both splitters run in time linear in the input.
+"""
+import re
+from collections import namedtuple
+
+import sqlparse
+
+# Rough token estimate used for budgeting (Claude averages ~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+Chunk = namedtuple("Chunk", ["text", "start_line", "end_line", "context"])
+
+_STATEMENT_START = re.compile(
+    r"^\s*(SELECT|INSERT|UPDATE|DELETE|MERGE|WITH|IF|ELSE|WHILE|BEGIN|DECLARE|SET|EXEC|EXECUTE|"
+    r"CREATE|ALTER|DROP|TRUNCATE|RETURN|OPEN|FETCH|CLOSE|DEALLOCATE|GO)\b",
+    re.IGNORECASE,
+)
+_PLAN_OPERATOR = re.compile(r"^\s*(->|\|--)")
+
+
+def estimate_tokens(text):
+    """Approximate the number of tokens in text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _pack(units, max_tokens):
+    """Greedily merge consecutive (lines, start_line, context) units into chunks"""
+    chunks = []
+    lines, start, context, used = [], None, None, 0
+
+    for unit_lines, unit_start, unit_context in units:
+        cost = sum(estimate_tokens(line) for line in unit_lines)
+        if lines and (used + cost > max_tokens or unit_context != context):
+            chunks.append(Chunk("\n".join(lines), start, start + len(lines) - 1, context))
+            lines, start, used = [], None, 0
+        if start is None:
+            start, context = unit_start, unit_context
+        lines.extend(unit_lines)
+        used += cost
+
+    if lines:
+        chunks.append(Chunk("\n".join(lines), start, start + len(lines) - 1, context))
+    return chunks
+
+
+def _split_long_statement(lines, first_line, max_tokens):
+    """Break one oversized statement into units at statement-starting lines"""
+    units, current, current_start, used = [], [], first_line, 0
+    for offset, line in enumerate(lines):
+        cost = estimate_tokens(line)
+        boundary = not line.strip() or _STATEMENT_START.match(line)
+        if current and used + cost > max_tokens and boundary:
+            units.append((current, current_start, ""))
+            current, current_start, used = [], first_line + offset, 0
+        current.append(line)
+        used += cost
+    if current:
+        units.append((current, current_start, ""))
+    return units
+
+
+def split_sql_code(sql_code, max_tokens):
+    """Split SQL code into chunks of at most ~max_tokens at statement boundaries"""
+    if estimate_tokens(sql_code) <= max_tokens:
+        return [Chunk(sql_code, 1, sql_code.count("\n") + 1, "")]
+
+    units = []
+    position = 0
+    line_no = 1
+    for statement in sqlparse.split(sql_code):
+        if not statement.strip():
+            continue
+        found = sql_code.find(statement, position)
+        if found >= 0:
+            line_no += sql_code.count("\n", position, found)
+            position = found + len(statement)
+        statement_lines = statement.split("\n")
+        if estimate_tokens(statement) > max_tokens:
+            units.extend(_split_long_statement(statement_lines, line_no, max_tokens))
+        else:
+            units.append((statement_lines, line_no, ""))
+        line_no += len(statement_lines) - 1
+
+    return _pack(units, max_tokens)
+
+
+def _plan_depth(line):
+    stripped = line.lstrip(" \t|")
+    return len(line) - len(stripped)
+
+
+def split_execution_plan(plan_text, max_tokens):
+    """Split an indented execution plan into chunks of at most ~max_tokens at subtree boundaries"""
+    if estimate_tokens(plan_text) <= max_tokens:
+        return [Chunk(plan_text, 1, plan_text.count("\n") + 1, "")]
+
+    lines = plan_text.split("\n")
+    n = len(lines)
+
+    # subtree_end[i] is the index one past the last line nested under line i;
+    # a single backwards pass with a monotonic stack keeps this linear.
+    depths = [_plan_depth(line) if line.strip() else None for line in lines]
+    subtree_end = [n] * n
+    stack = []
+    for i in range(n):
+        if depths[i] is None:
+            continue
+        while stack and depths[stack[-1]] >= depths[i]:
+            subtree_end[stack.pop()] = i
+        stack.append(i)
+
+    line_tokens = [estimate_tokens(line) for line in lines]
+    prefix = [0] * (n + 1)
+    for i, cost in enumerate(line_tokens):
+        prefix[i + 1] = prefix[i] + cost
+
+    units = []
+    # Work items: (first line index, end index, ancestor operator names)
+    work = [(0, n, ())]
+    while work:
+        i, end, ancestors = work.pop()
+        if i >= end:
+            continue
+        if depths[i] is None:
+            work.append((i + 1, end, ancestors))
+            continue
+
+        stop = min(subtree_end[i], end)
+        context = " > ".join(ancestors)
+        if prefix[stop] - prefix[i] <= max_tokens or stop == i + 1:
+            units.append((lines[i:stop], i + 1, context))
+            work.append((stop, end, ancestors))
+            continue
+
+        # Too big: keep the operator with its own property lines, then descend
+        header_end = i + 1
+        while header_end < stop and (depths[header_end] is None or
+                                     (not _PLAN_OPERATOR.match(lines[header_end]) and
+                                      subtree_end[header_end] == header_end + 1)):
+            header_end += 1
+        units.append((lines[i:header_end], i + 1, context))
+        operator = lines[i].strip().lstrip("->|- ").split("(")[0].strip()
+        work.append((stop, end, ancestors))
+        work.append((header_end, stop, ancestors + (operator,)))
+
+    return _pack(units, max_tokens)
@@ -0,0 +1,225 @@
+"""Pooled SQLAlchemy engines for the databases the app connects to.
+
+One ConnectionManager is shared by every session in a Streamlit process and
+keeps one engine per DSN, so reruns borrow pooled connections instead of
+opening new ones. Every engine pre-pings connections before handing them
+out. Each new connection gets a statement timeout and, unless disabled, a
+read-only session: ``default_transaction_read_only`` and
+``statement_timeout`` on PostgreSQL, ``TRANSACTION READ ONLY`` and
+``max_execution_time`` on MySQL, and ``query_only`` plus a progress-handler
+deadline on SQLite. Checkout waits are recorded for the sidebar's pool
+statistics.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 5
+DEFAULT_POOL_TIMEOUT_S = 10.0
+DEFAULT_POOL_RECYCLE_S = 1800
+DEFAULT_STATEMENT_TIMEOUT_S = 30.0
+
+
+class QueryTimeout(Exception):
+    """A statement ran past its timeout and was cancelled by the database"""
+
+
+def is_timeout(exc):
+    """Whether a DBAPI or SQLAlchemy error is a statement timeout"""
+    orig = getattr(exc, "orig", None) or exc
+    if getattr(orig, "pgcode", None) == "57014":  # PostgreSQL query_canceled
+        return True
+    if getattr(orig, "args", None) and orig.args[0] == 3024:  # MySQL max_execution_time exceeded
+        return True
+    return "interrupted" in str(orig) and type(orig).__module__ == "sqlite3"
+
+
+class ConnectionManager:
+    """Lazily created, pooled SQLAlchemy engines keyed by DSN"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, max_overflow=DEFAULT_MAX_OVERFLOW,
+                 pool_timeout_s=DEFAULT_POOL_TIMEOUT_S, pool_recycle_s=DEFAULT_POOL_RECYCLE_S,
+                 statement_timeout_s=DEFAULT_STATEMENT_TIMEOUT_S, read_only=True):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout_s = pool_timeout_s
+        self.pool_recycle_s = pool_recycle_s
+        self.statement_timeout_s = statement_timeout_s
+        self.read_only = read_only
+        self.engines = {}
+        self.lock = threading.Lock()
+        self.waits = {}
+        self.counters = {}
+
+    # Engines
+
+    def engine(self, dsn):
+        """The pooled engine for a DSN, created on first use"""
+        with self.lock:
+            engine = self.engines.get(dsn)
+            if engine is None:
+                engine = self.engines[dsn] = self._create_engine(dsn)
+                self.waits[dsn] = deque(maxlen=500)
+                self.counters[dsn] = {"checkouts": 0, "pool_timeouts": 0, "statement_timeouts": 0}
+            return engine
+
+    def _create_engine(self, dsn):
+        # SQLAlchemy takes a noticeable part of a second to import; only pages that connect pay for it
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.engine import make_url
+
+        url = make_url(dsn)
+        backend = url.get_backend_name()
+        options = {"pool_pre_ping": True}
+        if backend != "sqlite" or url.database not in (None, "", ":memory:"):
+            options.update(pool_size=self.pool_size, max_overflow=self.max_overflow,
+                           pool_timeout=self.pool_timeout_s, pool_recycle=self.pool_recycle_s)
+        if backend == "sqlite":
+            options["connect_args"] = {"check_same_thread": False}
+        engine = create_engine(url, **options)
+
+        @event.listens_for(engine, "connect")
+        def configure_session(dbapi_connection, connection_record):
+            self._configure(backend, dbapi_connection, connection_record)
+
+        @event.listens_for(engine, "handle_error")
+        def count_timeouts(context):
+            if is_timeout(context.original_exception):
+                with self.lock:
+                    self.counters[dsn]["statement_timeouts"] += 1
+
+        if backend == "sqlite":
+            @event.listens_for(engine, "before_cursor_execute")
+            def start_deadline(conn, cursor, statement, parameters, context, executemany):
+                timeout = conn.info.get("timeout_s", self.statement_timeout_s)
+                conn.info["deadline"][0] = time.perf_counter() + timeout if timeout else None
+
+        return engine
+
+    def _configure(self, backend, dbapi_connection, connection_record):
+        """Session settings for a new DBAPI connection"""
+        timeout_ms = int(self.statement_timeout_s * 1000)
+        if backend == "sqlite":
+            deadline = connection_record.info["deadline"] = [None]
+            # SQLite has no statement timeout; the progress handler interrupts statements past their deadline
+            dbapi_connection.set_progress_handler(
+                lambda: deadline[0] is not None and time.perf_counter() > deadline[0], 10000)
+            if self.read_only:
+                dbapi_connection.execute("PRAGMA query_only = ON")
+            return
+        if backend == "postgresql":
+            statements = [f"SET statement_timeout = {timeout_ms}"]
+            if self.read_only:
+                statements.append("SET default_transaction_read_only = on")
+        elif backend in ("mysql", "mariadb"):
+            statements = [f"SET SESSION max_execution_time = {timeout_ms}"]
+            if self.read_only:
+                statements.append("SET SESSION TRANSACTION READ ONLY")
+        else:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        # Settings made inside a transaction would be lost when the pool rolls it back
+        dbapi_connection.commit()
+
+    # Connections
+
+    @contextmanager
+    def connect(self, dsn, timeout_s=None):
+        """A pooled connection for a DSN, with an optional statement timeout for this checkout"""
+        from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+        engine = self.engine(dsn)
+        started = time.perf_counter()
+        try:
+            conn = engine.connect()
+        except PoolTimeout:
+            with self.lock:
+                self.counters[dsn]["pool_timeouts"] += 1
+            raise
+        with self.lock:
+            self.waits[dsn].append(time.perf_counter() - started)
+            self.counters[dsn]["checkouts"] += 1
+        try:
+            if timeout_s is not None:
+                self.set_timeout(conn, timeout_s)
+            yield conn
+        finally:
+            if timeout_s is not None and not conn.closed:
+                try:
+                    # A PostgreSQL timeout aborts the transaction, and the reset below would fail inside it
+                    if conn.in_transaction():
+                        conn.rollback()
+                    self.set_timeout(conn, self.statement_timeout_s)
+                finally:
+                    conn.close()
+            else:
+                conn.close()
+
+    def set_timeout(self, conn, timeout_s):
+        """Change the statement timeout of a checked-out connection"""
+        backend = conn.engine.url.get_backend_name()
+        timeout_ms = int(timeout_s * 1000)
+        if backend == "sqlite":
+            conn.info["timeout_s"] = timeout_s
+        elif backend == "postgresql":
+            # A plain SET survives the commit, so the setting holds for every statement on this checkout
+            conn.exec_driver_sql(f"SET statement_timeout = {timeout_ms}")
+            conn.commit()
+        elif backend in ("mysql", "mariadb"):
+            conn.exec_driver_sql(f"SET SESSION max_execution_time = {timeout_ms}")
+
+    def execute(self, dsn, sql, timeout_s=None):
+        """All rows of one statement on a pooled connection; raises QueryTimeout past the timeout"""
+        with self.connect(dsn, timeout_s) as conn:
+            try:
+                return conn.exec_driver_sql(sql).fetchall()
+            except Exception as e:
+                if is_timeout(e):
+                    raise QueryTimeout(str(getattr(e, "orig", e))) from e
+                raise
+
+    # Statistics
+
+    def stats(self):
+        """Per-DSN pool occupancy, checkout waits and counters, passwords hidden"""
+        with self.lock:
+            engines = dict(self.engines)
+            waits = {dsn: sorted(values) for dsn, values in self.waits.items()}
+            counters = {dsn: dict(values) for dsn, values in self.counters.items()}
+        stats = []
+        for dsn, engine in engines.items():
+            pool = engine.pool
+            # Only queue pools have a size; SQLite's in-memory pools hold one connection per thread
+            queued = hasattr(pool, "checkedout")
+            size = pool.size() if queued else 1
+            checked_out = pool.checkedout() if queued else 0
+            capacity = size + self.max_overflow if queued else 1
+            dsn_waits = waits[dsn]
+            stats.append(dict(
+                counters[dsn],
+                database=engine.url.render_as_string(hide_password=True),
+                pool_size=size,
+                capacity=capacity,
+                checked_out=checked_out,
+                overflow=max(pool.overflow(), 0) if queued else 0,
+                utilization=checked_out / capacity if capacity else 0.0,
+                avg_wait_s=sum(dsn_waits) / len(dsn_waits) if dsn_waits else 0.0,
+                p95_wait_s=dsn_waits[int(0.95 * (len(dsn_waits) - 1))] if dsn_waits else 0.0,
+                max_wait_s=dsn_waits[-1] if dsn_waits else 0.0,
+            ))
+        return stats
+
+    def dispose(self):
+        """Close every pooled connection"""
+        with self.lock:
+            engines = list(self.engines.values())
+            self.engines.clear()
+        for engine in engines:
+            engine.dispose()
@@ -0,0 +1,361 @@
+"""Shared core of the Streamlit app: AI backend, scheduler, caches and Claude calls.
+
+Everything here is process-wide (``st.cache_resource``) or per-session
+(``st.session_state``), so it is the one place page modules get the AI
+client and the helpers that call it through.
+"""
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import streamlit as st
+
+from sqlopt.batch_jobs import DEFAULT_BATCH_DIR, AnthropicBatchBackend, BatchJobStore, LocalBatchBackend
+from sqlopt.chunking import estimate_tokens
+from sqlopt.llm_backends import (DEFAULT_CLAUDE_MODEL, DEFAULT_REPLAY_PATH, AnthropicBackend,
+                                 RecordReplayBackend, StubBackend)
+from sqlopt.response_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
+from sqlopt.scheduler import AIScheduler, CircuitOpenError, default_is_retryable
+
+# What every page receives from the app shell on each run
+AppContext = namedtuple("AppContext", ["ai_client", "ai_scheduler", "ai_ready"])
+
+# Claude AI Integration (the SDK itself is imported on the first call)
+ANTHROPIC_AVAILABLE = importlib.util.find_spec("anthropic") is not None
+
+def get_claude_api_key():
+    """Look up the Claude API key in Streamlit secrets, then the environment"""
+    try:
+        # Streamlit Cloud secrets
+        return st.secrets["ANTHROPIC_API_KEY"]
+    except:
+        # Environment variable
+        return os.getenv("ANTHROPIC_API_KEY")
+
+CLAUDE_MODEL = os.getenv("SQLOPT_CLAUDE_MODEL", DEFAULT_CLAUDE_MODEL)
+
+# Select the AI backend: live Claude, record/replay, or the offline stub
+@st.cache_resource
+def get_ai_backend():
+    """Create the AI backend named by SQLOPT_LLM_BACKEND"""
+    backend = os.getenv("SQLOPT_LLM_BACKEND", "anthropic").lower()
+    replay_path = os.getenv("SQLOPT_REPLAY_PATH", DEFAULT_REPLAY_PATH)
+    
+    if backend == "stub":
+        return StubBackend(latency_s=float(os.getenv("SQLOPT_STUB_LATENCY_S", "0")))
+    if backend == "replay":
+        return RecordReplayBackend(replay_path, mode="replay", model=CLAUDE_MODEL,
+                                   latency_scale=float(os.getenv("SQLOPT_REPLAY_LATENCY_SCALE", "1")))
+    
+    if not ANTHROPIC_AVAILABLE:
+        return None
+    
+    api_key = get_claude_api_key()
+    if not api_key:
+        st.warning("🔑 Claude API key not found. Please add ANTHROPIC_API_KEY to your secrets or environment variables.")
+        return None
+    
+    # The SDK client is created on the first AI call, keeping it out of cold start
+    live = AnthropicBackend(api_key, CLAUDE_MODEL)
+    if backend == "record":
+        return RecordReplayBackend(replay_path, mode="record", inner=live)
+    return live
+
+def is_retryable_claude_error(exc):
+    """Retry rate limits, overloads, server errors and dropped connections"""
+    # The SDK is always loaded by the time one of its errors exists
+    anthropic = sys.modules.get("anthropic")
+    if anthropic is not None and isinstance(exc, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    return default_is_retryable(exc)
+
+# Shared rate limiter, retry policy and circuit breaker for every AI call in this process
+@st.cache_resource
+def get_ai_scheduler():
+    """Create the process-wide AI call scheduler"""
+    return AIScheduler(
+        requests_per_minute=int(os.getenv("SQLOPT_AI_RPM", "50")),
+        tokens_per_minute=int(os.getenv("SQLOPT_AI_TPM", "80000")),
+        max_retries=int(os.getenv("SQLOPT_AI_MAX_RETRIES", "4")),
+        failure_threshold=int(os.getenv("SQLOPT_AI_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("SQLOPT_AI_BREAKER_RESET_S", "30")),
+        is_retryable=is_retryable_claude_error,
+    )
+
+CIRCUIT_OPEN_MESSAGE = "❌ Claude AI is temporarily unavailable. Using fallback response."
+
+CACHE_ENABLED = os.getenv("SQLOPT_CACHE_ENABLED", "1") != "0"
+
+# Shared response cache (one per process, backed by a file shared by all processes)
+@st.cache_resource
+def get_response_cache():
+    """Open the on-disk Claude response cache"""
+    return ResponseCache(
+        path=os.getenv("SQLOPT_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_entries=int(os.getenv("SQLOPT_CACHE_MAX_ENTRIES", "5000")),
+        max_bytes=int(float(os.getenv("SQLOPT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        ttl_seconds=int(float(os.getenv("SQLOPT_CACHE_TTL_HOURS", "168")) * 3600),
+    )
+
+# Near-duplicate question cache for Natural Language to SQL (embedding model loads on first use)
+SEMANTIC_THRESHOLD = float(os.getenv("SQLOPT_SEMANTIC_THRESHOLD", "0.85"))
+
+@st.cache_resource
+def get_semantic_cache():
+    """Open the shared semantic cache of past NL-to-SQL answers"""
+    from sqlopt.semantic_cache import DEFAULT_SEMANTIC_CACHE_DIR, SemanticCache
+    
+    return SemanticCache(
+        path=os.getenv("SQLOPT_SEMANTIC_CACHE_DIR", DEFAULT_SEMANTIC_CACHE_DIR),
+        compact=os.getenv("SQLOPT_SEMANTIC_COMPACT", "0") == "1",
+    )
+
+# Offline batch jobs: Message Batches on the live API, a local stand-in otherwise
+@st.cache_resource
+def get_batch_store():
+    """Open the resumable batch job store"""
+    directory = os.getenv("SQLOPT_BATCH_DIR", DEFAULT_BATCH_DIR)
+    backend = os.getenv("SQLOPT_BATCH_BACKEND", "auto").lower()
+    ai_backend = get_ai_backend()
+    
+    if isinstance(ai_backend, AnthropicBackend) and backend in ("anthropic", "auto"):
+        return BatchJobStore(directory, AnthropicBatchBackend(ai_backend.client), CLAUDE_MODEL)
+    llm = ai_backend if ai_backend is not None and ai_backend.offline else StubBackend()
+    return BatchJobStore(directory, LocalBatchBackend(directory, llm), CLAUDE_MODEL)
+
+# What-if index measurements on a generated SQLite copy of a sample schema
+SIMULATOR_ROWS = int(os.getenv("SQLOPT_SIMULATOR_ROWS", "20000"))
+
+@st.cache_resource
+def get_index_simulator(schema_name):
+    """Build the shared SQLite stand-in for a sample schema"""
+    from sqlopt.index_simulator import IndexSimulator
+    from sqlopt.schemas import SCHEMAS
+    
+    return IndexSimulator(SCHEMAS[schema_name], rows=SIMULATOR_ROWS)
+
+# Pooled, read-only database connections shared by every session
+DATABASE_URL = os.getenv("SQLOPT_DATABASE_URL", "")
+
+@st.cache_resource
+def get_connection_manager():
+    """Create the process-wide pool of database engines, one per DSN"""
+    from sqlopt.connections import ConnectionManager
+    
+    return ConnectionManager(
+        pool_size=int(os.getenv("SQLOPT_DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("SQLOPT_DB_MAX_OVERFLOW", "5")),
+        pool_timeout_s=float(os.getenv("SQLOPT_DB_POOL_TIMEOUT_S", "10")),
+        pool_recycle_s=int(os.getenv("SQLOPT_DB_POOL_RECYCLE_S", "1800")),
+        statement_timeout_s=float(os.getenv("SQLOPT_DB_STATEMENT_TIMEOUT_S", "30")),
+        read_only=os.getenv("SQLOPT_DB_READ_ONLY", "1") != "0",
+    )
+
+# Before/after benchmarks: the configured database, or a snapshot of the simulator's generated data
+BENCHMARK_DSN = os.getenv("SQLOPT_BENCHMARK_DSN", DATABASE_URL)
+BENCHMARK_TIMEOUT_S = float(os.getenv("SQLOPT_BENCHMARK_TIMEOUT_S", "30"))
+
+@st.cache_resource
+def get_benchmark_target():
+    """Open the database that before/after benchmarks run against"""
+    from sqlopt.benchmark import EngineTarget, SQLiteTarget
+    
+    if BENCHMARK_DSN:
+        return EngineTarget(get_connection_manager(), BENCHMARK_DSN)
+    simulator = get_index_simulator("E-commerce")
+    with simulator.lock:
+        return SQLiteTarget.from_connection(simulator.conn, "generated E-commerce sample data")
+
+# Per-query metrics history, shared by every session and the processes writing it
+@st.cache_resource
+def get_metrics_store():
+    """Open the memory-mapped per-query metrics store"""
+    from sqlopt.metrics_store import DEFAULT_METRICS_DIR, MetricsStore
+    
+    return MetricsStore(os.getenv("SQLOPT_METRICS_DIR", DEFAULT_METRICS_DIR))
+
+# Background metrics collection and regression checks, one per deployment
+MONITOR_ENABLED = os.getenv("SQLOPT_MONITOR", "1") != "0"
+
+@st.cache_resource
+def get_monitor():
+    """Start the background monitor, unless disabled or already running in another process
+
+    Databases without statement statistics (e.g. SQLite) are monitored with the sample queries.
+    """
+    from sqlopt.monitor import DatabaseStatsSource, Monitor, SampleSource, has_statement_stats
+    
+    if DATABASE_URL and has_statement_stats(DATABASE_URL):
+        source = DatabaseStatsSource(get_connection_manager(), DATABASE_URL)
+    else:
+        source = SampleSource()
+    monitor = Monitor(get_metrics_store(), source)
+    if MONITOR_ENABLED:
+        monitor.start()
+    return monitor
+
+# Server-side slow-query logs the Performance Analyzer may read; unset allows uploads only
+SLOW_LOG_DIR = os.getenv("SQLOPT_SLOW_LOG_DIR", "")
+
+# Per-session record of AI call latency
+def record_ai_timing(label, first_token_s, total_s, cached=False):
+    """Remember time-to-first-token and total time for the latest AI calls"""
+    timings = st.session_state.setdefault("ai_timings", [])
+    timings.append({
+        "Call": label,
+        "First_Token_s": round(first_token_s, 2),
+        "Total_s": round(total_s, 2),
+        "Cached": cached,
+        "At": datetime.now().strftime("%H:%M:%S"),
+    })
+    del timings[:-50]
+
+def last_ai_timing_caption():
+    """Describe the most recent AI call's latency"""
+    timings = st.session_state.get("ai_timings")
+    if not timings:
+        return ""
+    last = timings[-1]
+    source = " (cached)" if last["Cached"] else ""
+    return f"⏱️ First token {last['First_Token_s']:.2f}s · Total {last['Total_s']:.2f}s{source}"
+
+# AI-powered functions
+def call_claude_api(client, prompt, max_tokens=2000, use_cache=True, stream=False, label="Claude"):
+    """Call Claude API with error handling and response caching"""
+    if stream:
+        return stream_claude_api(client, prompt, max_tokens, use_cache=use_cache, label=label)
+    
+    if not client:
+        return "❌ Claude AI not available. Using fallback response."
+    
+    started = time.perf_counter()
+    cache = get_response_cache() if use_cache and CACHE_ENABLED else None
+    key = cache_key(f"{client.name}:{client.model}", max_tokens, prompt)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            record_ai_timing(label, elapsed, elapsed, cached=True)
+            return cached
+    
+    try:
+        response = get_ai_scheduler().call(
+            lambda: client.complete(prompt, max_tokens),
+            tokens=estimate_tokens(prompt) + max_tokens
+        )
+        elapsed = time.perf_counter() - started
+        record_ai_timing(label, elapsed, elapsed)
+        if cache:
+            cache.put(key, response.text, model=client.model, max_tokens=max_tokens, latency=elapsed)
+        return response.text
+    except CircuitOpenError as e:
+        st.warning(f"⚠️ {str(e)}")
+        return CIRCUIT_OPEN_MESSAGE
+    except Exception as e:
+        st.error(f"❌ Claude API Error: {str(e)}")
+        return f"❌ API Error: {str(e)}"
+
+def stream_claude_api(client, prompt, max_tokens=2000, use_cache=True, label="Claude"):
+    """Yield Claude's response as text deltas, recording time-to-first-token and total time"""
+    if not client:
+        yield "❌ Claude AI not available. Using fallback response."
+        return
+    
+    started = time.perf_counter()
+    cache = get_response_cache() if use_cache and CACHE_ENABLED else None
+    key = cache_key(f"{client.name}:{client.model}", max_tokens, prompt)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            record_ai_timing(label, elapsed, elapsed, cached=True)
+            yield cached
+            return
+    
+    # Retries are only possible until the first token has been shown
+    scheduler = get_ai_scheduler()
+    tokens = estimate_tokens(prompt) + max_tokens
+    first_token = None
+    chunks = []
+    attempt = 0
+    while True:
+        try:
+            scheduler.acquire(tokens)
+        except CircuitOpenError as e:
+            st.warning(f"⚠️ {str(e)}")
+            yield CIRCUIT_OPEN_MESSAGE
+            return
+        try:
+            for text in client.stream(prompt, max_tokens):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                chunks.append(text)
+                yield text
+            scheduler.record_success()
+            break
+        except GeneratorExit:
+            # The page stopped reading mid-stream (e.g. a rerun); the call itself was healthy
+            scheduler.record_success()
+            raise
+        except Exception as e:
+            scheduler.record_failure(e)
+            if chunks or not scheduler.should_retry(e, attempt):
+                st.error(f"❌ Claude API Error: {str(e)}")
+                yield f"❌ API Error: {str(e)}"
+                return
+            scheduler.backoff(attempt, e)
+            attempt += 1
+    
+    elapsed = time.perf_counter() - started
+    record_ai_timing(label, first_token if first_token is not None else elapsed, elapsed)
+    if cache:
+        cache.put(key, "".join(chunks), model=client.model, max_tokens=max_tokens, latency=elapsed)
+
+# Async execution path for batches of prompts
+AI_CONCURRENCY = int(os.getenv("SQLOPT_AI_CONCURRENCY", "8"))
+
+async def call_claude_api_async(client, prompt, semaphore, max_tokens=2000, use_cache=True):
+    """Call Claude API asynchronously, holding a semaphore slot while the request is in flight"""
+    cache = get_response_cache() if use_cache and CACHE_ENABLED else None
+    key = cache_key(f"{client.name}:{client.model}", max_tokens, prompt)
+    if cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+    
+    try:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await get_ai_scheduler().call_async(
+                lambda: client.acomplete(prompt, max_tokens),
+                tokens=estimate_tokens(prompt) + max_tokens
+            )
+            latency = time.perf_counter() - started
+        if cache:
+            await asyncio.to_thread(cache.put, key, response.text, client.model, max_tokens, latency)
+        return response.text
+    except CircuitOpenError:
+        return CIRCUIT_OPEN_MESSAGE
+    except Exception as e:
+        return f"❌ API Error: {str(e)}"
+
+def run_claude_batch(client, prompts, max_tokens=2000, concurrency=AI_CONCURRENCY):
+    """Send prompts concurrently (at most `concurrency` in flight) and return responses in input order"""
+    if not client:
+        return ["❌ Claude AI not available. Using fallback response."] * len(prompts)
+    
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        try:
+            return await asyncio.gather(*[
+                call_claude_api_async(client, prompt, semaphore, max_tokens=max_tokens)
+                for prompt in prompts
+            ])
+        finally:
+            await client.aclose()
+    
+    return asyncio.run(run_all())
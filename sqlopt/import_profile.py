@@ -0,0 +1,162 @@
+"""Cold-start, per-module import-time and per-page rerun profile of the Streamlit app.
+
+Runs the app script once in a fresh interpreter (Streamlit "bare mode",
+which renders the default page without a server) under ``python -X
+importtime`` and reports the wall time plus the slowest imports::
+
+    python -m sqlopt.import_profile
+    python -m sqlopt.import_profile --json profile.json
+    python -m sqlopt.import_profile --compare profile.json
+    python -m sqlopt.import_profile --reruns 10
+
+Saving a profile with ``--json`` and later running with ``--compare`` shows
+how each package's import cost moved between two versions of the app.
+``--reruns`` also times warm reruns of every page with Streamlit's AppTest
+harness, i.e. the latency of a widget interaction once the page is loaded.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+_RUNNER = """
+import runpy, sys, time
+started = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__main__")
+print("SQLOPT_PROFILE_TOTAL", time.perf_counter() - started)
+"""
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into (module, self_s, cumulative_s, depth) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us) / 1e6, int(cumulative_us) / 1e6, len(indent) // 2))
+    return rows
+
+
+def profile_script(script=DEFAULT_SCRIPT, env=None):
+    """Run the script once in a fresh interpreter and collect its import timings"""
+    run_env = dict(os.environ, **(env or {}))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RUNNER, script],
+        capture_output=True, text=True, env=run_env, cwd=os.path.dirname(script) or None,
+    )
+    total = None
+    for line in completed.stdout.splitlines():
+        if line.startswith("SQLOPT_PROFILE_TOTAL"):
+            total = float(line.split()[1])
+    if total is None:
+        raise RuntimeError(f"Profiling run failed:\n{completed.stderr[-2000:]}")
+
+    rows = parse_importtime(completed.stderr)
+    packages = defaultdict(float)
+    for module, self_s, _, _ in rows:
+        packages[module.split(".")[0]] += self_s
+    return {
+        "script": script,
+        "total_s": total,
+        "import_s": sum(self_s for _, self_s, _, _ in rows),
+        "modules": len(rows),
+        "top_level": sorted(((m, c) for m, _, c, depth in rows if depth == 0), key=lambda r: -r[1]),
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])),
+    }
+
+
+def profile_reruns(script=DEFAULT_SCRIPT, reruns=10):
+    """Median and p90 warm rerun latency (seconds) of every page in the sidebar selector"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=120)
+    app.run()
+    results = {}
+    for page in app.sidebar.selectbox[0].options:
+        app.sidebar.selectbox[0].select(page).run()
+        timings = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        results[page] = {
+            "median_s": statistics.median(timings),
+            "p90_s": timings[int(0.9 * (len(timings) - 1))],
+        }
+    return results
+
+
+def format_report(profile, top=20, baseline=None):
+    """Human-readable summary of one profile, optionally against a baseline"""
+    lines = [
+        f"Script:        {profile['script']}",
+        f"Cold start:    {profile['total_s'] * 1000:8.1f} ms",
+        f"Import time:   {profile['import_s'] * 1000:8.1f} ms across {profile['modules']} modules",
+    ]
+    if baseline:
+        lines[1] += f"   (baseline {baseline['total_s'] * 1000:.1f} ms)"
+        lines[2] += f"   (baseline {baseline['import_s'] * 1000:.1f} ms)"
+
+    lines += ["", "Slowest top-level imports (cumulative ms):"]
+    for module, cumulative in profile["top_level"][:top]:
+        lines.append(f"  {cumulative * 1000:8.1f}  {module}")
+
+    lines += ["", "Import time by package (self ms):"]
+    names = list(profile["packages"])[:top]
+    if baseline:
+        names += [name for name in list(baseline["packages"])[:top] if name not in names]
+    for name in names:
+        line = f"  {profile['packages'].get(name, 0.0) * 1000:8.1f}  {name}"
+        if baseline:
+            line += f"  (baseline {baseline['packages'].get(name, 0.0) * 1000:.1f})"
+        lines.append(line)
+
+    if profile.get("reruns"):
+        lines += ["", "Warm rerun latency per page (median / p90 ms):"]
+        for page, timing in profile["reruns"].items():
+            line = f"  {timing['median_s'] * 1000:8.1f} / {timing['p90_s'] * 1000:6.1f}  {page}"
+            previous = (baseline or {}).get("reruns", {}).get(page)
+            if previous:
+                line += f"  (baseline {previous['median_s'] * 1000:.1f} / {previous['p90_s'] * 1000:.1f})"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the app's cold start and import times")
+    parser.add_argument("script", nargs="?", default=DEFAULT_SCRIPT)
+    parser.add_argument("--top", type=int, default=20, help="rows to show per table")
+    parser.add_argument("--runs", type=int, default=3, help="fresh runs to take the fastest of")
+    parser.add_argument("--json", help="save the profile to this file")
+    parser.add_argument("--compare", help="baseline profile saved earlier with --json")
+    parser.add_argument("--reruns", type=int, default=0, help="also time this many warm reruns of every page")
+    args = parser.parse_args(argv)
+
+    # The fastest run is the least disturbed by disk cache and scheduler noise
+    profile = min((profile_script(args.script) for _ in range(max(1, args.runs))), key=lambda p: p["total_s"])
+    if args.reruns:
+        profile["reruns"] = profile_reruns(args.script, args.reruns)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+    print(format_report(profile, args.top, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Find duplicate and left-prefix-redundant indexes in an index catalog.
+
+Indexes are inserted into one trie per (table, access method), keyed by
+their key columns in order, so an index whose columns end at a node with
+deeper entries is a left prefix of those longer indexes. A single
+post-order walk per trie then finds, for every index, a longer or equal
+index that serves the same lookups. It must have the same partial-index
+predicate, and its keys and INCLUDE columns must cover the shorter index's
+INCLUDE columns. Unique and primary-key indexes are never redundant
+because they enforce a constraint. The walk is linear in the total number
+of key columns, so catalogs with 100k+ indexes are checked in a couple
+of seconds.
+
+Command line::
+
+    psql -At -F, -c "$(python -c 'from sqlopt.index_redundancy import CATALOG_QUERY; print(CATALOG_QUERY)')" > catalog.csv
+    python -m sqlopt.index_redundancy catalog.csv
+"""
+import argparse
+import csv
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+CatalogIndex = namedtuple("CatalogIndex", ["name", "table", "columns", "include", "unique", "predicate", "size_mb",
+                                           "method"])
+Redundancy = namedtuple("Redundancy", ["index", "kind", "covered_by"])
+
+# Columns of the catalog CSV, in the order CATALOG_QUERY returns them
+CATALOG_COLUMNS = ["table", "name", "columns", "include", "unique", "predicate", "size_mb", "method"]
+
+# PostgreSQL catalog query producing CATALOG_COLUMNS; key and INCLUDE columns are separated by ";".
+# Tables and indexes are schema-qualified, so same-named tables in different schemas get separate tries
+# and the DROP INDEX statements printed for them name the right index.
+CATALOG_QUERY = """
+SELECT format('%I.%I', n.nspname, c.relname),
+       format('%I.%I', n.nspname, i.relname),
+       array_to_string(ARRAY(SELECT pg_get_indexdef(x.indexrelid, k, true)
+                             FROM generate_series(1, x.indnkeyatts) AS k ORDER BY k), ';'),
+       array_to_string(ARRAY(SELECT pg_get_indexdef(x.indexrelid, k, true)
+                             FROM generate_series(x.indnkeyatts + 1, x.indnatts) AS k ORDER BY k), ';'),
+       x.indisunique OR x.indisprimary,
+       coalesce(pg_get_expr(x.indpred, x.indrelid), ''),
+       round(pg_relation_size(x.indexrelid) / 1048576.0, 2),
+       am.amname
+FROM pg_index x
+JOIN pg_class c ON c.oid = x.indrelid
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_am am ON am.oid = i.relam
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')
+""".strip()
+
+
+def make_index(name, table, columns, include=(), unique=False, predicate="", size_mb=0.0, method="btree"):
+    """CatalogIndex with normalized names: lower case, single spaces, ASC dropped"""
+    def normalize(column):
+        column = " ".join(column.lower().split())
+        return column[:-4] if column.endswith(" asc") else column
+    return CatalogIndex(name, table.lower(), tuple(normalize(c) for c in columns),
+                        tuple(sorted(normalize(c) for c in include)), bool(unique),
+                        " ".join((predicate or "").lower().split()), float(size_mb or 0.0), (method or "btree").lower())
+
+
+class _Node:
+    __slots__ = ("children", "indexes")
+
+    def __init__(self):
+        self.children = {}
+        self.indexes = []
+
+
+def _covers(longer, shorter):
+    """Whether longer serves every lookup shorter does (key prefix already established)"""
+    return longer.predicate == shorter.predicate and set(shorter.include) <= set(longer.columns) | set(longer.include)
+
+
+def _preference(index):
+    # The index to keep among equals: constraints first, then the widest, then the smallest on disk
+    return (not index.unique, -len(index.include), index.size_mb, index.name)
+
+
+def find_redundant(indexes):
+    """Redundancy records for every index another index makes unnecessary"""
+    tries = defaultdict(_Node)
+    for index in indexes:
+        node = tries[index.table, index.method]
+        for column in index.columns:
+            node = node.children.setdefault(column, _Node())
+        node.indexes.append(index)
+
+    found = []
+    for (_, method), root in tries.items():
+        if method != "btree":
+            # Only B-tree keys have left-prefix semantics; other methods can still be exact duplicates
+            _exact_duplicates(root, found)
+            continue
+        # Post-order walk with an explicit stack; each node yields the indexes strictly below it
+        below = {}
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+                continue
+            deeper = []
+            for child in node.children.values():
+                deeper.extend(below.pop(id(child)))
+            _check_node(node, deeper, found)
+            # Only one covering candidate per predicate and INCLUDE set needs to travel upwards
+            representatives = {}
+            for index in deeper + node.indexes:
+                key = (index.predicate, index.include)
+                if key not in representatives or len(index.columns) > len(representatives[key].columns):
+                    representatives[key] = index
+            below[id(node)] = list(representatives.values())
+    return found
+
+
+def _drop_duplicates(indexes, found):
+    """Indexes left after recording exact duplicates; the preferred one of each group survives"""
+    survivors = []
+    for index in sorted(indexes, key=_preference):
+        # Constraints sort first, so a unique index is only ever a duplicate of another unique one
+        twin = next((kept for kept in survivors if kept.include == index.include and kept.predicate == index.predicate),
+                    None)
+        if twin is None:
+            survivors.append(index)
+        else:
+            found.append(Redundancy(index, "duplicate", twin))
+    return survivors
+
+
+def _check_node(node, deeper, found):
+    """Duplicates among the indexes ending at node, then prefixes of longer indexes"""
+    survivors = _drop_duplicates(node.indexes, found)
+    for index in survivors:
+        if index.unique:
+            continue
+        cover = next((longer for longer in deeper if _covers(longer, index)), None) or \
+            next((other for other in survivors if set(index.include) < set(other.include) and _covers(other, index)),
+                 None)
+        if cover is not None:
+            kind = "prefix" if len(cover.columns) > len(index.columns) else "include"
+            found.append(Redundancy(index, kind, cover))
+
+
+def _exact_duplicates(root, found):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        stack.extend(node.children.values())
+        _drop_duplicates(node.indexes, found)
+
+
+def reclaimable(indexes, redundancies):
+    """Per-table savings from dropping the redundant indexes
+
+    Returns {table: {"indexes", "redundant", "size_mb", "write_amplification_before", "..._after"}};
+    write amplification counts the heap plus every index written for one inserted row.
+    """
+    redundant_names = {(r.index.table, r.index.name) for r in redundancies}
+    tables = {}
+    for index in indexes:
+        entry = tables.setdefault(index.table, {"indexes": 0, "redundant": 0, "size_mb": 0.0})
+        entry["indexes"] += 1
+        if (index.table, index.name) in redundant_names:
+            entry["redundant"] += 1
+            entry["size_mb"] += index.size_mb
+    for entry in tables.values():
+        entry["write_amplification_before"] = 1 + entry["indexes"]
+        entry["write_amplification_after"] = 1 + entry["indexes"] - entry["redundant"]
+    return tables
+
+
+def describe_redundancy(redundancy):
+    """One readable line for a Redundancy"""
+    index, cover = redundancy.index, redundancy.covered_by
+    what = {"duplicate": "duplicates", "prefix": "is a left prefix of", "include": "is covered by"}[redundancy.kind]
+    return (f"{index.name} on {index.table}({', '.join(index.columns)}) {what} {cover.name} "
+            f"({', '.join(cover.columns)}{'; INCLUDE ' + ', '.join(cover.include) if cover.include else ''})")
+
+
+def read_catalog(path):
+    """CatalogIndexes from a CSV in CATALOG_COLUMNS order (a header row is skipped)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0] == "table":
+                continue
+            table, name, columns, include, unique, predicate, size_mb, method = (row + [""] * 8)[:8]
+            yield make_index(name, table, [c for c in columns.split(";") if c],
+                             [c for c in include.split(";") if c], unique.lower() in ("t", "true", "1", "yes"),
+                             predicate, size_mb or 0.0, method or "btree")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate and prefix-redundant indexes in a catalog CSV")
+    parser.add_argument("catalog", help=f"CSV with columns {', '.join(CATALOG_COLUMNS)}")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    indexes = list(read_catalog(args.catalog))
+    started = time.perf_counter()
+    redundancies = find_redundant(indexes)
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        for redundancy in sorted(redundancies, key=lambda r: -r.index.size_mb):
+            print(f"{redundancy.index.size_mb:10.1f} MB  DROP INDEX {redundancy.index.name};  -- "
+                  f"{describe_redundancy(redundancy)}")
+    tables = reclaimable(indexes, redundancies)
+    size = sum(t["size_mb"] for t in tables.values())
+    print(f"\n{len(indexes):,} indexes on {len(tables):,} tables checked in {elapsed:.2f}s: "
+          f"{len(redundancies):,} redundant, {size:,.1f} MB reclaimable")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,521 @@
+"""Cost-based index selection for a fingerprinted workload.
+
+Each query template is scanned once for the columns it filters on
+(equality and range predicates in WHERE and JOIN ... ON), sorts or groups
+by, and reads. From those, per-table candidates are built: equality
+columns followed by one range column, ordered variants that let the index
+supply ORDER BY/GROUP BY, covering variants with INCLUDE columns, and
+single-column indexes. A PostgreSQL-flavoured cost model estimates what
+each template pays with and without a candidate, and a lazy greedy search
+(benefit per MB, re-evaluated only when a candidate reaches the top of the
+heap) picks indexes until the storage budget or the write-overhead budget
+runs out. Work is linear in the workload size, so 50k templates over
+thousands of tables take seconds.
+
+Command line::
+
+    python -m sqlopt.index_selection workload.sql --budget-mb 500 --max-write-overhead 200
+"""
+import argparse
+import heapq
+import math
+import re
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+from sqlopt.fingerprint import aggregate
+
+TableStats = namedtuple("TableStats", ["rows", "distinct", "width"])
+IndexCandidate = namedtuple("IndexCandidate", ["table", "columns", "include"])
+IndexRecommendation = namedtuple("IndexRecommendation", ["table", "columns", "include", "size_mb", "benefit",
+                                                         "write_overhead", "templates"])
+
+DEFAULT_TABLE_ROWS = 100000
+DEFAULT_COLUMN_WIDTH = 8
+# Equality on a column with unknown statistics, and any range predicate (PostgreSQL's defaults)
+DEFAULT_EQ_SELECTIVITY = 0.005
+RANGE_SELECTIVITY = 1 / 3
+MAX_KEY_COLUMNS = 4
+MAX_INCLUDE_COLUMNS = 4
+
+# Planner cost constants, as in postgresql.conf
+SEQ_PAGE_COST = 1.0
+RANDOM_PAGE_COST = 4.0
+CPU_TUPLE_COST = 0.01
+CPU_INDEX_TUPLE_COST = 0.005
+# Maintaining one index entry on a write dirties a leaf page
+INDEX_WRITE_COST = RANDOM_PAGE_COST + CPU_INDEX_TUPLE_COST
+PAGE_BYTES = 8192
+INDEX_TUPLE_OVERHEAD = 16
+INDEX_FILL = 0.9
+
+_NAME = r'(?:"[^"]*"|[A-Za-z_][\w$]*)'
+# Dotted names (schema.table, alias.column, alias.*) come out as one token
+_TOKEN = re.compile(rf"'(?:[^']|'')*'|{_NAME}(?:\.(?:{_NAME}|\*))*|\?|<=|>=|<>|!=|[=<>(),*;]|\S")
+_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "ON",
+    "USING", "GROUP", "ORDER", "BY", "HAVING", "LIMIT", "OFFSET", "UNION", "ALL", "EXCEPT", "INTERSECT", "AS",
+    "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "ILIKE", "BETWEEN", "EXISTS", "CASE", "WHEN", "THEN",
+    "ELSE", "END", "DISTINCT", "ASC", "DESC", "NULLS", "FIRST", "LAST", "INSERT", "INTO", "VALUES", "UPDATE",
+    "SET", "DELETE", "RETURNING", "WITH", "LATERAL", "FETCH", "FOR", "TOP", "WINDOW", "OVER", "PARTITION",
+}
+_CLAUSE_STARTS = {"SELECT", "FROM", "WHERE", "ON", "HAVING", "LIMIT", "OFFSET", "SET", "VALUES", "RETURNING",
+                  "INTO", "USING", "UNION", "EXCEPT", "INTERSECT"}
+_JOIN_WORDS = {"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "LATERAL"}
+_EQ_OPERATORS = {"=", "IN", "IS"}
+_RANGE_OPERATORS = {"<", ">", "<=", ">=", "BETWEEN", "LIKE"}
+
+
+class Access:
+    """How one query scope uses one table: predicates, ordering and the columns it reads"""
+
+    __slots__ = ("table", "eq", "range", "order", "reads", "reads_all")
+
+    def __init__(self, table):
+        self.table = table
+        self.eq = []
+        self.range = []
+        self.order = []
+        self.reads = set()
+        self.reads_all = False
+
+
+class _Scope:
+    __slots__ = ("parent", "depth", "resume", "aliases", "tables", "refs", "select_star")
+
+    def __init__(self, parent, depth, resume=None):
+        self.parent = parent
+        self.depth = depth
+        # The clause of the enclosing scope to return to after the closing parenthesis
+        self.resume = resume
+        self.aliases = {}
+        self.tables = []
+        # (qualifier, column, role) with role "eq", "range", "read", or ("order", position)
+        self.refs = []
+        self.select_star = False
+
+
+def _tokens(template):
+    """[(upper, text)] tokens, with identifier quotes removed"""
+    tokens = []
+    for text in _TOKEN.findall(template):
+        if '"' in text and text[0] != "'":
+            text = text.replace('"', "")
+        tokens.append((text.upper(), text))
+    return tokens
+
+
+def _is_name(upper, text):
+    return (text[0].isalpha() or text[0] == "_") and upper not in _KEYWORDS
+
+
+def analyze_template(template):
+    """(scopes, ctes, writes) of one template, before columns are resolved to tables
+
+    ``writes`` is [kind, table, columns set] for INSERT/UPDATE/DELETE, else None.
+    """
+    tokens = _tokens(template)
+    root = _Scope(None, 0)
+    scopes = [root]
+    scope = root
+    clause = None
+    depth = 0
+    writes = None
+    ctes = set()
+    expect_table = False
+    order_position = 0
+    n = len(tokens)
+    for i, (upper, text) in enumerate(tokens):
+        if upper == "(":
+            depth += 1
+            if i + 1 < n and tokens[i + 1][0] in ("SELECT", "WITH"):
+                scope = _Scope(scope, depth, clause)
+                scopes.append(scope)
+                clause = None
+            continue
+        if upper == ")":
+            if scope.parent is not None and depth == scope.depth:
+                clause = scope.resume
+                scope = scope.parent
+                expect_table = False
+            depth -= 1
+            continue
+        if upper == "WITH":
+            clause = "WITH"
+            continue
+        if clause == "WITH" and i + 2 < n and tokens[i + 1][0] == "AS" and tokens[i + 2][0] == "(":
+            ctes.add(text.lower())
+            continue
+        if upper in ("ORDER", "GROUP") and i + 1 < n and tokens[i + 1][0] == "BY":
+            clause = upper
+            order_position = 0
+            continue
+        if upper in _CLAUSE_STARTS or upper in _JOIN_WORDS:
+            clause = "FROM" if upper in _JOIN_WORDS else upper
+            # DELETE ... USING names a table; JOIN ... USING (columns) does not
+            expect_table = upper in ("FROM", "JOIN", "INTO") or (upper == "USING" and i + 1 < n and
+                                                                 tokens[i + 1][0] != "(")
+            continue
+        if upper in ("INSERT", "DELETE", "UPDATE"):
+            writes = [upper, None, set()]
+            clause = "UPDATE" if upper == "UPDATE" else None
+            expect_table = upper == "UPDATE"
+            continue
+
+        if clause in ("FROM", "UPDATE", "INTO") and depth == scope.depth:
+            if upper == ",":
+                expect_table = clause == "FROM"
+                continue
+            if expect_table and _is_name(upper, text):
+                table = text.split(".")[-1].lower()
+                scope.tables.append(table)
+                scope.aliases[table] = table
+                if writes is not None and writes[1] is None and scope is root:
+                    writes[1] = table
+                expect_table = False
+                # An alias may follow, with or without AS
+                j = i + 1
+                if j < n and tokens[j][0] == "AS":
+                    j += 1
+                if j < n and _is_name(*tokens[j]) and "." not in tokens[j][1]:
+                    scope.aliases[tokens[j][1].lower()] = table
+                continue
+            if clause == "FROM":
+                continue
+        if clause in ("FROM", "UPDATE", "INTO", "VALUES", "LIMIT", "OFFSET", "RETURNING", "USING", "WITH", None):
+            continue
+
+        if upper == "*" and clause == "SELECT":
+            if i == 0 or tokens[i - 1][0] != "(":
+                scope.select_star = True
+            continue
+        if upper.endswith(".*") and clause == "SELECT":
+            scope.refs.append((text[:-2].lower(), "*", "read"))
+            continue
+        if not _is_name(upper, text) or (i + 1 < n and tokens[i + 1][0] == "("):
+            if clause in ("ORDER", "GROUP") and upper == ",":
+                order_position += 1
+            continue
+        qualifier, _, column = text.lower().rpartition(".")
+        if clause == "SET":
+            if i + 1 < n and tokens[i + 1][0] == "=" and writes is not None:
+                writes[2].add(column)
+            else:
+                scope.refs.append((qualifier, column, "read"))
+            continue
+        if clause in ("ORDER", "GROUP"):
+            scope.refs.append((qualifier, column, ("order", order_position)))
+            continue
+        if clause in ("WHERE", "ON", "HAVING"):
+            role = _predicate_role(tokens, i)
+            scope.refs.append((qualifier, column, role))
+            continue
+        scope.refs.append((qualifier, column, "read"))
+    return scopes, ctes, writes
+
+
+def _predicate_role(tokens, i):
+    """eq or range when the column is compared directly, else read"""
+    n = len(tokens)
+    following = tokens[i + 1][0] if i + 1 < n else ""
+    if following == "NOT":
+        return "read"
+    if following in _EQ_OPERATORS:
+        return "eq"
+    if following in _RANGE_OPERATORS:
+        if following == "LIKE" and i + 2 < n and tokens[i + 2][0].startswith("'%"):
+            return "read"
+        return "range"
+    preceding = tokens[i - 1][0] if i else ""
+    if preceding == "=" and i >= 2 and tokens[i - 2][0] not in ("(", ","):
+        return "eq"
+    if preceding in ("<", ">", "<=", ">="):
+        return "range"
+    return "read"
+
+
+class Workload:
+    """Table accesses and write rates of a fingerprinted workload, resolved against a schema"""
+
+    def __init__(self, schema=None, stats=None):
+        self.schema = {table.lower(): [c.lower() for c in columns] for table, columns in (schema or {}).items()}
+        self.stats = stats or {}
+        self.column_tables = defaultdict(list)
+        for table, columns in self.schema.items():
+            for column in columns:
+                self.column_tables[column].append(table)
+        # [(calls, [Access])] per template, and per-table write calls: table -> [(calls, kind, columns)]
+        self.templates = []
+        self.writes = defaultdict(list)
+        self.skipped = 0
+        self._pages = {}
+
+    def add(self, template, calls=1):
+        try:
+            scopes, ctes, writes = analyze_template(template)
+        except IndexError:
+            self.skipped += 1
+            return
+        accesses = []
+        for scope in scopes:
+            accesses.extend(self._resolve(scope, ctes))
+        if writes and writes[1]:
+            self.writes[writes[1]].append((calls, writes[0], writes[2]))
+        if accesses:
+            self.templates.append((template, calls, accesses))
+
+    def _resolve(self, scope, ctes):
+        by_table = {}
+        for table in scope.tables:
+            if table in ctes or (self.schema and table not in self.schema):
+                continue
+            access = by_table.setdefault(table, Access(table))
+            access.reads_all = scope.select_star
+        for qualifier, column, role in scope.refs:
+            table = self._table_of(scope, qualifier, column)
+            if table is None or table not in by_table:
+                continue
+            access = by_table[table]
+            if column == "*":
+                access.reads_all = True
+                continue
+            access.reads.add(column)
+            if role == "eq" and column not in access.eq:
+                access.eq.append(column)
+            elif role == "range" and column not in access.range:
+                access.range.append(column)
+            elif isinstance(role, tuple) and column not in access.order:
+                access.order.append(column)
+        return by_table.values()
+
+    def _table_of(self, scope, qualifier, column):
+        while scope is not None:
+            if qualifier:
+                if qualifier in scope.aliases:
+                    return scope.aliases[qualifier]
+            else:
+                owners = [t for t in scope.tables if t in self.column_tables.get(column, ())]
+                if len(owners) == 1:
+                    return owners[0]
+                if not owners and len(scope.tables) == 1 and scope.tables[0] not in self.schema:
+                    return scope.tables[0]
+            scope = scope.parent
+        return None
+
+    # Statistics
+
+    def rows(self, table):
+        stats = self.stats.get(table)
+        return stats.rows if stats else DEFAULT_TABLE_ROWS
+
+    def width(self, table, column):
+        stats = self.stats.get(table)
+        return stats.width.get(column, DEFAULT_COLUMN_WIDTH) if stats and stats.width else DEFAULT_COLUMN_WIDTH
+
+    def selectivity(self, table, column):
+        stats = self.stats.get(table)
+        if stats and stats.distinct and stats.distinct.get(column):
+            return 1.0 / stats.distinct[column]
+        return DEFAULT_EQ_SELECTIVITY
+
+    def table_pages(self, table):
+        if table not in self._pages:
+            columns = self.schema.get(table) or ()
+            row_width = 24 + sum(self.width(table, c) for c in columns) if columns else 100
+            self._pages[table] = max(1.0, self.rows(table) * row_width / PAGE_BYTES)
+        return self._pages[table]
+
+
+# Cost model
+
+def scan_cost(workload, access):
+    """Sequential scan plus the sort the query needs when no index supplies the order"""
+    rows = workload.rows(access.table)
+    cost = workload.table_pages(access.table) * SEQ_PAGE_COST + rows * CPU_TUPLE_COST
+    if access.order:
+        matched = rows * _filter_selectivity(workload, access)
+        cost += 2 * CPU_TUPLE_COST * matched * math.log2(matched + 2)
+    return cost
+
+
+def _filter_selectivity(workload, access):
+    selectivity = 1.0
+    for column in access.eq:
+        selectivity *= workload.selectivity(access.table, column)
+    for _ in access.range:
+        selectivity *= RANGE_SELECTIVITY
+    return selectivity
+
+
+def index_cost(workload, access, candidate):
+    """Cost of answering the access through the candidate, or None when it cannot use it"""
+    rows = workload.rows(access.table)
+    selectivity = 1.0
+    eq_used = 0
+    for column in candidate.columns:
+        if column not in access.eq:
+            break
+        selectivity *= workload.selectivity(access.table, column)
+        eq_used += 1
+    rest = list(candidate.columns[eq_used:])
+    range_used = bool(rest) and rest[0] in access.range
+    if range_used:
+        selectivity *= RANGE_SELECTIVITY
+    # After the equality prefix, the index is in the order the query asks for
+    ordered = bool(access.order) and rest[:len(access.order)] == access.order
+    if not eq_used and not range_used and not ordered:
+        return None
+    covering = not access.reads_all and access.reads <= set(candidate.columns) | set(candidate.include)
+    matched = rows * selectivity
+    height = max(1.0, math.log(rows + 1, 256))
+    cost = height * RANDOM_PAGE_COST + matched * (CPU_INDEX_TUPLE_COST + CPU_TUPLE_COST)
+    if not covering:
+        # Heap fetches, capped at reading every page of the table once
+        cost += min(matched, workload.table_pages(access.table)) * RANDOM_PAGE_COST
+    if access.order and not ordered:
+        cost += 2 * CPU_TUPLE_COST * matched * math.log2(matched + 2)
+    return cost
+
+
+def index_size_mb(workload, candidate):
+    width = sum(workload.width(candidate.table, c) for c in candidate.columns + candidate.include)
+    return workload.rows(candidate.table) * (width + INDEX_TUPLE_OVERHEAD) / INDEX_FILL / (1024 * 1024)
+
+
+def write_overhead(workload, candidate):
+    """Index entries written per workload run to maintain the candidate"""
+    total = 0
+    indexed = set(candidate.columns) | set(candidate.include)
+    for calls, kind, columns in workload.writes.get(candidate.table, ()):
+        if kind != "UPDATE" or indexed & columns:
+            total += calls
+    return total
+
+
+# Candidate generation
+
+def candidates_for(workload, access):
+    """Candidate indexes that could serve one access"""
+    eq = sorted(access.eq, key=lambda c: workload.selectivity(access.table, c))[:MAX_KEY_COLUMNS]
+    keys = []
+    if eq or access.range:
+        keys.append(tuple(eq + access.range[:1])[:MAX_KEY_COLUMNS])
+    if access.order and len(eq) + len(access.order) <= MAX_KEY_COLUMNS:
+        keys.append(tuple(eq + [c for c in access.order if c not in eq]))
+    keys.extend((column,) for column in eq[1:] + access.range[1:2])
+    found = set()
+    for key in keys:
+        found.add(IndexCandidate(access.table, key, ()))
+        extra = sorted(access.reads - set(key))
+        if not access.reads_all and 0 < len(extra) <= MAX_INCLUDE_COLUMNS:
+            found.add(IndexCandidate(access.table, key, tuple(extra)))
+    return found
+
+
+def select_indexes(workload, budget_mb, max_write_overhead=None, existing=()):
+    """Greedy selection of IndexRecommendations under storage and write-overhead budgets
+
+    ``max_write_overhead`` caps the index entries written per workload run, as a percentage of the
+    rows the workload writes; None means no cap. ``existing`` indexes are assumed present.
+    """
+    total_writes = sum(calls for writes in workload.writes.values() for calls, _, _ in writes)
+    write_budget = None if max_write_overhead is None else total_writes * max_write_overhead / 100
+
+    # Current best cost per access, and which accesses each candidate helps at what cost
+    current = []
+    serves = defaultdict(list)
+    for template, calls, accesses in workload.templates:
+        for access in accesses:
+            slot = len(current)
+            current.append(scan_cost(workload, access))
+            for candidate in candidates_for(workload, access):
+                cost = index_cost(workload, access, candidate)
+                if cost is not None:
+                    serves[candidate].append((slot, calls, cost, template))
+            for candidate in existing:
+                if candidate.table == access.table:
+                    cost = index_cost(workload, access, candidate)
+                    if cost is not None and cost < current[slot]:
+                        current[slot] = cost
+
+    writes = {candidate: write_overhead(workload, candidate) for candidate in serves}
+
+    def gain(candidate):
+        """Read cost saved over the indexes chosen so far, less the candidate's maintenance cost"""
+        saved = sum(calls * (current[slot] - cost) for slot, calls, cost, _ in serves[candidate]
+                    if cost < current[slot])
+        return saved - writes[candidate] * INDEX_WRITE_COST
+
+    sizes = {candidate: max(index_size_mb(workload, candidate), 1e-6) for candidate in serves}
+    heap = [(-gain(c) / sizes[c], 0, c) for c in serves if c not in existing]
+    heapq.heapify(heap)
+    chosen = []
+    used_mb = 0.0
+    used_writes = 0
+    round_number = 0
+    while heap:
+        negative_density, evaluated, candidate = heapq.heappop(heap)
+        if negative_density >= 0:
+            break
+        size = sizes[candidate]
+        if used_mb + size > budget_mb or (write_budget is not None and
+                                           used_writes + writes[candidate] > write_budget):
+            continue
+        if evaluated != round_number:
+            # Gains only shrink as indexes are chosen, so a stale entry is re-scored and re-queued
+            heapq.heappush(heap, (-gain(candidate) / size, round_number, candidate))
+            continue
+        benefit = -negative_density * size
+        helped = set()
+        for slot, calls, cost, template in serves[candidate]:
+            if cost < current[slot]:
+                current[slot] = cost
+                helped.add(template)
+        chosen.append(IndexRecommendation(candidate.table, candidate.columns, candidate.include, size, benefit,
+                                          writes[candidate], sorted(helped)))
+        used_mb += size
+        used_writes += writes[candidate]
+        round_number += 1
+    return chosen
+
+
+def workload_from_statements(statements, schema=None, stats=None):
+    """Workload built from raw SQL statements, fingerprinted into templates"""
+    workload = Workload(schema, stats)
+    for template in aggregate(statements):
+        workload.add(template.template, template.calls)
+    return workload
+
+
+def create_statement(recommendation):
+    """CREATE INDEX statement for a recommendation"""
+    name = f"idx_{recommendation.table}_{'_'.join(recommendation.columns)}"[:63]
+    include = f" INCLUDE ({', '.join(recommendation.include)})" if recommendation.include else ""
+    return f"CREATE INDEX {name} ON {recommendation.table}({', '.join(recommendation.columns)}){include}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Choose indexes for a SQL workload under storage and write budgets")
+    parser.add_argument("workload", help="file with one statement per line")
+    parser.add_argument("--budget-mb", type=float, default=1024)
+    parser.add_argument("--max-write-overhead", type=float, default=None,
+                        help="index writes per workload run, as a percentage of rows written")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(args.workload, encoding="utf-8") as f:
+        workload = workload_from_statements(line.strip() for line in f if line.strip())
+    parsed = time.perf_counter()
+    chosen = select_indexes(workload, args.budget_mb, args.max_write_overhead)
+    elapsed = time.perf_counter() - parsed
+    for recommendation in chosen:
+        print(f"{recommendation.size_mb:9.1f} MB  benefit {recommendation.benefit:14,.0f}  "
+              f"{len(recommendation.templates):6} templates  {create_statement(recommendation)}")
+    print(f"\n{len(workload.templates):,} templates analyzed in {parsed - started:.1f}s, "
+          f"{len(chosen)} indexes ({sum(r.size_mb for r in chosen):,.1f} MB) chosen in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
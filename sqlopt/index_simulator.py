@@ -0,0 +1,284 @@
+"""What-if index simulation against a generated SQLite copy of a schema.
+
+``IndexSimulator`` builds an in-memory SQLite database from a schema dict
+(table -> column names, as in ``sqlopt.schemas``), fills it with
+representative data generated from the column names, and measures each
+workload query with and without a candidate index: the ``EXPLAIN QUERY
+PLAN`` output and the median latency of a few timed runs. Queries SQLite
+cannot run (vendor syntax), queries that would change the data, and
+queries running past ``MEASURE_TIMEOUT_S`` are reported as skipped rather
+than guessed at.
+
+Command line::
+
+    python -m sqlopt.index_simulator workload.sql "CREATE INDEX ix ON orders(status, order_date)"
+"""
+import argparse
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from sqlopt.index_selection import TableStats
+from sqlopt.schemas import SCHEMAS
+
+QueryMeasurement = namedtuple("QueryMeasurement", ["sql", "plan", "ms", "rows", "error"])
+QueryComparison = namedtuple("QueryComparison", ["sql", "before", "after", "uses_index"])
+
+DEFAULT_ROWS = 20000
+TIMED_RUNS = 5
+MEASURE_TIMEOUT_S = 5.0
+# Authorizer actions a read-only query needs; anything else (writes, DDL, PRAGMA, ATTACH) is denied
+_READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+_STATUSES = ["active", "inactive", "pending", "shipped", "cancelled", "delivered"]
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)\s*\(([^)]*)\)"
+    r"(?:\s*INCLUDE\s*\(([^)]*)\))?", re.IGNORECASE)
+_COMPARED_COLUMN = re.compile(
+    r"([A-Za-z_][\w]*)(?:\.([A-Za-z_]\w*))?\s*(?:=|<>|!=|<=|>=|<|>|\bLIKE|\bBETWEEN|\bIN\s*\(\s*(?:\?\s*,\s*)*)\s*$",
+    re.IGNORECASE)
+_BETWEEN_UPPER = re.compile(r"BETWEEN\s+\?\s+AND\s*$", re.IGNORECASE)
+
+
+class Candidate(namedtuple("Candidate", ["name", "table", "columns", "unique"])):
+    """An index to try: CREATE INDEX statement parts"""
+
+    @property
+    def ddl(self):
+        unique = "UNIQUE " if self.unique else ""
+        return f"CREATE {unique}INDEX {self.name} ON {self.table}({', '.join(self.columns)})"
+
+
+def parse_candidate(statement):
+    """Candidate from a CREATE INDEX statement; raises ValueError for anything else"""
+    match = _CREATE_INDEX.search(statement)
+    if match is None:
+        raise ValueError(f"Not a CREATE INDEX statement: {statement[:80]}")
+    columns = [column.strip().split()[0] for column in match.group(4).split(",") if column.strip()]
+    if match.group(5):
+        # SQLite has no INCLUDE; trailing key columns make the index covering all the same
+        columns += [column.strip() for column in match.group(5).split(",") if column.strip()]
+    return Candidate(match.group(2), match.group(3), columns, bool(match.group(1)))
+
+
+def primary_key(table, columns):
+    """The first column when it is named after the table (users -> user_id)"""
+    singular = table[:-1] if table.endswith("s") else table
+    return columns[0] if columns and columns[0] == f"{singular}_id" else None
+
+
+def _affinity(column):
+    if column.endswith("_id") or column in ("quantity", "stock_quantity"):
+        return "INTEGER"
+    if column in ("price", "unit_price", "total_amount", "salary", "budget", "amount"):
+        return "REAL"
+    return "TEXT"
+
+
+class IndexSimulator:
+    """A generated SQLite copy of a schema for what-if index measurements"""
+
+    def __init__(self, schema, rows=DEFAULT_ROWS, seed=0):
+        self.schema = schema
+        self.rows = {}
+        self.lock = threading.Lock()
+        # Shared by every session of the app; the lock serializes the create/measure/drop cycles
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        # Interrupts a measured query past its deadline, so one slow query cannot hold the lock for long
+        self.deadline = None
+        self.conn.set_progress_handler(
+            lambda: self.deadline is not None and time.perf_counter() > self.deadline, 10000)
+        self._rng = random.Random(seed)
+        keys = {primary_key(table, columns): table for table, columns in schema.items()}
+        keys.pop(None, None)
+        for table, columns in schema.items():
+            # Tables without their own key (link tables) hold more rows, like real fact tables
+            self.rows[table] = rows if primary_key(table, columns) else rows * 2
+        for table, columns in schema.items():
+            self._create_table(table, columns, keys)
+        self.conn.execute("ANALYZE")
+
+    def _create_table(self, table, columns, keys):
+        key = primary_key(table, columns)
+        definitions = [f"{column} {_affinity(column)}{' PRIMARY KEY' if column == key else ''}" for column in columns]
+        self.conn.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+        generators = [self._generator(column, key, keys) for column in columns]
+        self.conn.executemany(
+            f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})",
+            (tuple(generate(i) for generate in generators) for i in range(1, self.rows[table] + 1)))
+
+    def _generator(self, column, key, keys):
+        """Value generator for a column, chosen from its name"""
+        rng = self._rng
+        if column == key:
+            return lambda i: i
+        if column.endswith("_id"):
+            # Lookup codes such as category_id, with no table of their own, have few distinct values
+            referenced = self.rows[keys[column]] if column in keys else 50
+            # Skewed like real foreign keys: a few parents have most children
+            return lambda i: min(int(rng.paretovariate(1.2)), referenced) if rng.random() < 0.3 \
+                else rng.randint(1, referenced)
+        if column == "email":
+            return lambda i: f"user{i}@example.com"
+        if column == "status":
+            return lambda i: rng.choices(_STATUSES, weights=[50, 10, 10, 15, 5, 10])[0]
+        if column.endswith(("_date", "_at")):
+            start = date(2022, 1, 1)
+            return lambda i: (start + timedelta(days=rng.randint(0, 1000))).isoformat()
+        if _affinity(column) == "REAL":
+            return lambda i: round(rng.lognormvariate(3.5, 1.0), 2)
+        if _affinity(column) == "INTEGER":
+            return lambda i: rng.randint(0, 100)
+        return lambda i: f"{column}_{rng.randint(1, 5000)}"
+
+    def table_stats(self):
+        """Row and distinct-value counts of the generated data, for the index selection cost model"""
+        stats = {}
+        for table, columns in self.schema.items():
+            counts = self.conn.execute(
+                f"SELECT {', '.join(f'COUNT(DISTINCT {column})' for column in columns)} FROM {table}").fetchone()
+            stats[table] = TableStats(self.rows[table], dict(zip(columns, counts)), {})
+        return stats
+
+    # Binding placeholders
+
+    def bind(self, sql):
+        """Replace ? placeholders with values sampled from the column each one is compared with"""
+        parts = sql.split("?")
+        if len(parts) == 1:
+            return sql
+        bound = [parts[0]]
+        previous = None
+        for i, part in enumerate(parts[1:], 1):
+            # Look at the original text so earlier placeholders still read as "IN (?, ?"
+            prefix = "?".join(parts[:i])
+            if _BETWEEN_UPPER.search(prefix) and previous is not None:
+                value = previous * 2 if isinstance(previous, (int, float)) else previous
+            else:
+                match = _COMPARED_COLUMN.search(prefix)
+                value = self.sample(match.group(2) or match.group(1)) if match else 1
+            previous = value
+            bound.append(_literal(value))
+            bound.append(part)
+        return "".join(bound)
+
+    def sample(self, column):
+        """A random existing value of a column from any table that has it"""
+        for table, columns in self.schema.items():
+            if column in columns:
+                row = self._rng.randint(1, self.rows[table])
+                found = self.conn.execute(f"SELECT {column} FROM {table} WHERE rowid = ?", (row,)).fetchone()
+                if found is not None:
+                    return found[0]
+        return 1
+
+    # Measuring
+
+    def measure(self, sql, runs=TIMED_RUNS, timeout_s=MEASURE_TIMEOUT_S):
+        """Plan and median latency (ms) of one query on the current indexes, within timeout_s in all"""
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            # Writes would change the data every later measurement runs on
+            return QueryMeasurement(sql, [], None, None, "only SELECT queries are simulated")
+        # WITH ... DELETE passes the check above; the authorizer rejects it when it is prepared
+        self.conn.set_authorizer(lambda action, *args: sqlite3.SQLITE_OK if action in _READ_ACTIONS
+                                 else sqlite3.SQLITE_DENY)
+        self.deadline = time.perf_counter() + timeout_s
+        try:
+            plan = [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            rows = len(self.conn.execute(sql).fetchall())  # warm-up
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                self.conn.execute(sql).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        except sqlite3.DatabaseError as e:
+            if "not authorized" in str(e):
+                return QueryMeasurement(sql, [], None, None, "only read-only queries are simulated")
+            if "interrupted" in str(e):
+                return QueryMeasurement(sql, [], None, None, f"took longer than {timeout_s:g}s")
+            return QueryMeasurement(sql, [], None, None, str(e))
+        finally:
+            self.deadline = None
+            self.conn.set_authorizer(None)
+        return QueryMeasurement(sql, plan, statistics.median(timings), rows, None)
+
+    def simulate(self, queries, candidates, runs=TIMED_RUNS):
+        """{candidate name: [QueryComparison]} measuring each candidate on its own against no candidate"""
+        with self.lock:
+            bound = [self.bind(sql) for sql in queries]
+            baseline = [self.measure(sql, runs) for sql in bound]
+            results = {}
+            for candidate in candidates:
+                try:
+                    self.conn.execute(candidate.ddl)
+                except sqlite3.Error as e:
+                    results[candidate.name] = [QueryComparison(sql, before, QueryMeasurement(sql, [], None, None, str(e)),
+                                                               False) for sql, before in zip(bound, baseline)]
+                    continue
+                try:
+                    self.conn.execute(f"ANALYZE {candidate.name}")
+                    results[candidate.name] = [
+                        QueryComparison(sql, before, after, any(candidate.name in step for step in after.plan))
+                        for sql, before, after in zip(bound, baseline, (self.measure(sql, runs) for sql in bound))]
+                finally:
+                    self.conn.execute(f"DROP INDEX {candidate.name}")
+            return results
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def summarize_comparisons(comparisons):
+    """Headline numbers for one candidate: queries helped, total ms before and after, speedup"""
+    measured = [c for c in comparisons if c.before.ms is not None and c.after.ms is not None]
+    helped = [c for c in measured if c.uses_index]
+    before = sum(c.before.ms for c in helped)
+    after = sum(c.after.ms for c in helped)
+    return {
+        "queries": len(comparisons),
+        "measured": len(measured),
+        "uses_index": len(helped),
+        "before_ms": before,
+        "after_ms": after,
+        "speedup": before / after if helped and after > 0 else None,
+        "skipped": [c.before.error for c in comparisons if c.before.error],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure candidate indexes on a generated SQLite copy of a schema")
+    parser.add_argument("workload", help="file with one query per line")
+    parser.add_argument("indexes", nargs="+", help="CREATE INDEX statements to try")
+    parser.add_argument("--schema", default="E-commerce", choices=list(SCHEMAS))
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows per table")
+    args = parser.parse_args(argv)
+
+    with open(args.workload, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    started = time.perf_counter()
+    simulator = IndexSimulator(SCHEMAS[args.schema], rows=args.rows)
+    print(f"Generated {sum(simulator.rows.values()):,} rows in {time.perf_counter() - started:.1f}s")
+    candidates = [parse_candidate(statement) for statement in args.indexes]
+    for name, comparisons in simulator.simulate(queries, candidates).items():
+        summary = summarize_comparisons(comparisons)
+        speedup = f"{summary['speedup']:.1f}x" if summary["speedup"] else "no effect"
+        print(f"\n{name}: used by {summary['uses_index']} of {summary['measured']} queries, {speedup}")
+        for comparison in comparisons:
+            if comparison.before.error:
+                print(f"    skipped ({comparison.before.error}): {comparison.sql[:80]}")
+            else:
+                print(f"    {comparison.before.ms:8.2f} ms -> {comparison.after.ms:8.2f} ms  {comparison.sql[:80]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
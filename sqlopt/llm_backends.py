@@ -0,0 +1,334 @@
+"""Interchangeable LLM backends for the AI helpers.
+
+Every backend offers the same three calls: ``complete`` (blocking),
+``stream`` (yields text deltas) and ``acomplete`` (asyncio). The app picks one
+with the ``SQLOPT_LLM_BACKEND`` environment variable:
+
+- ``anthropic``: the live Claude API (default)
+- ``record``: the live Claude API, saving every response and its timing to a
+  JSONL recording (``SQLOPT_REPLAY_PATH``)
+- ``replay``: serves a recording offline, reproducing the recorded latency
+  distribution, so pages can be benchmarked and load-tested without a key
+- ``stub``: deterministic canned responses with no network and no recording
+"""
+import asyncio
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from sqlopt.chunking import estimate_tokens
+from sqlopt.response_cache import cache_key
+
+DEFAULT_CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+DEFAULT_REPLAY_PATH = os.path.join("recordings", "claude_responses.jsonl")
+
+
+class LLMResponse:
+    """Text of one completion plus its token usage"""
+
+    def __init__(self, text, input_tokens=0, output_tokens=0):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class LLMBackend:
+    """Base class: subclasses implement complete() and may override the others"""
+
+    name = "base"
+    model = ""
+    offline = False
+
+    def complete(self, prompt, max_tokens):
+        raise NotImplementedError
+
+    def stream(self, prompt, max_tokens):
+        yield self.complete(prompt, max_tokens).text
+
+    async def acomplete(self, prompt, max_tokens):
+        return await asyncio.to_thread(self.complete, prompt, max_tokens)
+
+    async def aclose(self):
+        """Release resources bound to the current event loop"""
+
+
+class AnthropicBackend(LLMBackend):
+    """The live Claude Messages API"""
+
+    name = "anthropic"
+
+    def __init__(self, api_key, model, client=None):
+        if client is None and importlib.util.find_spec("anthropic") is None:
+            raise ImportError("Anthropic library not installed. Install with: pip install anthropic")
+        self.api_key = api_key
+        self.model = model
+        self._client = client
+        self.async_client = None
+
+    @property
+    def client(self):
+        # The SDK takes most of a second to import, so it is loaded on the first call
+        if self._client is None:
+            import anthropic
+
+            # Retries are handled by the shared AI scheduler, not the SDK
+            self._client = anthropic.Anthropic(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def _request(self, prompt, max_tokens):
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+    @staticmethod
+    def _to_response(message):
+        usage = getattr(message, "usage", None)
+        return LLMResponse(
+            message.content[0].text,
+            getattr(usage, "input_tokens", 0) or 0,
+            getattr(usage, "output_tokens", 0) or 0,
+        )
+
+    def complete(self, prompt, max_tokens):
+        return self._to_response(self.client.messages.create(**self._request(prompt, max_tokens)))
+
+    def stream(self, prompt, max_tokens):
+        with self.client.messages.stream(**self._request(prompt, max_tokens)) as response:
+            yield from response.text_stream
+
+    async def acomplete(self, prompt, max_tokens):
+        # The async client's connection pool belongs to one event loop; aclose() drops it
+        if self.async_client is None:
+            import anthropic
+
+            self.async_client = anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+        message = await self.async_client.messages.create(**self._request(prompt, max_tokens))
+        return self._to_response(message)
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline responses shaped like the real ones"""
+
+    name = "stub"
+    offline = True
+
+    def __init__(self, model="local-stub", latency_s=0.0, tokens_per_second=0.0):
+        self.model = model
+        self.latency_s = latency_s
+        self.tokens_per_second = tokens_per_second
+
+    def render(self, prompt):
+        """Build the canned response for a prompt"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+
+        if "natural language query to optimized SQL" in prompt:
+            tables = re.findall(r"^Table: (\w+)", prompt, re.MULTILINE) or ["users"]
+            return (
+                "**SQL Query:**\n```sql\n"
+                f"SELECT *\nFROM {tables[0]}\nLIMIT 100;\n```\n\n"
+                f"**Explanation:**\nDeterministic stub response {digest} for offline runs.\n\n"
+                "**Optimizations Applied:**\n- Limited the result set\n"
+            )
+
+        # Echo the numbered sections the prompt asks for so downstream parsing sees the same layout
+        sections = re.findall(r"^\s*\d+\.\s+\*\*(.+?)\*\*", prompt, re.MULTILINE)
+        if not sections:
+            sections = ["Summary"]
+        lines = [f"_Stub response {digest} (offline backend)._", ""]
+        for number, section in enumerate(sections, 1):
+            lines.append(f"{number}. **{section.rstrip(':')}**")
+            lines.append(f"   - Deterministic placeholder finding {digest}-{number}")
+        return "\n".join(lines)
+
+    def _pause(self, text):
+        delay = self.latency_s
+        if self.tokens_per_second:
+            delay += estimate_tokens(text) / self.tokens_per_second
+        return delay
+
+    def complete(self, prompt, max_tokens):
+        text = self.render(prompt)
+        delay = self._pause(text)
+        if delay:
+            time.sleep(delay)
+        return LLMResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    def stream(self, prompt, max_tokens):
+        text = self.render(prompt)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        for line in text.splitlines(keepends=True):
+            if self.tokens_per_second:
+                time.sleep(estimate_tokens(line) / self.tokens_per_second)
+            yield line
+
+    async def acomplete(self, prompt, max_tokens):
+        text = self.render(prompt)
+        delay = self._pause(text)
+        if delay:
+            await asyncio.sleep(delay)
+        return LLMResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+
+class RecordReplayBackend(LLMBackend):
+    """Record live responses to JSONL, or replay them offline with realistic latency
+
+    In replay mode each recorded entry is served with its own recorded timing
+    multiplied by log-normal jitter fitted to the whole recording; prompts that
+    were never recorded get latencies sampled from that same distribution and
+    fall back to ``on_miss`` (a StubBackend by default, or an error).
+    """
+
+    offline = True
+
+    def __init__(self, path=DEFAULT_REPLAY_PATH, mode="replay", inner=None, model="",
+                 latency_scale=1.0, on_miss=None, seed=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a live backend to record from")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.name = mode
+        self.offline = mode == "replay"
+        self.model = inner.model if inner is not None else model
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss if on_miss is not None else StubBackend(model=self.model)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+        # Without a recording, misses still get the default latency distribution
+        self._fit_latency()
+
+    def _fit_latency(self):
+        totals = [e["total_s"] for e in self.entries.values() if e.get("total_s", 0) > 0]
+        logs = [math.log(t) for t in totals]
+        self.log_mu = statistics.fmean(logs) if logs else math.log(2.0)
+        self.log_sigma = statistics.pstdev(logs) if len(logs) > 1 else 0.3
+        ratios = [e["first_token_s"] / e["total_s"] for e in self.entries.values()
+                  if e.get("total_s", 0) > 0 and e.get("first_token_s") is not None]
+        self.first_token_ratio = statistics.median(ratios) if ratios else 0.1
+
+    def key(self, prompt, max_tokens):
+        return cache_key(self.model, max_tokens, prompt)
+
+    def _save(self, key, max_tokens, response, first_token_s, total_s):
+        entry = {
+            "key": key,
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "text": response.text,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens,
+            "first_token_s": round(first_token_s, 4),
+            "total_s": round(total_s, 4),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self.lock:
+            self.entries[key] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._fit_latency()
+
+    def _timing(self, entry):
+        """(first-token delay, total delay) for one replayed call"""
+        with self.lock:
+            if entry is not None and entry.get("total_s"):
+                total = entry["total_s"] * math.exp(self.random.gauss(0, self.log_sigma / 2))
+                ratio = (entry.get("first_token_s") or 0) / entry["total_s"] or self.first_token_ratio
+            else:
+                total = math.exp(self.random.gauss(self.log_mu, self.log_sigma))
+                ratio = self.first_token_ratio
+        total *= self.latency_scale
+        return total * ratio, total
+
+    def _replay(self, prompt, max_tokens):
+        entry = self.entries.get(self.key(prompt, max_tokens))
+        if entry is not None:
+            response = LLMResponse(entry["text"], entry.get("input_tokens", 0), entry.get("output_tokens", 0))
+        elif self.on_miss == "error":
+            raise KeyError(f"No recorded response for prompt {self.key(prompt, max_tokens)[:12]}")
+        else:
+            response = self.on_miss.complete(prompt, max_tokens)
+        return response, self._timing(entry)
+
+    def complete(self, prompt, max_tokens):
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = self.inner.complete(prompt, max_tokens)
+            elapsed = time.perf_counter() - started
+            self._save(self.key(prompt, max_tokens), max_tokens, response, elapsed, elapsed)
+            return response
+
+        response, (_, total) = self._replay(prompt, max_tokens)
+        time.sleep(total)
+        return response
+
+    def stream(self, prompt, max_tokens):
+        if self.mode == "record":
+            started = time.perf_counter()
+            first_token = None
+            chunks = []
+            for text in self.inner.stream(prompt, max_tokens):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                chunks.append(text)
+                yield text
+            elapsed = time.perf_counter() - started
+            full_text = "".join(chunks)
+            response = LLMResponse(full_text, estimate_tokens(prompt), estimate_tokens(full_text))
+            self._save(self.key(prompt, max_tokens), max_tokens, response,
+                       first_token if first_token is not None else elapsed, elapsed)
+            return
+
+        response, (first_token, total) = self._replay(prompt, max_tokens)
+        pieces = response.text.splitlines(keepends=True) or [""]
+        time.sleep(first_token)
+        gap = (total - first_token) / len(pieces)
+        for piece in pieces:
+            yield piece
+            time.sleep(gap)
+
+    async def acomplete(self, prompt, max_tokens):
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = await self.inner.acomplete(prompt, max_tokens)
+            elapsed = time.perf_counter() - started
+            self._save(self.key(prompt, max_tokens), max_tokens, response, elapsed, elapsed)
+            return response
+
+        response, (_, total) = self._replay(prompt, max_tokens)
+        await asyncio.sleep(total)
+        return response
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
@@ -0,0 +1,305 @@
+"""Append-only columnar store of per-query metrics in memory-mapped segments.
+
+Each series is one query fingerprint. Its samples are added to fixed time
+buckets at three resolutions, so the 1m → 1h → 1d rollups are kept up to
+date as data arrives and coarse charts never rescan minutes:
+
+- ``1m`` buckets, in segments of one day
+- ``1h`` buckets, in segments of 30 days
+- ``1d`` buckets, in segments of 360 days
+
+A segment is a ``.npy`` file per resolution, time span and block of 1024
+series, holding one float32 plane per column (``COLUMNS``) of shape
+``series × buckets``. It is opened with ``np.load(mmap_mode=...)``. One
+series' buckets are contiguous within a plane, so a range read inside one
+segment is a view of the mapped file with no copy. Segment files are
+created sparse, so idle series cost address space, not disk. A year of
+per-minute data for 10k queries is 16 bytes per bucket at most (about 84 GB
+fully dense). Whole segments older than the retention period are deleted
+when a new segment is started, or when the retention changes.
+
+The registry of series (``series.json``) and the settings (``meta.json``)
+are small JSON files rewritten atomically. A reader in another process
+picks up new series on its next read.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+DEFAULT_METRICS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sqlopt", "metrics")
+DEFAULT_RETENTION_DAYS = 365
+
+# Resolution -> (bucket seconds, segment seconds)
+RESOLUTIONS = {
+    "1m": (60, 86400),
+    "1h": (3600, 30 * 86400),
+    "1d": (86400, 360 * 86400),
+}
+COLUMNS = ("count", "total_ms", "max_ms", "errors")
+# Computed from the stored columns when read: (numerator, denominator, scale)
+DERIVED = {
+    "mean_ms": ("total_ms", "count", 1.0),
+    "error_rate": ("errors", "count", 100.0),
+}
+BLOCK_SERIES = 1024
+OPEN_SEGMENTS = 256
+
+Series = namedtuple("Series", ["id", "fingerprint", "label"])
+
+
+def _write_json(path, value):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(temporary, path)
+
+
+class MetricsStore:
+    """Per-query metrics by fingerprint, at 1m/1h/1d resolution, in memory-mapped segments"""
+
+    def __init__(self, path=DEFAULT_METRICS_DIR, retention_days=None):
+        self.path = path
+        self.lock = threading.RLock()
+        self._open = OrderedDict()
+        self._series = []
+        self._ids = {}
+        self._registry_mtime = None
+        os.makedirs(path, exist_ok=True)
+        self._refresh()
+        meta_path = os.path.join(path, "meta.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        self.retention_days = meta.get("retention_days", DEFAULT_RETENTION_DAYS)
+        if retention_days is not None and retention_days != self.retention_days:
+            self.set_retention(retention_days)
+
+    # Series registry
+
+    def _refresh(self):
+        """Reload the registry if another process added series"""
+        registry = os.path.join(self.path, "series.json")
+        try:
+            mtime = os.stat(registry).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._registry_mtime:
+            return
+        with open(registry, encoding="utf-8") as f:
+            entries = json.load(f)
+        with self.lock:
+            self._series = [Series(i, fingerprint, label) for i, (fingerprint, label) in enumerate(entries)]
+            self._ids = {entry.fingerprint: entry.id for entry in self._series}
+            self._registry_mtime = mtime
+
+    def series(self):
+        """Every registered Series, in id order"""
+        self._refresh()
+        return list(self._series)
+
+    def ids(self, fingerprints, labels=None):
+        """Series ids for fingerprints, registering new ones (labels default to the fingerprint)"""
+        with self.lock:
+            self._refresh()
+            ids = np.empty(len(fingerprints), dtype=np.int64)
+            added = False
+            for i, fingerprint in enumerate(fingerprints):
+                series_id = self._ids.get(fingerprint)
+                if series_id is None:
+                    series_id = len(self._series)
+                    label = labels[i] if labels is not None else fingerprint
+                    self._series.append(Series(series_id, fingerprint, label))
+                    self._ids[fingerprint] = series_id
+                    added = True
+                ids[i] = series_id
+            if added:
+                registry = os.path.join(self.path, "series.json")
+                _write_json(registry, [[entry.fingerprint, entry.label] for entry in self._series])
+                self._registry_mtime = os.stat(registry).st_mtime_ns
+            return ids
+
+    # Segments
+
+    def _segment(self, resolution, segment, block, create=False):
+        """The mapped segment array, or None if it does not exist and create is false"""
+        key = (resolution, segment, block)
+        with self.lock:
+            mapped = self._open.get(key)
+            if mapped is not None:
+                self._open.move_to_end(key)
+                return mapped
+            directory = os.path.join(self.path, resolution, f"{segment:06d}")
+            path = os.path.join(directory, f"{block:04d}.npy")
+            if os.path.exists(path):
+                mapped = np.load(path, mmap_mode="r+")
+            elif create:
+                step, span = RESOLUTIONS[resolution]
+                new_segment = not os.path.isdir(directory)
+                os.makedirs(directory, exist_ok=True)
+                mapped = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                                   shape=(len(COLUMNS), BLOCK_SERIES, span // step))
+                if new_segment:
+                    self._expire()
+            else:
+                return None
+            self._open[key] = mapped
+            while len(self._open) > OPEN_SEGMENTS:
+                self._open.popitem(last=False)[1].flush()
+            return mapped
+
+    # Writing
+
+    def record(self, fingerprints, timestamps, total_ms, count=1, max_ms=None, errors=0, labels=None):
+        """Add observations: each row is `count` calls of one fingerprint at a unix time, taking total_ms
+
+        Scalars broadcast, so one call can add a single sample or a whole scrape of deltas.
+        """
+        ids = self.ids(list(fingerprints), labels)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.int64), ids.shape)
+        count, total_ms, errors = (np.broadcast_to(np.asarray(column, dtype=np.float32), ids.shape)
+                                   for column in (count, total_ms, errors))
+        if max_ms is None:
+            max_ms = total_ms / np.maximum(count, 1)
+        max_ms = np.broadcast_to(np.asarray(max_ms, dtype=np.float32), ids.shape)
+        values = np.stack([count, total_ms, max_ms, errors])
+        # Samples already past retention would land in segments the next expiry deletes
+        kept = timestamps >= time.time() - self.retention_days * 86400
+        if not kept.all():
+            ids, timestamps, values = ids[kept], timestamps[kept], values[:, kept]
+        if not len(ids):
+            return 0
+        blocks, rows = np.divmod(ids, BLOCK_SERIES)
+        with self.lock:
+            for resolution, (step, span) in RESOLUTIONS.items():
+                segments, offsets = np.divmod(timestamps, span)
+                buckets = offsets // step
+                # One group per segment file touched by this batch
+                keys = segments * (blocks.max() + 1) + blocks
+                order = np.argsort(keys, kind="stable")
+                starts = np.flatnonzero(np.r_[True, np.diff(keys[order]) != 0])
+                for group in np.split(order, starts[1:]):
+                    mapped = self._segment(resolution, int(segments[group[0]]), int(blocks[group[0]]), create=True)
+                    index = (rows[group], buckets[group])
+                    np.add.at(mapped[0], index, values[0, group])
+                    np.add.at(mapped[1], index, values[1, group])
+                    np.maximum.at(mapped[2], index, values[2, group])
+                    np.add.at(mapped[3], index, values[3, group])
+        return len(ids)
+
+    def flush(self):
+        """Write dirty pages of every open segment to disk"""
+        with self.lock:
+            for mapped in self._open.values():
+                mapped.flush()
+
+    # Reading
+
+    def _pieces(self, resolution, block, rows, start, end, plane):
+        """Per-segment slices of one column plane over [start, end) for rows of a block"""
+        step, span = RESOLUTIONS[resolution]
+        pieces = []
+        for segment in range(start // span, (end - 1) // span + 1):
+            first = (max(start, segment * span) - segment * span) // step
+            last = (min(end, (segment + 1) * span) - segment * span) // step
+            mapped = self._segment(resolution, segment, block)
+            if mapped is None:
+                pieces.append(np.zeros((rows.stop - rows.start, last - first), dtype=np.float32))
+            else:
+                pieces.append(mapped[plane, rows, first:last])
+        return pieces
+
+    def _bounds(self, start, end, resolution):
+        step = RESOLUTIONS[resolution][0]
+        start = int(start) // step * step
+        end = max(-(-int(end) // step) * step, start + step)
+        return start, end, np.arange(start, end, step, dtype=np.int64)
+
+    def read(self, fingerprint, start, end, resolution="1h", column="mean_ms"):
+        """(bucket start times, values) of one series over [start, end) in unix seconds
+
+        Stored columns within one segment come back as a read-only view of the mapped file.
+        Derived columns (mean_ms, error_rate) are NaN where a bucket has no calls.
+        """
+        self._refresh()
+        series_id = self._ids[fingerprint]
+        block, row = divmod(series_id, BLOCK_SERIES)
+        start, end, times = self._bounds(start, end, resolution)
+        rows = slice(row, row + 1)
+
+        def plane(name):
+            pieces = self._pieces(resolution, block, rows, start, end, COLUMNS.index(name))
+            values = pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=1)
+            values = values[0]
+            values.flags.writeable = False
+            return values
+
+        if column in DERIVED:
+            numerator, denominator, scale = DERIVED[column]
+            return times, _ratio(plane(numerator), plane(denominator), scale)
+        return times, plane(column)
+
+    def matrix(self, start, end, resolution="1h", column="mean_ms"):
+        """(bucket start times, series × buckets array) for every registered series, rows in id order"""
+        self._refresh()
+        start, end, times = self._bounds(start, end, resolution)
+        total = len(self._series)
+
+        def plane(name):
+            blocks = []
+            for block in range(-(-total // BLOCK_SERIES)):
+                rows = slice(0, min(BLOCK_SERIES, total - block * BLOCK_SERIES))
+                blocks.append(np.concatenate(self._pieces(resolution, block, rows, start, end, COLUMNS.index(name)),
+                                             axis=1))
+            return np.vstack(blocks) if blocks else np.zeros((0, len(times)), dtype=np.float32)
+
+        if column in DERIVED:
+            numerator, denominator, scale = DERIVED[column]
+            return times, _ratio(plane(numerator), plane(denominator), scale)
+        return times, plane(column)
+
+    # Retention
+
+    def set_retention(self, days):
+        """Keep `days` of history at every resolution, deleting older segments now"""
+        with self.lock:
+            self.retention_days = int(days)
+            _write_json(os.path.join(self.path, "meta.json"), {"retention_days": self.retention_days})
+            return self._expire()
+
+    def _expire(self, now=None):
+        """Delete whole segments that end before the retention horizon; returns how many"""
+        horizon = (time.time() if now is None else now) - self.retention_days * 86400
+        removed = 0
+        with self.lock:
+            for resolution, (_, span) in RESOLUTIONS.items():
+                directory = os.path.join(self.path, resolution)
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    if name.isdigit() and (int(name) + 1) * span <= horizon:
+                        for key in [key for key in self._open if key[:2] == (resolution, int(name))]:
+                            del self._open[key]
+                        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+                        removed += 1
+        return removed
+
+    def disk_usage(self):
+        """Bytes actually allocated on disk (segment files are sparse)"""
+        used = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                used += os.stat(os.path.join(root, name)).st_blocks * 512
+        return used
+
+
+def _ratio(numerator, denominator, scale):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = numerator * np.float32(scale) / denominator
+    values[denominator == 0] = np.nan
+    return values
@@ -0,0 +1,473 @@
+"""Background collection and regression checks for the Regression Detector.
+
+A Monitor runs in its own thread, or as ``python -m sqlopt.monitor`` in a
+separate process. On every check it:
+
+1. collects per-query calls and latency from a source into the metrics
+   store;
+2. rolls the streaming baselines forward;
+3. scans every series for change points. A regressed series is compared
+   with its baseline as of the onset, rebuilt from the hourly buckets
+   before it, since the running baseline has absorbed the regression;
+4. writes the results to ``monitor_status.json`` and each series' baseline
+   mean and quantiles to ``baseline_summary.npz``.
+
+The full baseline state goes to ``baselines.npz`` every
+``BASELINES_SAVE_S`` seconds and when the monitor stops, so the next
+monitor resumes from it instead of rescanning the store.
+
+Checks run at the Check Frequency of the saved configuration
+(``monitor.json``). The UI only writes that file and reads the results, so
+page loads do not grow with the number of monitored queries.
+
+All these files live in the metrics store directory. An exclusive lock on
+``monitor.lock`` in the same directory keeps one monitor per deployment.
+App processes that cannot take the lock read what the running monitor
+writes, and their monitor threads retry the lock every ``CONFIG_POLL_S``
+seconds to take over once that process exits.
+
+Sources:
+
+- ``DatabaseStatsSource`` diffs the cumulative counters of
+  ``pg_stat_statements`` (PostgreSQL 13+) or the performance_schema digest
+  summary (MySQL) between checks.
+- ``SampleSource`` generates per-minute history for sample queries on the
+  sample schema, starting with 30 days of backfill. It is used when no
+  database is configured, or the database has no statement statistics.
+
+A failed check keeps the previous check's results in the status file and
+adds the error.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from sqlopt.alert_rules import (RULE_SETTINGS, RULES, AlertEngine, coalesce, compile_thresholds,
+                                 send_notifications, window_values)
+from sqlopt.baselines import Baselines, save_summary
+from sqlopt.change_points import detect_change_points
+from sqlopt.fingerprint import fingerprint
+
+CHECK_FREQUENCIES = {"Real-time": 15, "Every 5 minutes": 300, "Every 15 minutes": 900, "Hourly": 3600}
+DEFAULT_CONFIG = {
+    "check_frequency": "Real-time",
+    "response_threshold_ms": 1000,
+    "regression_threshold_pct": 50,
+    "error_threshold_pct": 3,
+    "auto_baseline": True,
+    "baseline_window_days": 7,
+    "retention_days": 365,
+    "email_alerts": True,
+    "alert_email": "admin@company.com",
+    "slack_alerts": False,
+    "dashboard_alerts": True,
+    # Query id, label or fingerprint -> threshold settings that differ for that query
+    "overrides": {},
+}
+HISTORY_DAYS = 30
+CONFIG_POLL_S = 5
+BASELINES_SAVE_S = 900
+
+CONFIG_FILE = "monitor.json"
+STATUS_FILE = "monitor_status.json"
+BASELINES_FILE = "baselines.npz"
+BASELINE_SUMMARY_FILE = "baseline_summary.npz"
+LOCK_FILE = "monitor.lock"
+
+# Sample monitored queries: type, SQL, baseline ms, slowdown factor, days since it regressed, calls per minute
+SAMPLE_QUERIES = {
+    "Q_001": ("User Login", "SELECT * FROM users WHERE email = ? AND status = 'active'", 120, 2.8, 2.2, 8.0),
+    "Q_045": ("Product Search", "SELECT p.*, c.name FROM products p JOIN categories c "
+              "ON c.category_id = p.category_id WHERE p.name LIKE ?", 450, 2.7, 2.3, 3.3),
+    "Q_123": ("Order Report", "SELECT o.user_id, COUNT(*), SUM(o.total_amount) FROM orders o "
+              "WHERE o.order_date >= ? GROUP BY o.user_id", 2100, 2.1, 3.1, 0.2),
+    "Q_067": ("Analytics", "SELECT DATE(created_at), COUNT(*) FROM users GROUP BY DATE(created_at)",
+              3400, 2.0, 3.6, 0.1),
+    "Q_089": ("Inventory", "SELECT product_id, stock_quantity FROM products WHERE stock_quantity < ?",
+              890, 2.6, 4.1, 0.5),
+}
+
+
+def _write_json(path, value):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=1)
+    os.replace(temporary, path)
+
+
+def _finite(value):
+    """value as a float, or None (JSON null) when it is NaN"""
+    return None if math.isnan(value) else float(value)
+
+
+def load_config(directory):
+    """The saved monitoring configuration, with defaults for anything unset"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(os.path.join(directory, CONFIG_FILE), encoding="utf-8") as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    return config
+
+
+def save_config(directory, config):
+    """Save the monitoring configuration; the monitor applies it on its next check"""
+    _write_json(os.path.join(directory, CONFIG_FILE), dict(load_config(directory), **config))
+
+
+def config_mtime(directory):
+    """Modification time of the saved configuration, None if it was never saved"""
+    try:
+        return os.stat(os.path.join(directory, CONFIG_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_status(directory):
+    """The latest check's results, or None before the first check"""
+    try:
+        with open(os.path.join(directory, STATUS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def check_interval(config):
+    """Seconds between checks for a configuration"""
+    return CHECK_FREQUENCIES.get(config["check_frequency"], CHECK_FREQUENCIES["Real-time"])
+
+
+# Sources
+
+class SampleSource:
+    """Per-minute calls and latency for the sample queries, continuing from the last collection"""
+
+    def __init__(self, seed=7):
+        from sqlopt.schemas import SCHEMAS
+
+        self.rng = np.random.default_rng(seed)
+        self.started = time.time()
+        # The regressing samples, plus steady single-column lookups on the sample schema
+        self.profiles = [(f"{query_id}: {kind}", sql, base, factor, onset, rate)
+                         for query_id, (kind, sql, base, factor, onset, rate) in SAMPLE_QUERIES.items()]
+        lookups = [(table, column) for table, columns in SCHEMAS["E-commerce"].items() for column in columns]
+        for i, (table, column) in enumerate(lookups):
+            self.profiles.append((f"Q_{200 + i}: {table} by {column}", f"SELECT * FROM {table} WHERE {column} = ?",
+                                  float(self.rng.lognormal(4, 1)), 1.0, 0, float(self.rng.uniform(0.2, 4))))
+
+    def collect(self, store, start, end):
+        """Record the complete minutes in [start, end); returns the time collected up to"""
+        start, end = int(start) // 60 * 60, int(end) // 60 * 60
+        minutes = np.arange(start, end, 60)
+        if not len(minutes):
+            return start
+        keys, labels, times, counts, totals, errors = [], [], [], [], [], []
+        for label, sql, base, factor, onset, rate in self.profiles:
+            calls = self.rng.poisson(rate, len(minutes))
+            busy = calls > 0
+            regressed = minutes >= self.started - onset * 86400
+            mean = np.where(regressed, base * factor, base) * self.rng.lognormal(0, 0.25, len(minutes))
+            keys += [fingerprint(sql).query_id] * int(busy.sum())
+            labels += [label] * int(busy.sum())
+            times.append(minutes[busy])
+            counts.append(calls[busy])
+            totals.append((calls * mean)[busy])
+            errors.append(self.rng.binomial(calls, 0.004)[busy])
+        store.record(keys, np.concatenate(times), np.concatenate(totals), np.concatenate(counts),
+                     errors=np.concatenate(errors), labels=labels)
+        return end
+
+
+# Cumulative per-statement counters: key, statement text, calls, total ms, errors. Both views hold one
+# row per statement and user/database or schema, so rows are summed per statement; PostgreSQL hides
+# the queryid of other users' statements without pg_read_all_stats, and those rows are left out.
+STATS_QUERIES = {
+    "postgresql": "SELECT queryid, min(query), sum(calls), sum(total_exec_time), 0 FROM pg_stat_statements "
+                  "WHERE queryid IS NOT NULL GROUP BY queryid",
+    "mysql": "SELECT digest, min(digest_text), sum(count_star), sum(sum_timer_wait) / 1e9, sum(sum_errors) "
+             "FROM performance_schema.events_statements_summary_by_digest WHERE digest IS NOT NULL "
+             "GROUP BY digest",
+}
+STATS_QUERIES["mariadb"] = STATS_QUERIES["mysql"]
+
+
+def has_statement_stats(dsn):
+    """Whether the database at dsn has statement statistics the monitor can collect"""
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.exc import ArgumentError
+
+    try:
+        return make_url(dsn).get_backend_name() in STATS_QUERIES
+    except ArgumentError:
+        return False
+
+
+class DatabaseStatsSource:
+    """Per-statement deltas of the database's cumulative statement statistics"""
+
+    def __init__(self, manager, dsn):
+        self.manager = manager
+        self.dsn = dsn
+        self.previous = None
+        self.fingerprints = {}
+
+    def collect(self, store, start, end):
+        """Record calls and time since the previous check at `end`; the first check only takes a snapshot"""
+        backend = self.manager.engine(self.dsn).url.get_backend_name()
+        if backend not in STATS_QUERIES:
+            raise ValueError(f"No statement statistics for {backend} databases")
+        rows = self.manager.execute(self.dsn, STATS_QUERIES[backend])
+        current = {}
+        for key, text, calls, total_ms, errors in rows:
+            if key not in self.fingerprints:
+                self.fingerprints[key] = fingerprint(text or "")
+            current[key] = (float(calls or 0), float(total_ms or 0), float(errors or 0))
+        previous, self.previous = self.previous, current
+        if previous is None:
+            return end
+        keys, labels, deltas = [], [], []
+        for key, values in current.items():
+            before = previous.get(key, (0.0, 0.0, 0.0))
+            # Counters went backwards: statistics were reset since the previous check
+            delta = values if values[0] < before[0] else tuple(a - b for a, b in zip(values, before))
+            if delta[0] > 0:
+                keys.append(self.fingerprints[key].query_id)
+                labels.append(self.fingerprints[key].template)
+                deltas.append(delta)
+        if keys:
+            calls, total_ms, errors = np.array(deltas).T
+            store.record(keys, np.full(len(keys), int(end) - 1), total_ms, calls, errors=errors, labels=labels)
+        return end
+
+
+# Monitor
+
+class Monitor:
+    """Collects metrics and checks for regressions in a background thread, one per metrics directory"""
+
+    def __init__(self, store, source):
+        self.store = store
+        self.source = source
+        self.directory = store.path
+        self.baselines = None
+        self.baselines_saved = None
+        self.alerts = AlertEngine()
+        self.thresholds = None
+        self.thresholds_for = None
+        self.collected_to = None
+        self.stop_event = threading.Event()
+        self.checked = threading.Event()
+        self.thread = None
+        self.lock_file = None
+
+    def acquire(self):
+        """Take the deployment-wide monitor lock; False if another process holds it"""
+        if self.lock_file is not None:
+            return True
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a+")
+        try:
+            import fcntl
+        except ImportError:  # No advisory locks (Windows): run one monitor per process
+            self.lock_file = lock_file
+            return True
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def start(self):
+        """Run checks in a daemon thread; False if another process is monitoring for now"""
+        if self.thread is None:
+            self.acquire()
+            self.thread = threading.Thread(target=self.run, name="sqlopt-monitor", daemon=True)
+            self.thread.start()
+        return self.lock_file is not None
+
+    def stop(self):
+        """Stop the thread and hand the deployment-wide lock to the next monitor"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.lock_file is not None:
+            if self.baselines is not None:
+                self.baselines.save(os.path.join(self.directory, BASELINES_FILE))
+            self.lock_file.close()
+            self.lock_file = None
+
+    def run(self):
+        """Check at the configured frequency until stopped; a newly saved configuration triggers a check
+
+        Waits while another process holds the monitor lock.
+        """
+        while not self.stop_event.is_set():
+            if not self.acquire():
+                # Another process is monitoring: stand by to take over when it exits
+                self.stop_event.wait(CONFIG_POLL_S)
+                continue
+            saved = config_mtime(self.directory)
+            config = self.check()
+            deadline = time.monotonic() + check_interval(config)
+            while not self.stop_event.wait(min(CONFIG_POLL_S, max(deadline - time.monotonic(), 0))):
+                if time.monotonic() >= deadline or config_mtime(self.directory) != saved:
+                    break
+
+    def check(self, now=None):
+        """One collection and regression check; returns the configuration it used"""
+        config = load_config(self.directory)
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        status = read_status(self.directory) or {}
+        try:
+            if self.store.retention_days != config["retention_days"]:
+                self.store.set_retention(config["retention_days"])
+            self.collect(now, status)
+            self.update_baselines(config, now)
+            results = self.evaluate(config, now)
+            status = dict(
+                results,
+                **self.raise_alerts(config, now, results["regressions"]),
+                checked_at=now,
+                collected_to=self.collected_to,
+                error=None,
+            )
+        except Exception as e:
+            status.update(checked_at=now, error=f"{type(e).__name__}: {e}")
+        status.update(duration_s=time.perf_counter() - started, check_frequency=config["check_frequency"],
+                      pid=os.getpid())
+        _write_json(os.path.join(self.directory, STATUS_FILE), status)
+        self.checked.set()
+        return config
+
+    def collect(self, now, status):
+        if self.collected_to is None:
+            # Resume after the last monitor's collection; an empty store gets the full history window
+            self.collected_to = status.get("collected_to") or (
+                now if self.store.series() else now - HISTORY_DAYS * 86400)
+        self.collected_to = self.source.collect(self.store, self.collected_to, now)
+        self.store.flush()
+
+    def update_baselines(self, config, now):
+        window = config["baseline_window_days"]
+        path = os.path.join(self.directory, BASELINES_FILE)
+        if self.baselines is None and os.path.exists(path):
+            # Resume from the last monitor's state; an unreadable or older-format file is rebuilt
+            try:
+                self.baselines = Baselines.load(path)
+            except (OSError, KeyError, ValueError):
+                self.baselines = None
+        if self.baselines is None or self.baselines.window_days != window:
+            self.baselines = Baselines(window)
+        if config["auto_baseline"] or self.baselines.updated_to is None:
+            self.baselines.catch_up(self.store, now)
+            save_summary(self.baselines.summary(size=len(self.store.series())),
+                         os.path.join(self.directory, BASELINE_SUMMARY_FILE))
+            if self.baselines_saved is None or time.monotonic() - self.baselines_saved >= BASELINES_SAVE_S:
+                self.baselines.save(path)
+                self.baselines_saved = time.monotonic()
+
+    def evaluate(self, config, now):
+        """Change points of every series' hourly mean latency, against its baseline"""
+        series = self.store.series()
+        hours, counts = self.store.matrix(now - HISTORY_DAYS * 86400, now, "1h", "count")
+        _, totals = self.store.matrix(now - HISTORY_DAYS * 86400, now, "1h", "total_ms")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            found = detect_change_points(totals / counts, hours)
+        regressed = np.flatnonzero(found.detected & (found.magnitude > 0))
+        regressed = regressed[np.argsort(-found.onset[regressed])]
+        regressions = []
+        for i in regressed:
+            # The running baseline has absorbed the regression, so compare with the one before its onset
+            baseline = self.baselines.before(self.store, series[i].fingerprint, int(found.onset[i]))
+            regressions.append({
+                "series": int(i),
+                "fingerprint": series[i].fingerprint,
+                "label": series[i].label,
+                "onset": int(found.onset[i]),
+                "before_ms": float(found.before[i]),
+                "current_ms": float(found.after[i]),
+                "confidence": float(found.confidence[i]),
+                "baseline_ms": _finite(baseline["mean_ms"]),
+                "baseline_p95_ms": _finite(baseline["p95_ms"]),
+            })
+        return {"series": len(series), "regressions": regressions,
+                "baselines_to": self.baselines.updated_to, "baseline_window_days": self.baselines.window_days}
+
+
+    def raise_alerts(self, config, now, regressions):
+        """Evaluate the alert rules for every series and send this check's notifications"""
+        series = self.store.series()
+        settings = (len(series), json.dumps([config[RULE_SETTINGS[rule][0]] for rule in RULES]),
+                    json.dumps(config.get("overrides"), sort_keys=True))
+        if settings != self.thresholds_for:
+            self.thresholds = compile_thresholds(config, series)
+            self.thresholds_for = settings
+        baseline_ms = self.baselines.means(len(series))[0]
+        for regression in regressions:
+            if regression["baseline_ms"] is not None:
+                baseline_ms[regression["series"]] = regression["baseline_ms"]
+        values = window_values(self.store, baseline_ms, now)
+        events = self.alerts.tick(values, self.thresholds, now)
+        onsets = np.full(len(series), np.nan)
+        for regression in regressions:
+            onsets[regression["series"]] = regression["onset"]
+        notifications = coalesce(events, values, self.thresholds, series, onsets, now)
+        send_notifications(notifications, config, self.directory)
+        rules, columns = self.alerts.active()
+        order = np.argsort(-(values[rules, columns] / self.thresholds[rules, columns]))[:100]
+        return {
+            "alerts_firing": {rule: int((rules == r).sum()) for r, rule in enumerate(RULES)},
+            "alerting_series": len(np.unique(columns)),
+            "alerts": [{
+                "rule": RULES[rules[k]],
+                "label": series[columns[k]].label,
+                "value": float(values[rules[k], columns[k]]),
+                "threshold": float(self.thresholds[rules[k], columns[k]]),
+                "since": float(self.alerts.since[rules[k], columns[k]]),
+            } for k in order],
+            "notifications": len(notifications),
+        }
+
+
+def main(argv=None):
+    from sqlopt.connections import ConnectionManager
+    from sqlopt.metrics_store import DEFAULT_METRICS_DIR, MetricsStore
+
+    parser = argparse.ArgumentParser(description="Collect query metrics and check for regressions")
+    parser.add_argument("--metrics-dir", default=os.getenv("SQLOPT_METRICS_DIR", DEFAULT_METRICS_DIR))
+    parser.add_argument("--dsn", default=os.getenv("SQLOPT_DATABASE_URL", ""),
+                        help="database to read statement statistics from (default: sample queries)")
+    parser.add_argument("--once", action="store_true", help="run one check and exit")
+    args = parser.parse_args(argv)
+
+    if args.dsn and not has_statement_stats(args.dsn):
+        parser.error("--dsn must be a PostgreSQL or MySQL database with statement statistics")
+    store = MetricsStore(args.metrics_dir)
+    source = DatabaseStatsSource(ConnectionManager(), args.dsn) if args.dsn else SampleSource()
+    monitor = Monitor(store, source)
+    if not monitor.acquire():
+        print(f"Another monitor is already running for {args.metrics_dir}", file=sys.stderr)
+        return 1
+    while True:
+        config = monitor.check()
+        status = read_status(args.metrics_dir)
+        print(f"{time.strftime('%H:%M:%S')}  {status.get('series', 0):,} series, "
+              f"{len(status.get('regressions', [])):,} regressions, {status.get('duration_s', 0):.2f}s"
+              + (f"  {status['error']}" if status.get("error") else ""))
+        if args.once:
+            return 0 if not status.get("error") else 1
+        time.sleep(check_interval(config))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Tool pages of the SQL Optimizer Suite, one module per page.
+
+A page module is imported the first time its page is opened, so its data
+and heavy dependencies (pandas, plotly) load only when needed; each module
+exposes ``render(ctx)`` taking the ``AppContext`` built by the app shell.
+"""
+import importlib
+
+PAGES = {
+    "🏠 Dashboard": "dashboard",
+    "💬 Natural Language to SQL": "nl_to_sql",
+    "⚡ Query Performance Analyzer": "performance_analyzer",
+    "📊 Index Advisor": "index_advisor",
+    "📖 Query Plan Explainer": "plan_explainer",
+    "🔍 SQL Code Reviewer": "code_reviewer",
+    "📈 Regression Detector": "regression_detector",
+    "📚 Demo Examples": "demo_examples"
+}
+
+
+def render_page(label, ctx):
+    """Import the page's module on first use and draw it"""
+    importlib.import_module(f"{__name__}.{PAGES[label]}").render(ctx)
@@ -0,0 +1,96 @@
+"""Dashboard: overview of the suite and its tools."""
+import streamlit as st
+
+
+def render(ctx):
+    """Draw the page"""
+    st.markdown('<div class="main-header">SQL Query & Performance Optimization Suite</div>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    Welcome to the comprehensive SQL optimization platform powered by AI. This suite provides intelligent 
+    database performance optimization tools to help you write better queries, identify bottlenecks, 
+    and maintain optimal database performance.
+    """)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>1,247</h3>
+            <p>Queries Optimized</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>89%</h3>
+            <p>Avg Performance Gain</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>342</h3>
+            <p>Indexes Recommended</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>23</h3>
+            <p>Regressions Detected</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown("### 🛠️ Available Tools")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("""
+        <div class="feature-card">
+            <h4>💬 Natural Language to SQL</h4>
+            <p>Convert plain English requests into optimized SQL queries using advanced language models.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="feature-card">
+            <h4>⚡ Performance Analyzer</h4>
+            <p>AI-powered analysis of slow queries with specific optimization recommendations.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="feature-card">
+            <h4>📊 Index Advisor</h4>
+            <p>ML-based recommendations for optimal index creation and removal strategies.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="feature-card">
+            <h4>📖 Query Plan Explainer</h4>
+            <p>Natural language explanations of complex database execution plans.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="feature-card">
+            <h4>🔍 SQL Code Reviewer</h4>
+            <p>Automated code review for SQL scripts and stored procedures with best practices.</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="feature-card">
+            <h4>📈 Regression Detector</h4>
+            <p>Monitor and identify when queries start performing poorly over time.</p>
+        </div>
+        """, unsafe_allow_html=True)
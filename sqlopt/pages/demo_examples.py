@@ -0,0 +1,486 @@
+"""Demo examples and copy-paste templates for every tool."""
+import streamlit as st
+
+# Example data, built once when this page is first opened
+ECOMMERCE_EXAMPLES = [
+    "Show me the top 10 customers by total purchase amount this year",
+    "Find all products that are out of stock in the electronics category",
+    "Get the average order value for each month in 2024", 
+    "List customers who haven't placed an order in the last 90 days",
+    "Show me products with more than 100 units sold but less than 50 in stock",
+    "Find the most popular products in each category by sales volume",
+    "Get all orders placed on weekends with a value over $500",
+    "Show me customers who have returned items more than 3 times",
+    "Find products with the highest profit margins in each category"
+]
+
+HR_EXAMPLES = [
+    "Show me all employees hired in the last 6 months",
+    "Find the average salary by department and years of experience", 
+    "List employees whose salaries are above the department average",
+    "Get the top 5 departments by employee count",
+    "Show me employees working on more than 3 active projects",
+    "Find employees eligible for promotion based on 5+ years experience",
+    "List all managers and their direct report counts",
+    "Show me the salary distribution across all departments",
+    "Find employees with the most diverse skill sets"
+]
+
+PERFORMANCE_EXAMPLES = {
+    "Missing Index (High Impact)": """SELECT o.order_id, u.username, p.name, oi.quantity
+FROM orders o
+JOIN users u ON o.user_id = u.user_id  
+JOIN order_items oi ON o.order_id = oi.order_id
+JOIN products p ON oi.product_id = p.product_id
+WHERE o.order_date BETWEEN '2024-01-01' AND '2024-12-31'
+  AND p.category_id = 5
+ORDER BY o.order_date DESC;""",
+    
+    "Poor JOIN Order": """SELECT c.customer_name, COUNT(o.order_id) as order_count,
+       SUM(o.total_amount) as total_spent
+FROM customers c
+LEFT JOIN orders o ON c.customer_id = o.customer_id
+LEFT JOIN order_items oi ON o.order_id = oi.order_id  
+LEFT JOIN products p ON oi.product_id = p.product_id
+WHERE p.category_id IN (1, 2, 3, 4, 5)
+GROUP BY c.customer_id, c.customer_name
+HAVING COUNT(o.order_id) > 5;""",
+    
+    "Unnecessary Subqueries": """SELECT u.username,
+       (SELECT COUNT(*) FROM orders WHERE user_id = u.user_id) as order_count,
+       (SELECT AVG(total_amount) FROM orders WHERE user_id = u.user_id) as avg_order,
+       (SELECT MAX(order_date) FROM orders WHERE user_id = u.user_id) as last_order
+FROM users u
+WHERE u.created_at > '2024-01-01'
+  AND (SELECT COUNT(*) FROM orders WHERE user_id = u.user_id) > 0;""",
+    
+    "Function in WHERE Clause": """SELECT product_id, name, price
+FROM products 
+WHERE UPPER(name) LIKE '%PHONE%'
+  AND YEAR(created_date) = 2024
+  AND price > 100
+ORDER BY price DESC;""",
+    
+    "N+1 Query Problem": """-- This represents multiple queries being executed
+SELECT user_id, username FROM users WHERE status = 'active';
+-- Then for each user:
+SELECT COUNT(*) FROM orders WHERE user_id = 1;
+SELECT COUNT(*) FROM orders WHERE user_id = 2;
+-- ... (repeats for each user)"""
+}
+
+PERFORMANCE_IMPROVEMENTS = {
+    "Missing Index (High Impact)": "Expected: 65-80% faster with proper indexing",
+    "Poor JOIN Order": "Expected: 40-60% faster with optimized join sequence", 
+    "Unnecessary Subqueries": "Expected: 50-70% faster using JOINs instead",
+    "Function in WHERE Clause": "Expected: 30-50% faster avoiding functions",
+    "N+1 Query Problem": "Expected: 90%+ faster with single JOIN query"
+}
+
+INDEX_SCENARIOS = {
+    "E-commerce High-Volume Scenario": {
+        "description": "High-traffic e-commerce site with frequent customer lookups",
+        "queries": [
+            "SELECT * FROM orders WHERE user_id = ? AND status = 'pending'",
+            "SELECT * FROM products WHERE category_id = ? AND price BETWEEN ? AND ?",
+            "SELECT * FROM users WHERE email = ?",
+            "SELECT * FROM orders WHERE order_date >= ? ORDER BY order_date DESC"
+        ],
+        "expected_indexes": [
+            "CREATE INDEX idx_orders_user_status ON orders(user_id, status)",
+            "CREATE INDEX idx_products_category_price ON products(category_id, price)",
+            "CREATE UNIQUE INDEX idx_users_email ON users(email)",
+            "CREATE INDEX idx_orders_date ON orders(order_date DESC)"
+        ]
+    },
+    
+    "Analytics Workload Scenario": {
+        "description": "Data warehouse with complex analytical queries",
+        "queries": [
+            "SELECT region, SUM(amount) FROM sales WHERE sale_date BETWEEN ? AND ? GROUP BY region",
+            "SELECT customer_type, AVG(amount) FROM sales s JOIN customers c ON s.customer_id = c.customer_id GROUP BY customer_type",
+            "SELECT * FROM sales WHERE product_category = ? AND amount > ?"
+        ],
+        "expected_indexes": [
+            "CREATE INDEX idx_sales_date_region ON sales(sale_date, region)",
+            "CREATE INDEX idx_sales_customer ON sales(customer_id) INCLUDE (amount)",
+            "CREATE INDEX idx_sales_category_amount ON sales(product_category, amount)"
+        ]
+    }
+}
+
+PLAN_EXAMPLES = {
+    "PostgreSQL Nested Loop Plan": """Nested Loop  (cost=1.15..8.17 rows=1 width=68)
+  ->  Index Scan using idx_orders_user on orders o  (cost=0.57..4.59 rows=1 width=36)
+        Index Cond: (user_id = 12345)
+        Filter: ((order_date >= '2024-01-01'::date) AND (order_date <= '2024-12-31'::date))
+  ->  Index Scan using idx_products_id on products p  (cost=0.58..3.60 rows=1 width=32)
+        Index Cond: (product_id = order_items.product_id)
+Hash Join  (cost=5.18..10.25 rows=2 width=100)
+  Hash Cond: (oi.order_id = o.order_id)
+  ->  Seq Scan on order_items oi  (cost=0.00..4.50 rows=150 width=32)
+  ->  Hash  (cost=4.59..4.59 rows=1 width=68)""",
+    
+    "SQL Server Plan with Issues": """SELECT Cost: 100%
+  |--Compute Scalar(DEFINE:([Expr1004]=CONVERT_IMPLICIT(int,[Expr1005],0)))
+       |--Stream Aggregate(GROUP BY:() DEFINE:([Expr1005]=Count(*)))
+            |--Hash Match(Inner Join, HASH:([c].[customer_id])=([o].[customer_id]))
+                 |--Index Seek(OBJECT:([db].[dbo].[customers].[PK_customers]), SEEK:([c].[customer_id]=[@customer_id]))
+                 |--Clustered Index Scan(OBJECT:([db].[dbo].[orders].[PK_orders]), WHERE:([o].[order_date]>=[@start_date] AND [o].[order_date]<=[@end_date]))""",
+    
+    "MySQL EXPLAIN Output": """+----+-------------+-------+------------+-------+---------------+---------+---------+-------+------+----------+-------------+
+| id | select_type | table | partitions | type  | possible_keys | key     | key_len | ref   | rows | filtered | Extra       |
++----+-------------+-------+------------+-------+---------------+---------+---------+-------+------+----------+-------------+
+|  1 | SIMPLE      | c     | NULL       | const | PRIMARY       | PRIMARY | 4       | const |    1 |   100.00 | Using index |
+|  1 | SIMPLE      | o     | NULL       | range | idx_date      | idx_date| 3       | NULL  | 5000 |   100.00 | Using where |
++----+-------------+-------+------------+-------+---------------+---------+---------+-------+------+----------+-------------+""",
+    
+    "Complex Join Plan": """Sort  (cost=858.52..861.02 rows=1000 width=68)
+  Sort Key: o.order_date DESC
+  ->  Hash Join  (cost=22.50..808.52 rows=1000 width=68)
+        Hash Cond: (oi.product_id = p.product_id)
+        ->  Hash Join  (cost=15.25..785.00 rows=1000 width=40)
+              Hash Cond: (oi.order_id = o.order_id)
+              ->  Seq Scan on order_items oi  (cost=0.00..735.00 rows=50000 width=12)
+              ->  Hash  (cost=12.75..12.75 rows=200 width=36)
+                    ->  Index Scan using idx_orders_date on orders o  (cost=0.43..12.75 rows=200 width=36)
+                          Index Cond: ((order_date >= '2024-01-01'::date) AND (order_date <= '2024-12-31'::date))
+        ->  Hash  (cost=4.25..4.25 rows=200 width=36)
+              ->  Index Scan using idx_products_category on products p  (cost=0.43..4.25 rows=200 width=36)
+                    Index Cond: (category_id = 5)"""
+}
+
+PLAN_ANALYSIS_HINTS = {
+    "PostgreSQL Nested Loop Plan": "Look for: Sequential scans, high cost operations, missing indexes",
+    "SQL Server Plan with Issues": "Look for: Index scans vs seeks, hash joins, sort operations", 
+    "MySQL EXPLAIN Output": "Look for: Full table scans, high row counts, missing key usage",
+    "Complex Join Plan": "Look for: Join order efficiency, proper index usage, sort operations"
+}
+
+CODE_EXAMPLES = {
+    "Stored Procedure with SQL Injection": """CREATE PROCEDURE GetCustomerOrders(@CustomerId INT, @StartDate DATE = NULL)
+AS
+BEGIN
+    DECLARE @sql NVARCHAR(MAX)
+    SET @sql = 'SELECT * FROM orders WHERE customer_id = ' + CAST(@CustomerId AS NVARCHAR(10))
+    
+    IF @StartDate IS NOT NULL
+        SET @sql = @sql + ' AND order_date >= ''' + CAST(@StartDate AS NVARCHAR(10)) + ''''
+    
+    EXEC sp_executesql @sql
+    
+    -- Get customer details
+    SELECT name, email FROM customers WHERE id = @CustomerId
+END""",
+    
+    "Function with Performance Issues": """CREATE FUNCTION CalculateCustomerValue(@CustomerId INT)
+RETURNS MONEY
+AS
+BEGIN
+    DECLARE @TotalValue MONEY = 0
+    
+    -- BAD: Scalar function that will be called row-by-row
+    SELECT @TotalValue = (
+        SELECT SUM(total_amount) 
+        FROM orders 
+        WHERE customer_id = @CustomerId 
+          AND status = 'completed'
+          AND YEAR(order_date) = YEAR(GETDATE())  -- BAD: Function in WHERE
+    )
+    
+    -- BAD: Additional query in function
+    IF @TotalValue > 10000
+        SET @TotalValue = @TotalValue * 1.1  -- 10% bonus
+    
+    RETURN ISNULL(@TotalValue, 0)
+END""",
+    
+    "Problematic View Definition": """CREATE VIEW CustomerOrderSummary AS
+SELECT 
+    c.customer_id,
+    c.customer_name,
+    -- BAD: Scalar subqueries (will execute for each row)
+    (SELECT COUNT(*) FROM orders WHERE customer_id = c.customer_id) as total_orders,
+    (SELECT SUM(total_amount) FROM orders WHERE customer_id = c.customer_id) as total_spent,
+    (SELECT MAX(order_date) FROM orders WHERE customer_id = c.customer_id) as last_order_date,
+    -- BAD: Function in SELECT
+    dbo.CalculateCustomerValue(c.customer_id) as customer_value
+FROM customers c
+WHERE c.status = 'active' """,
+    
+    "Trigger with Issues": """CREATE TRIGGER trg_update_inventory
+ON order_items
+AFTER INSERT
+AS
+BEGIN
+    -- BAD: Cursor when set-based operation would work
+    DECLARE item_cursor CURSOR FOR
+        SELECT product_id, quantity FROM inserted
+    
+    DECLARE @ProductId INT, @Quantity INT
+    OPEN item_cursor
+    FETCH NEXT FROM item_cursor INTO @ProductId, @Quantity
+    
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        -- BAD: Individual updates instead of set-based
+        UPDATE products 
+        SET stock_quantity = stock_quantity - @Quantity
+        WHERE product_id = @ProductId
+        
+        FETCH NEXT FROM item_cursor INTO @ProductId, @Quantity
+    END
+    
+    CLOSE item_cursor
+    DEALLOCATE item_cursor
+END"""
+}
+
+CODE_ISSUE_DESCRIPTIONS = {
+    "Stored Procedure with SQL Injection": "🚨 Critical: SQL injection vulnerability, no error handling",
+    "Function with Performance Issues": "⚠️ Warning: Scalar function, function in WHERE clause",
+    "Problematic View Definition": "⚠️ Warning: Multiple scalar subqueries, performance issues",
+    "Trigger with Issues": "💡 Suggestion: Use set-based operations instead of cursors"
+}
+
+REGRESSION_SCENARIOS = {
+    "Index Drop Regression": {
+        "description": "Performance regression caused by accidentally dropping an important index",
+        "timeline": [
+            "Day 1-10: Normal performance (avg 150ms)",
+            "Day 11: Index dropped during maintenance", 
+            "Day 11-15: Performance degrades (avg 2.3s, +1400%)",
+            "Day 16: Issue discovered and index recreated",
+            "Day 17+: Performance restored"
+        ],
+        "symptoms": [
+            "Sudden spike in query response times",
+            "Increased CPU usage on database server",
+            "User complaints about slow page loads",
+            "Query execution plans showing table scans"
+        ],
+        "query": "SELECT * FROM users WHERE email = 'user@example.com'"
+    },
+    
+    "Data Growth Regression": {
+        "description": "Gradual performance degradation due to table growth without proper indexing",
+        "timeline": [
+            "Month 1: 100K records, 50ms avg",
+            "Month 3: 500K records, 150ms avg",
+            "Month 6: 1M records, 450ms avg", 
+            "Month 9: 2M records, 1.2s avg",
+            "Month 12: 5M records, 3.5s avg"
+        ],
+        "symptoms": [
+            "Gradual increase in response times",
+            "Queries that were fast becoming slower",
+            "Exponential growth in execution time",
+            "Resource utilization trending upward"
+        ],
+        "query": "SELECT COUNT(*) FROM orders WHERE status = 'pending'"
+    },
+    
+    "Schema Change Regression": {
+        "description": "Performance impact from database schema modifications",
+        "timeline": [
+            "Week 1: Baseline performance established",
+            "Week 2: Schema change deployed (new column added)",
+            "Week 3: Gradual performance degradation noticed",
+            "Week 4: Query plans changed, using different indexes",
+            "Week 5: Statistics updated, performance improved"
+        ],
+        "symptoms": [
+            "Query plan changes after schema updates",
+            "Different index usage patterns",
+            "Inconsistent query performance",
+            "Need for statistics updates"
+        ],
+        "query": "SELECT o.*, u.username FROM orders o JOIN users u ON o.user_id = u.user_id"
+    }
+}
+
+
+def render(ctx):
+    """Draw the page"""
+    st.title("📚 Demo Examples & Copy-Paste Templates")
+    st.markdown("Ready-to-use examples for testing each optimization tool. Simply copy and paste these into the respective sections.")
+    
+    # Quick navigation
+    st.markdown("### 🎯 Quick Navigation")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("💬 NL-to-SQL Examples"):
+            st.session_state.demo_section = "nl_examples"
+        if st.button("⚡ Performance Examples"):
+            st.session_state.demo_section = "performance_examples"
+    with col2:
+        if st.button("📊 Index Examples"):
+            st.session_state.demo_section = "index_examples"
+        if st.button("📖 Execution Plans"):
+            st.session_state.demo_section = "plan_examples"
+    with col3:
+        if st.button("🔍 Code Review Examples"):
+            st.session_state.demo_section = "code_examples"
+        if st.button("📈 Regression Scenarios"):
+            st.session_state.demo_section = "regression_examples"
+    
+    # Initialize session state
+    if 'demo_section' not in st.session_state:
+        st.session_state.demo_section = "nl_examples"
+    
+    st.markdown("---")
+    
+    # Natural Language to SQL Examples
+    if st.session_state.demo_section == "nl_examples":
+        st.markdown("## 💬 Natural Language to SQL Examples")
+        st.markdown("Copy these natural language queries and paste them in the **Natural Language to SQL** tool:")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("### 🛒 E-commerce Examples")
+            
+            for i, example in enumerate(ECOMMERCE_EXAMPLES, 1):
+                with st.expander(f"Example {i}: {example[:50]}..."):
+                    st.code(example)
+                    if st.button(f"📋 Copy", key=f"ecom_{i}"):
+                        st.success("✅ Copied to clipboard! Paste in Natural Language to SQL tool.")
+        
+        with col2:
+            st.markdown("### 👥 HR System Examples")
+            
+            for i, example in enumerate(HR_EXAMPLES, 1):
+                with st.expander(f"Example {i}: {example[:50]}..."):
+                    st.code(example)
+                    if st.button(f"📋 Copy", key=f"hr_{i}"):
+                        st.success("✅ Copied to clipboard! Paste in Natural Language to SQL tool.")
+    
+    # Performance Analysis Examples
+    elif st.session_state.demo_section == "performance_examples":
+        st.markdown("## ⚡ Query Performance Analysis Examples")
+        st.markdown("Copy these slow queries and paste them in the **Query Performance Analyzer** tool:")
+        
+        for title, query in PERFORMANCE_EXAMPLES.items():
+            with st.expander(f"🐌 {title}"):
+                st.markdown(f"**Issue:** {title}")
+                st.code(query, language="sql")
+                if st.button(f"📋 Copy Query", key=f"perf_{title}"):
+                    st.success("✅ Copied! Paste in Query Performance Analyzer.")
+                
+                # Show expected improvements
+                st.info(f"💡 {PERFORMANCE_IMPROVEMENTS.get(title, 'Significant performance improvement expected')}")
+    
+    # Index Advisor Examples
+    elif st.session_state.demo_section == "index_examples":
+        st.markdown("## 📊 Index Advisor Examples")
+        st.markdown("Review these scenarios in the **Index Advisor** tool:")
+        
+        for scenario_name, scenario in INDEX_SCENARIOS.items():
+            with st.expander(f"📈 {scenario_name}"):
+                st.markdown(f"**Description:** {scenario['description']}")
+                
+                st.markdown("**Sample Queries:**")
+                for i, query in enumerate(scenario['queries'], 1):
+                    st.code(f"-- Query {i}\n{query}", language="sql")
+                
+                st.markdown("**Expected Index Recommendations:**")
+                for i, index in enumerate(scenario['expected_indexes'], 1):
+                    st.code(f"-- Recommendation {i}\n{index}", language="sql")
+                
+                if st.button(f"📋 Copy All Queries", key=f"idx_{scenario_name}"):
+                    st.success("✅ Scenario copied! Use these in Index Advisor.")
+    
+    # Execution Plan Examples  
+    elif st.session_state.demo_section == "plan_examples":
+        st.markdown("## 📖 Execution Plan Examples")
+        st.markdown("Copy these execution plans and paste them in the **Query Plan Explainer** tool:")
+        
+        for plan_type, plan_text in PLAN_EXAMPLES.items():
+            with st.expander(f"🔍 {plan_type}"):
+                st.code(plan_text, language="text")
+                if st.button(f"📋 Copy Plan", key=f"plan_{plan_type}"):
+                    st.success("✅ Copied! Paste in Query Plan Explainer.")
+                
+                # Add analysis hints
+                st.info(f"💡 Analysis Focus: {PLAN_ANALYSIS_HINTS.get(plan_type, 'General performance analysis')}")
+    
+    # Code Review Examples
+    elif st.session_state.demo_section == "code_examples":
+        st.markdown("## 🔍 SQL Code Review Examples")
+        st.markdown("Copy these problematic code examples and paste them in the **SQL Code Reviewer** tool:")
+        
+        for code_type, code_text in CODE_EXAMPLES.items():
+            with st.expander(f"🐛 {code_type}"):
+                st.code(code_text, language="sql")
+                if st.button(f"📋 Copy Code", key=f"code_{code_type}"):
+                    st.success("✅ Copied! Paste in SQL Code Reviewer.")
+                
+                # Show expected issues
+                st.warning(f"Expected Issues: {CODE_ISSUE_DESCRIPTIONS.get(code_type, 'Various code quality issues')}")
+    
+    # Regression Scenarios
+    elif st.session_state.demo_section == "regression_examples":
+        st.markdown("## 📈 Performance Regression Scenarios")
+        st.markdown("Use these scenarios to understand the **Regression Detector** tool:")
+        
+        for scenario_name, scenario in REGRESSION_SCENARIOS.items():
+            with st.expander(f"📉 {scenario_name}"):
+                st.markdown(f"**Description:** {scenario['description']}")
+                
+                st.markdown("**Timeline:**")
+                for event in scenario['timeline']:
+                    st.markdown(f"- {event}")
+                
+                st.markdown("**Symptoms to Watch For:**")
+                for symptom in scenario['symptoms']:
+                    st.markdown(f"- {symptom}")
+                
+                st.markdown("**Sample Query to Monitor:**")
+                st.code(scenario['query'], language="sql")
+                
+                if st.button(f"📋 Copy Scenario", key=f"reg_{scenario_name}"):
+                    st.success("✅ Scenario details copied! Use this context in Regression Detector.")
+    
+    # Getting Started Guide
+    st.markdown("---")
+    st.markdown("## 🚀 How to Use These Examples")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("""
+        ### 📋 Copy-Paste Instructions:
+        
+        1. **Click any "📋 Copy" button** above
+        2. **Navigate to the appropriate tool** using the sidebar
+        3. **Paste the example** into the input field
+        4. **Click the analyze/process button** for that tool
+        5. **Review the results** and recommendations
+        """)
+    
+    with col2:
+        st.markdown("""
+        ### 🎯 Recommended Learning Path:
+        
+        1. **Start with NL-to-SQL examples** - See AI in action
+        2. **Try Performance Analysis** - Learn optimization 
+        3. **Explore Index Advisor** - Understand indexing
+        4. **Review Execution Plans** - Deep technical analysis
+        5. **Test Code Review** - Best practices
+        6. **Setup Regression Monitoring** - Proactive monitoring
+        """)
+    
+    # Tips and best practices
+    st.markdown("### 💡 Pro Tips")
+    st.markdown("""
+    <div class="success-card">
+        <h4>🌟 Getting the Most from These Examples:</h4>
+        <ul>
+            <li><strong>Compare Results:</strong> Try the same query in multiple tools to see different insights</li>
+            <li><strong>Follow Recommendations:</strong> Implement the suggested optimizations and measure improvements</li>
+            <li><strong>Learn Patterns:</strong> Notice common issues like missing indexes, poor JOIN orders</li>
+            <li><strong>Experiment:</strong> Modify the examples to match your own database scenarios</li>
+            <li><strong>Progressive Learning:</strong> Start with simple examples, then try more complex ones</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
@@ -0,0 +1,274 @@
+"""Automatic Index Advisor."""
+import html
+import random
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from sqlopt.ai_helpers import ai_generate_index_recommendations
+from sqlopt.core import get_index_simulator
+from sqlopt.fingerprint import aggregate
+from sqlopt.index_redundancy import describe_redundancy, find_redundant, make_index, reclaimable
+from sqlopt.index_selection import IndexCandidate, create_statement, select_indexes, workload_from_statements
+from sqlopt.index_simulator import parse_candidate, primary_key, summarize_comparisons
+
+# Used for the recommendations until a workload is pasted
+SAMPLE_WORKLOAD = [
+    "SELECT * FROM orders WHERE user_id = ? AND status = 'pending'",
+    "SELECT * FROM products WHERE category_id = ? AND price BETWEEN ? AND ?",
+    "SELECT * FROM users WHERE email = ?",
+    "SELECT * FROM orders WHERE status = ? AND order_date >= ? ORDER BY order_date",
+    "SELECT product_id, SUM(quantity) FROM order_items WHERE order_id = ? GROUP BY product_id",
+    "SELECT COUNT(*) FROM users WHERE created_at >= ? AND status = 'active'",
+    "UPDATE orders SET status = ? WHERE order_id = ?",
+    "INSERT INTO orders (user_id, total_amount, order_date, status) VALUES (?, ?, ?, ?)",
+]
+
+
+@st.cache_resource(max_entries=16)
+def choose_indexes(workload, budget_mb, write_budget, existing):
+    """Indexes the cost model picks for the workload, with statistics from the SQLite stand-in"""
+    simulator = get_index_simulator("E-commerce")
+    model = workload_from_statements(workload, simulator.schema, simulator.table_stats())
+    keys = [IndexCandidate(table, (primary_key(table, columns),), ())
+            for table, columns in simulator.schema.items() if primary_key(table, columns)]
+    return select_indexes(model, budget_mb, write_budget, existing + tuple(keys))
+
+
+@st.cache_resource(max_entries=16)
+def measure_candidates(workload, statements):
+    """Summary of each candidate index's measured effect on the workload, keyed by statement"""
+    candidates = {statement: parse_candidate(statement) for statement in statements}
+    results = get_index_simulator("E-commerce").simulate(workload, list(candidates.values()))
+    return {statement: summarize_comparisons(results[candidate.name]) for statement, candidate in candidates.items()}
+
+
+def catalog_from_frame(indexes):
+    """CatalogIndexes for the rows of the current-indexes table"""
+    return [make_index(row['Index_Name'], row['Table'], row['Columns'].split(", "), unique=row['Type'] == 'PRIMARY',
+                       size_mb=row['Size_MB']) for _, row in indexes.iterrows()]
+
+
+def describe_measurement(measured, statement):
+    """Card text for one recommendation's measurement"""
+    summary = measured[statement]
+    if not summary["speedup"]:
+        return (f"No effect: SQLite did not use the index for any of the {summary['measured']} "
+                f"runnable workload queries")
+    return (f"{summary['speedup']:.1f}× faster on the {summary['uses_index']} of {summary['measured']} workload "
+            f"queries that use it ({summary['before_ms']:.2f} ms → {summary['after_ms']:.2f} ms)")
+
+
+def render(ctx):
+    """Draw the page"""
+    ai_client = ctx.ai_client
+    ai_ready = ctx.ai_ready
+    
+    st.title("📊 Automatic Index Advisor")
+    st.markdown("ML-powered recommendations for optimal index strategies.")
+    
+    tab1, tab2, tab3 = st.tabs(["🔍 Index Analysis", "➕ Recommendations", "📈 Impact Analysis"])
+    
+    with tab1:
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            st.subheader("Current Index Analysis")
+            
+            # Mock current indexes
+            current_indexes = pd.DataFrame({
+                'Table': ['users', 'orders', 'products', 'order_items', 'users', 'orders'],
+                'Index_Name': ['idx_users_email', 'idx_orders_date', 'idx_products_name', 
+                              'idx_orderitems_composite', 'PRIMARY', 'idx_orders_user'],
+                'Columns': ['email', 'order_date', 'name', 'order_id, product_id', 
+                           'user_id', 'user_id'],
+                'Type': ['BTREE', 'BTREE', 'BTREE', 'COMPOSITE', 'PRIMARY', 'BTREE'],
+                'Size_MB': [12.5, 45.2, 23.1, 67.8, 8.9, 34.6],
+                'Usage_Score': [85, 92, 45, 78, 100, 88],
+                'Status': ['Active', 'Active', 'Underused', 'Active', 'Active', 'Active']
+            })
+            
+            st.dataframe(current_indexes, use_container_width=True)
+            
+            catalog = catalog_from_frame(current_indexes)
+            redundant = find_redundant(catalog)
+            if redundant:
+                savings = reclaimable(catalog, redundant)
+                items = "".join(f"<li>{html.escape(describe_redundancy(r))}</li>" for r in redundant)
+                st.markdown(f"""
+                <div class="warning-card">
+                    <h4>♻️ {len(redundant)} redundant indexes, {sum(t['size_mb'] for t in savings.values()):.1f} MB reclaimable</h4>
+                    <ul>{items}</ul>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.success("✅ No duplicate or left-prefix-redundant indexes")
+        
+        with col2:
+            st.subheader("Index Health")
+            
+            # Index usage distribution
+            usage_data = pd.DataFrame({
+                'Category': ['Highly Used (>80%)', 'Moderately Used (50-80%)', 'Underused (<50%)'],
+                'Count': [4, 1, 1]
+            })
+            
+            fig = px.pie(usage_data, values='Count', names='Category', 
+                        title="Index Usage Distribution")
+            fig.update_layout(height=300)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.metric("Total Index Size", "192.1 MB", "+5.2%")
+            st.metric("Avg Usage Score", "81.3%", "+2.1%")
+    
+    with tab2:
+        st.subheader("🤖 ML-Generated Index Recommendations")
+        
+        pasted = [q.strip() for q in st.session_state.get("index_workload", "").split("\n") if q.strip()]
+        workload = tuple(pasted or SAMPLE_WORKLOAD)
+        existing = tuple(IndexCandidate(row['Table'], tuple(row['Columns'].split(", ")), ())
+                         for _, row in current_indexes.iterrows())
+        
+        budget_col1, budget_col2 = st.columns(2)
+        with budget_col1:
+            budget_mb = st.number_input("Storage budget (MB)", min_value=1, max_value=1000000, value=50, step=10)
+        with budget_col2:
+            write_budget = st.slider("Write overhead budget (% of rows written)", 0, 1000, 300, step=25,
+                                     help="Index entries the chosen indexes add per row the workload writes")
+        
+        with st.spinner("🧪 Choosing indexes and measuring them on a generated SQLite copy of the schema..."):
+            chosen = choose_indexes(workload, budget_mb, write_budget, existing)
+            statements = tuple(create_statement(r) for r in chosen)
+            measured = measure_candidates(workload, statements)
+        generated_rows = sum(get_index_simulator("E-commerce").rows.values())
+        st.caption(f"Chosen by cost model from {'your workload below' if pasted else 'a sample workload'} "
+                   f"({len(workload)} statements), using statistics and measurements from a generated SQLite copy "
+                   f"of the E-commerce schema ({generated_rows:,} rows) with and without each index.")
+        if not chosen:
+            st.info("No new index pays for itself within these budgets; the current indexes already serve this workload.")
+        
+        total_benefit = sum(r.benefit for r in chosen) or 1
+        for recommendation, statement in zip(chosen, statements):
+            share = recommendation.benefit / total_benefit
+            priority = 'High' if share >= 0.2 else 'Medium' if share >= 0.05 else 'Low'
+            priority_color = {
+                'High': 'red',
+                'Medium': 'orange', 
+                'Low': 'green'
+            }[priority]
+            
+            st.markdown(f"""
+            <div style="border-left: 4px solid {priority_color}; padding: 1rem; margin: 1rem 0; background: #f8f9fa;">
+                <h4 style="color: {priority_color};">{priority} Priority - CREATE</h4>
+                <p><strong>Table:</strong> {recommendation.table}</p>
+                <p><strong>Recommendation:</strong> {statement}</p>
+                <p><strong>Estimated Benefit:</strong> {share:.0%} of the modelled savings, serving
+                {len(recommendation.templates)} templates; {recommendation.size_mb:.1f} MB,
+                {recommendation.write_overhead:,} index writes per workload run</p>
+                <p><strong>Measured Improvement:</strong> {describe_measurement(measured, statement)}</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        if st.button("📋 Generate Implementation Script", type="primary"):
+            st.subheader("Implementation SQL Script")
+            names = ", ".join(f"'{statement.split()[2]}'" for statement in statements)
+            # Current indexes the new ones make redundant can go in the same change
+            proposed = [make_index(statement.split()[2], r.table, r.columns, r.include)
+                        for r, statement in zip(chosen, statements)]
+            drops = [f"-- {describe_redundancy(r)}\nDROP INDEX {r.index.name};"
+                     for r in find_redundant(catalog + proposed) if r.index not in proposed]
+            st.code("\n".join(
+                [f"-- {recommendation.size_mb:.1f} MB, serves {len(recommendation.templates)} templates\n{statement};"
+                 for recommendation, statement in zip(chosen, statements)] + drops + [f"""
+-- Monitoring queries to track impact
+SELECT 
+    schemaname,
+    tablename,
+    indexname,
+    idx_scan,
+    idx_tup_read,
+    idx_tup_fetch
+FROM pg_stat_user_indexes 
+WHERE indexname IN ({names or "''"});"""]), language="sql")
+        
+        # Add AI-powered index recommendations
+        st.markdown("---")
+        st.subheader("🤖 AI-Powered Index Analysis")
+        
+        sample_queries = st.text_area(
+            "Paste your query workload here (one query per line):",
+            key="index_workload",
+            placeholder="""SELECT * FROM orders WHERE user_id = ? AND status = 'pending'
+SELECT * FROM products WHERE category_id = ? AND price BETWEEN ? AND ?
+SELECT * FROM users WHERE email = ?""",
+            height=100
+        )
+        
+        current_indexes_input = st.text_area(
+            "Current indexes (optional):",
+            placeholder="idx_users_email, idx_orders_date, idx_products_name",
+            height=60
+        )
+        
+        queries_list = [q.strip() for q in sample_queries.split('\n') if q.strip()]
+        if queries_list:
+            # Statements differing only in literals are one template, weighted by how often it runs
+            templates = aggregate(queries_list)
+            st.caption(f"{len(queries_list)} statements → {len(templates)} templates")
+            st.dataframe(pd.DataFrame([{
+                "Calls": template.calls,
+                "Share": f"{template.calls / len(queries_list):.0%}",
+                "Template": template.template,
+            } for template in templates]), use_container_width=True, hide_index=True)
+        
+        if st.button("🤖 Get AI Index Recommendations", type="primary"):
+            if queries_list:
+                with st.spinner("🤖 Claude is analyzing your query workload..."):
+                    if ai_ready:
+                        ai_recommendations = ai_generate_index_recommendations(
+                            ai_client, 
+                            queries_list, 
+                            current_indexes_input
+                        )
+                        
+                        st.markdown("### 🤖 Claude's Index Recommendations")
+                        st.markdown(ai_recommendations)
+                    else:
+                        st.warning("⚠️ Claude AI not available. Please add your API key to use this feature.")
+            else:
+                st.error("Please provide sample queries for analysis.")
+    
+    with tab3:
+        st.subheader("📈 Impact Analysis & Monitoring")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Before/After performance comparison
+            before_after = pd.DataFrame({
+                'Query_Type': ['Product Search', 'Order Status', 'User Analytics', 'Reporting'],
+                'Before_ms': [2340, 1250, 890, 3400],
+                'After_ms': [780, 690, 760, 2100],
+                'Improvement_%': [67, 45, 15, 38]
+            })
+            
+            fig = go.Figure()
+            fig.add_trace(go.Bar(name='Before', x=before_after['Query_Type'], y=before_after['Before_ms']))
+            fig.add_trace(go.Bar(name='After', x=before_after['Query_Type'], y=before_after['After_ms']))
+            fig.update_layout(title="Query Performance: Before vs After", barmode='group')
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            # Index size over time
+            dates = pd.date_range(start='2024-07-01', end='2024-07-26', freq='D')
+            size_data = pd.DataFrame({
+                'Date': dates,
+                'Total_Size_MB': [180 + random.uniform(-10, 15) for _ in dates],
+                'Query_Performance': [100 - random.uniform(0, 30) for _ in dates]
+            })
+            
+            fig2 = px.line(size_data, x='Date', y='Total_Size_MB', 
+                          title="Index Size Growth Over Time")
+            st.plotly_chart(fig2, use_container_width=True)
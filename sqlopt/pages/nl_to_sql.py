@@ -0,0 +1,101 @@
+"""Natural Language to SQL converter."""
+import streamlit as st
+
+from sqlopt.ai_helpers import ai_natural_language_to_sql_cached
+from sqlopt.core import SEMANTIC_THRESHOLD
+from sqlopt.schemas import SCHEMAS
+
+
+def render(ctx):
+    """Draw the page"""
+    ai_client = ctx.ai_client
+    ai_ready = ctx.ai_ready
+    
+    st.title("💬 Natural Language to SQL Converter")
+    st.markdown("Convert your natural language requests into optimized SQL queries.")
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        selected_schema = st.selectbox("Select Database Schema", list(SCHEMAS.keys()))
+        
+        st.subheader("Available Tables")
+        for table, columns in SCHEMAS[selected_schema].items():
+            with st.expander(f"📋 {table}"):
+                st.write("Columns:", ", ".join(columns))
+    
+    with col2:
+        st.subheader("Natural Language Query")
+        nl_query = st.text_area(
+            "Describe what you want to query:",
+            placeholder="e.g., Show me the top 5 customers by total order value in the last 30 days",
+            height=100
+        )
+        
+        similarity_threshold = st.slider("Reuse cached answer above similarity", 0.70, 1.00,
+                                         SEMANTIC_THRESHOLD, 0.01,
+                                         help="Near-duplicate questions for the same schema are answered from cache")
+        
+        if st.button("🔄 Convert to SQL", type="primary"):
+            if nl_query:
+                with st.spinner("🤖 Claude is analyzing your request and generating optimized SQL..."):
+                    
+                    # Prepare schema information
+                    schema_context = f"Database Schema: {selected_schema}\n"
+                    for table, columns in SCHEMAS[selected_schema].items():
+                        schema_context += f"\nTable: {table}\nColumns: {', '.join(columns)}\n"
+                    
+                    # Get AI-generated response
+                    if ai_ready:
+                        ai_response, cache_match = ai_natural_language_to_sql_cached(
+                            ai_client, nl_query, schema_context, similarity_threshold
+                        )
+                        
+                        if cache_match:
+                            st.info(f"⚡ Answered from cache: similar to \"{cache_match['question']}\" "
+                                    f"(similarity {cache_match['score']:.2f})")
+                        st.markdown("### 🤖 Claude's Analysis")
+                        st.markdown(ai_response)
+                        
+                    else:
+                        # Fallback mock response when Claude is not available
+                        st.warning("⚠️ Claude AI not available. Showing sample response.")
+                        
+                        if "top" in nl_query.lower() and "customer" in nl_query.lower():
+                            sql_query = """-- Generated SQL Query (Mock Response)
+SELECT 
+    u.username,
+    u.email,
+    SUM(o.total_amount) as total_spent,
+    COUNT(o.order_id) as order_count
+FROM users u
+JOIN orders o ON u.user_id = o.user_id
+WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
+    AND o.status = 'completed'
+GROUP BY u.user_id, u.username, u.email
+ORDER BY total_spent DESC
+LIMIT 5;"""
+                        else:
+                            sql_query = """-- Generated SQL Query (Mock Response)
+SELECT *
+FROM users u
+JOIN orders o ON u.user_id = o.user_id
+WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
+ORDER BY o.order_date DESC;"""
+                        
+                        st.markdown("### Generated SQL Query")
+                        st.code(sql_query, language="sql")
+                        
+                        # Mock optimization suggestions
+                        st.markdown("### 🚀 Optimization Suggestions")
+                        st.markdown("""
+                        <div class="success-card">
+                            <h4>✅ Query Optimizations Applied:</h4>
+                            <ul>
+                                <li>Added proper indexes hint for user_id and order_date</li>
+                                <li>Used efficient JOIN strategy</li>
+                                <li>Limited result set with TOP clause</li>
+                                <li>Added appropriate WHERE clause filtering</li>
+                            </ul>
+                        </div>
+                        """, unsafe_allow_html=True)
@@ -0,0 +1,353 @@
+"""Query Performance Analyzer: single, batch and offline batch-job analysis."""
+from datetime import datetime
+import random
+import time
+
+import pandas as pd
+import plotly.express as px
+import sqlparse
+import streamlit as st
+
+from sqlopt.ai_helpers import ai_analyze_queries_batch, ai_analyze_query_performance
+from sqlopt.benchmark import equivalence, latency_summary, run_benchmark
+from sqlopt.core import (AI_CONCURRENCY, BENCHMARK_TIMEOUT_S, SLOW_LOG_DIR, get_batch_store,
+                         get_benchmark_target, last_ai_timing_caption)
+from sqlopt.fingerprint import aggregate
+from sqlopt.slow_log import FORMATS, detect_format, log_files, resolve_log_path, summarize_log
+
+# Shown as the sample rewrite and used as the default rewritten query to benchmark
+SAMPLE_REWRITE = """-- Optimized version with better JOIN order and filtering
+SELECT /*+ USE_INDEX(p, idx_products_category_id) */ 
+       o.order_id, u.username, p.name, oi.quantity
+FROM products p
+JOIN order_items oi ON p.product_id = oi.product_id
+JOIN orders o ON oi.order_id = o.order_id
+JOIN users u ON o.user_id = u.user_id
+WHERE p.category_id = 5
+  AND o.order_date BETWEEN '2024-01-01' AND '2024-12-31'
+ORDER BY o.order_date DESC;"""
+
+
+def show_measured_metrics(sql):
+    """Latency and rows of one query, measured on the benchmark target"""
+    target = get_benchmark_target()
+    result = run_benchmark(target, [("Query", sql)], runs=5, timeout_s=BENCHMARK_TIMEOUT_S)[0]
+    summary = latency_summary(result)
+    if not summary["runs"]:
+        reason = f"timed out after {BENCHMARK_TIMEOUT_S:g}s" if result.timeouts else "; ".join(result.errors[:1])
+        st.info(f"ℹ️ Could not measure this query on {target.label}: {reason}")
+        return
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a:
+        st.metric("Execution Time (p50)", f"{summary['p50']:,.1f} ms")
+    with col_b:
+        st.metric("p95", f"{summary['p95']:,.1f} ms")
+    with col_c:
+        st.metric("Rows Returned", f"{result.rows:,}")
+    with col_d:
+        st.metric("Runs", summary["runs"])
+    st.caption(f"Measured on {target.label} after one warm-up run")
+
+
+def render(ctx):
+    """Draw the page"""
+    ai_client = ctx.ai_client
+    ai_ready = ctx.ai_ready
+    
+    st.title("⚡ Query Performance Analyzer")
+    st.markdown("Analyze slow queries and get AI-powered optimization recommendations.")
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.subheader("Query Input")
+        query_input = st.text_area(
+            "Paste your SQL query here:",
+            value="""SELECT o.order_id, u.username, p.name, oi.quantity
+FROM orders o
+JOIN users u ON o.user_id = u.user_id
+JOIN order_items oi ON o.order_id = oi.order_id
+JOIN products p ON oi.product_id = p.product_id
+WHERE o.order_date BETWEEN '2024-01-01' AND '2024-12-31'
+AND p.category_id = 5
+ORDER BY o.order_date DESC;""",
+            height=200
+        )
+        
+        if st.button("🔍 Analyze Performance", type="primary"):
+            with st.spinner("🤖 Claude is analyzing query performance..."):
+                
+                if ai_ready:
+                    # Get AI-powered analysis
+                    st.markdown("### 🤖 Claude's Performance Analysis")
+                    st.write_stream(ai_analyze_query_performance(ai_client, query_input, stream=True))
+                    st.caption(last_ai_timing_caption())
+                    
+                    st.markdown("### 📊 Measured Performance")
+                    show_measured_metrics(query_input)
+                    
+                else:
+                    # Fallback mock response
+                    st.warning("⚠️ Claude AI not available. Showing sample analysis.")
+                    time.sleep(2)
+                    
+                    st.markdown("### 📊 Measured Performance")
+                    show_measured_metrics(query_input)
+                    
+                    # Issues identified
+                    st.markdown("### ⚠️ Issues Identified")
+                    st.markdown("""
+                    <div class="warning-card">
+                        <h4>🐌 Performance Bottlenecks:</h4>
+                        <ul>
+                            <li><strong>Missing Index:</strong> No index on products.category_id causing full table scan</li>
+                            <li><strong>Inefficient JOIN:</strong> order_items table join could be optimized</li>
+                            <li><strong>Large Date Range:</strong> Full year scan on orders table</li>
+                        </ul>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Optimization recommendations
+                    st.markdown("### 🚀 Optimization Recommendations")
+                    
+                    st.markdown("**1. Add Missing Indexes:**")
+                    st.code("""
+CREATE INDEX idx_products_category_id ON products(category_id);
+CREATE INDEX idx_orders_date_user ON orders(order_date, user_id);
+                    """, language="sql")
+                    
+                    st.markdown("**2. Optimized Query:**")
+                    st.code(SAMPLE_REWRITE, language="sql")
+                    
+                    st.markdown("**Expected Performance Improvement: 65% faster execution** "
+                                "(check it with the benchmark below)")
+        
+        st.markdown("---")
+        st.subheader("🏁 Before/After Benchmark")
+        target = get_benchmark_target()
+        st.caption(f"Runs the query above and a rewrite against {target.label}: warm-up, then interleaved "
+                   "repetitions, optionally from several concurrent clients.")
+        rewritten_input = st.text_area("Rewritten query:", value=SAMPLE_REWRITE, height=200, key="benchmark_rewrite")
+        bench_col1, bench_col2, bench_col3 = st.columns(3)
+        with bench_col1:
+            bench_runs = st.slider("Repetitions", 3, 100, 10)
+        with bench_col2:
+            bench_clients = st.slider("Concurrent clients", 1, 16, 1)
+        with bench_col3:
+            bench_timeout = st.number_input("Timeout per run (s)", min_value=1.0, max_value=600.0,
+                                            value=BENCHMARK_TIMEOUT_S, step=5.0)
+        
+        if st.button("🏁 Run Benchmark"):
+            with st.spinner(f"Running {bench_runs} interleaved repetitions on {bench_clients} clients..."):
+                results = run_benchmark(target, [("Original", query_input), ("Rewritten", rewritten_input)],
+                                        runs=bench_runs, timeout_s=bench_timeout, concurrency=bench_clients)
+            summaries = [latency_summary(result) for result in results]
+            st.dataframe(pd.DataFrame([{
+                "Query": result.label,
+                "p50 (ms)": round(summary["p50"], 2) if summary["runs"] else None,
+                "p95 (ms)": round(summary["p95"], 2) if summary["runs"] else None,
+                "p99 (ms)": round(summary["p99"], 2) if summary["runs"] else None,
+                "Rows": result.rows,
+                "Runs": summary["runs"],
+                "Timeouts": result.timeouts,
+                "Error": result.errors[0] if result.errors else "",
+            } for result, summary in zip(results, summaries)]), use_container_width=True, hide_index=True)
+            
+            original, rewritten = summaries
+            if original["runs"] and rewritten["runs"]:
+                st.metric("Speedup (p50)", f"{original['p50'] / rewritten['p50']:.2f}×",
+                          f"{(rewritten['p50'] - original['p50']) / original['p50']:+.0%} latency", delta_color="inverse")
+            verdict = equivalence(*results)
+            if verdict == "identical":
+                st.success("✅ The rewrite returns identical results")
+            elif verdict == "same rows, different order":
+                st.warning("⚠️ The rewrite returns the same rows in a different order")
+            elif verdict == "not compared":
+                st.info("ℹ️ Results not compared: one of the queries did not run")
+            else:
+                st.error(f"❌ The rewrite returns {verdict}")
+        
+        st.markdown("---")
+        st.subheader("📦 Batch Analysis")
+        batch_input = st.text_area(
+            "Paste several queries separated by semicolons:",
+            placeholder="""SELECT * FROM orders WHERE user_id = 42;
+SELECT * FROM products WHERE UPPER(name) LIKE '%PHONE%';""",
+            height=150
+        )
+        batch_concurrency = st.slider("Concurrent requests", 1, 32, AI_CONCURRENCY)
+        
+        if st.button("🚀 Analyze Batch"):
+            batch_queries = [q.strip() for q in sqlparse.split(batch_input) if q.strip()]
+            if not batch_queries:
+                st.error("Please provide at least one query.")
+            elif ai_ready:
+                # One analysis per template: repeats that differ only in literals share it
+                templates = aggregate(batch_queries)
+                with st.spinner(f"🤖 Claude is analyzing {len(templates)} query templates..."):
+                    started = time.perf_counter()
+                    batch_results = ai_analyze_queries_batch(
+                        ai_client, [template.example for template in templates], batch_concurrency)
+                    elapsed = time.perf_counter() - started
+                
+                st.success(f"✅ Analyzed {len(batch_queries)} queries ({len(templates)} templates) in {elapsed:.1f}s")
+                for i, (template, analysis) in enumerate(zip(templates, batch_results), 1):
+                    with st.expander(f"Template {i} (×{template.calls}): {template.template[:60]}"):
+                        st.code(template.example, language="sql")
+                        st.markdown(analysis)
+            else:
+                st.warning("⚠️ Claude AI not available. Please add your API key to use this feature.")
+        
+        st.markdown("---")
+        st.subheader("🌙 Batch Jobs")
+        st.caption("Submit a whole workload file for offline analysis. Jobs survive restarts; "
+                   "come back later and resume or browse the results.")
+        batch_store = get_batch_store()
+        
+        workload_file = st.file_uploader("Workload file (.sql)", type=["sql", "txt"], key="workload_file")
+        if workload_file is not None:
+            workload = [q.strip() for q in sqlparse.split(workload_file.getvalue().decode("utf-8", errors="replace"))
+                        if q.strip()]
+            st.write(f"{len(workload)} statements, {len(aggregate(workload))} templates")
+            if st.button("🌙 Create Batch Job", disabled=not workload):
+                job_id = batch_store.create_job(workload, workload_file.name)
+                batch_store.run_step(job_id)
+                st.success(f"✅ Job {job_id} submitted via the {batch_store.backend.name} batch backend")
+        
+        batch_jobs = batch_store.jobs()
+        if batch_jobs:
+            st.dataframe(pd.DataFrame([{
+                "Job": job["job_id"],
+                "Name": job["name"],
+                "Backend": job["backend"],
+                "Statements": job["total_statements"],
+                "Templates": job["total"],
+                "Done": job["succeeded"] + job["errored"],
+                "Errored": job["errored"],
+                "Created": datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M"),
+            } for job in batch_jobs]), use_container_width=True, hide_index=True)
+            
+            job_names = {job["job_id"]: job["name"] for job in batch_jobs}
+            selected_job = st.selectbox("Job", list(job_names),
+                                        format_func=lambda job_id: f"{job_id} — {job_names[job_id]}")
+            progress = batch_store.progress(selected_job)
+            st.progress(progress["fraction"],
+                        text=f"{progress['succeeded'] + progress['errored']}/{progress['total']} analyzed")
+            
+            if not progress["complete"] and st.button("🔄 Resume / Check Progress"):
+                with st.spinner("Checking batch progress..."):
+                    batch_store.run_step(selected_job)
+                st.rerun()
+            
+            result_filter = st.text_input("Filter results by query text:", key="batch_result_filter")
+            job_results = batch_store.results(selected_job, search=result_filter or None, limit=200)
+            for item in job_results:
+                icon = {"succeeded": "✅", "errored": "❌"}.get(item["status"], "⏳")
+                with st.expander(f"{icon} ×{item['occurrences']} {item['query'][:70]}"):
+                    st.code(item["query"], language="sql")
+                    if item["status"] == "succeeded":
+                        st.markdown(item["result"])
+                    elif item["status"] == "errored":
+                        st.error(item["error"])
+                    else:
+                        st.info("Still being analyzed.")
+        
+        st.markdown("---")
+        st.subheader("📜 Slow Query Log")
+        st.caption("Summarize a PostgreSQL (stderr or csvlog) or MySQL slow-query log by query template. "
+                   "The log is streamed, so multi-gigabyte files are fine when read from the server's log "
+                   "directory (SQLOPT_SLOW_LOG_DIR).")
+        log_file = st.file_uploader("Upload a log", type=["log", "csv", "txt", "gz"], key="slow_log_file")
+        # Only files in the configured log directory can be read from the server's disk
+        log_name = None
+        if SLOW_LOG_DIR:
+            log_name = st.selectbox(f"...or read a log file from {SLOW_LOG_DIR}:", ["", *log_files(SLOW_LOG_DIR)],
+                                    format_func=lambda name: name or "(none)")
+        log_format = st.selectbox("Log format", ["auto", *FORMATS],
+                                  format_func=lambda fmt: "Detect automatically" if fmt == "auto" else FORMATS[fmt])
+        
+        if st.button("📜 Summarize Log", disabled=log_file is None and not log_name):
+            if log_file is not None:
+                log_file.seek(0)
+            try:
+                source = log_file if log_file is not None else resolve_log_path(SLOW_LOG_DIR, log_name)
+                fmt = detect_format(source) if log_format == "auto" else log_format
+                with st.spinner(f"Reading {FORMATS[fmt]}..."):
+                    started = time.perf_counter()
+                    summary = summarize_log(source, fmt)
+                    elapsed = time.perf_counter() - started
+            except (OSError, ValueError) as e:
+                st.error(f"❌ Could not read the log: {e}")
+            else:
+                st.session_state.slow_log_summary = {
+                    "format": FORMATS[fmt],
+                    "statements": summary.statements,
+                    "seconds": elapsed,
+                    "templates": [template.as_dict() for template in summary.templates("total_ms")],
+                }
+        
+        log_summary = st.session_state.get("slow_log_summary")
+        if log_summary:
+            log_templates = log_summary["templates"]
+            total_ms = sum(t["total_ms"] for t in log_templates)
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Statements", f"{log_summary['statements']:,}")
+            with col_b:
+                st.metric("Templates", f"{len(log_templates):,}")
+            with col_c:
+                st.metric("Total Time", f"{total_ms / 1000:,.1f}s")
+            st.caption(f"{log_summary['format']} read in {log_summary['seconds']:.1f}s")
+            
+            order_by = st.radio("Worst offenders by", ["total_ms", "mean_ms", "max_ms", "calls", "rows"],
+                                horizontal=True, key="slow_log_order",
+                                format_func=lambda key: {"total_ms": "Total time", "mean_ms": "Mean time",
+                                                         "max_ms": "Max time", "calls": "Calls",
+                                                         "rows": "Rows examined"}[key])
+            worst = sorted(log_templates, key=lambda t: -(t[order_by] or 0))[:50]
+            st.dataframe(pd.DataFrame([{
+                "Calls": t["calls"],
+                "Total (ms)": round(t["total_ms"], 1),
+                "Share": f"{t['total_ms'] / total_ms:.1%}" if total_ms else "-",
+                "Mean (ms)": round(t["mean_ms"], 1),
+                "Max (ms)": round(t["max_ms"] or 0, 1),
+                "Rows": t["rows"],
+                "Template": t["template"],
+            } for t in worst]), use_container_width=True, hide_index=True)
+            
+            offender = st.selectbox("Analyze a template", range(len(worst)),
+                                    format_func=lambda i: f"{worst[i]['calls']}× {worst[i]['template'][:80]}")
+            if st.button("🔍 Analyze Template"):
+                st.code(worst[offender]["example"], language="sql")
+                if ai_ready:
+                    st.write_stream(ai_analyze_query_performance(ai_client, worst[offender]["example"], stream=True))
+                    st.caption(last_ai_timing_caption())
+                else:
+                    st.warning("⚠️ Claude AI not available. Please add your API key to use this feature.")
+    
+    with col2:
+        st.subheader("Quick Stats")
+        
+        # Performance trend chart
+        dates = pd.date_range(start='2024-07-01', end='2024-07-26', freq='D')
+        performance_data = pd.DataFrame({
+            'Date': dates,
+            'Avg_Response_Time': [random.uniform(1.5, 4.0) for _ in dates],
+            'Query_Count': [random.randint(100, 500) for _ in dates]
+        })
+        
+        fig = px.line(performance_data, x='Date', y='Avg_Response_Time', 
+                     title="Query Performance Trend")
+        fig.update_layout(height=300)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.subheader("Common Issues")
+        issues_data = pd.DataFrame({
+            'Issue': ['Missing Index', 'Poor JOIN Order', 'Large Scans', 'No WHERE Clause'],
+            'Frequency': [45, 32, 28, 15]
+        })
+        
+        fig2 = px.bar(issues_data, x='Frequency', y='Issue', orientation='h',
+                     title="Most Common Query Issues")
+        fig2.update_layout(height=300)
+        st.plotly_chart(fig2, use_container_width=True)
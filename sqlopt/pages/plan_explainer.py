@@ -0,0 +1,172 @@
+"""Query Plan Explainer."""
+import html
+import time
+
+import streamlit as st
+
+from sqlopt.ai_helpers import CHUNK_TOKEN_BUDGET, ai_explain_execution_plan, ai_explain_execution_plan_chunked
+from sqlopt.chunking import estimate_tokens, split_execution_plan
+from sqlopt.core import last_ai_timing_caption
+from sqlopt.plan_parser import find_issues, format_tree, parse_plan, summarize
+
+
+def render(ctx):
+    """Draw the page"""
+    ai_client = ctx.ai_client
+    ai_ready = ctx.ai_ready
+    
+    st.title("📖 Query Plan Explainer")
+    st.markdown("Natural language explanations of complex database execution plans.")
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.subheader("Query Execution Plan")
+        
+        plan_input = st.text_area(
+            "Paste your execution plan here:",
+            value="""Nested Loop  (cost=1.15..8.17 rows=1 width=68)
+  ->  Index Scan using idx_orders_user on orders o  (cost=0.57..4.59 rows=1 width=36)
+        Index Cond: (user_id = 12345)
+        Filter: ((order_date >= '2024-01-01'::date) AND (order_date <= '2024-12-31'::date))
+  ->  Index Scan using idx_products_id on products p  (cost=0.58..3.60 rows=1 width=32)
+        Index Cond: (product_id = order_items.product_id)
+Hash Join  (cost=5.18..10.25 rows=2 width=100)
+  Hash Cond: (oi.order_id = o.order_id)
+  ->  Seq Scan on order_items oi  (cost=0.00..4.50 rows=150 width=32)
+  ->  Hash  (cost=4.59..4.59 rows=1 width=68)""",
+            height=300
+        )
+        
+        db_engine = st.selectbox("Database Engine", ["PostgreSQL", "MySQL", "SQL Server", "Oracle"])
+        plan_chunk_budget = st.number_input("Per-chunk token budget", min_value=500, max_value=100000,
+                                            value=CHUNK_TOKEN_BUDGET, step=500,
+                                            help="Larger plans are split at subtree boundaries and explained in parallel")
+        
+        if st.button("🔍 Explain Plan", type="primary"):
+            with st.spinner("🤖 Claude is analyzing the execution plan..."):
+                
+                if ai_ready:
+                    # Get AI-powered explanation
+                    plan_chunks = split_execution_plan(plan_input, plan_chunk_budget)
+                    if len(plan_chunks) > 1:
+                        st.info(f"📚 Large plan (~{estimate_tokens(plan_input):,} tokens): explaining "
+                                f"{len(plan_chunks)} subtrees concurrently, then merging.")
+                        explanation_stream = ai_explain_execution_plan_chunked(ai_client, plan_chunks,
+                                                                               db_engine, stream=True)
+                    else:
+                        explanation_stream = ai_explain_execution_plan(ai_client, plan_input, db_engine,
+                                                                       stream=True)
+                    
+                    st.markdown("### 🤖 Claude's Execution Plan Analysis")
+                    st.write_stream(explanation_stream)
+                    st.caption(last_ai_timing_caption())
+                    
+                else:
+                    # Fallback mock response
+                    st.warning("⚠️ Claude AI not available. Showing sample explanation.")
+                    time.sleep(1.5)
+                    
+                    st.markdown("### 🧠 AI-Generated Explanation")
+                    
+                    explanation = """
+                    **Overall Strategy:** This query uses a combination of index scans and hash joins to retrieve data efficiently.
+                    
+                    **Step-by-Step Breakdown:**
+                    
+                    1. **Index Scan on Orders** (Cost: 0.57-4.59)
+                       - The database starts by looking up orders for user_id 12345 using the `idx_orders_user` index
+                       - This is very efficient as it directly targets the specific user
+                       - Additional filtering on order_date happens after the index lookup
+                    
+                    2. **Nested Loop with Products** (Cost: 1.15-8.17)
+                       - For each order found, the database looks up product details
+                       - Uses `idx_products_id` index for efficient product lookups
+                       - Nested loops are efficient here due to the small result set from step 1
+                    
+                    3. **Hash Join with Order Items** (Cost: 5.18-10.25)
+                       - The database creates a hash table from the orders result set
+                       - Performs a sequential scan on order_items (concerning for large tables)
+                       - Joins order_items with the hashed orders using order_id
+                    
+                    **Performance Characteristics:**
+                    - **Good:** Efficient use of indexes for initial lookups
+                    - **Concerning:** Sequential scan on order_items table
+                    - **Overall Cost:** ~10.25 units (moderate for this data size)
+                    """
+                    
+                    st.markdown(explanation)
+    
+    with col2:
+        if 'plan_input' in locals() and plan_input:
+            st.subheader("📊 Plan Analysis")
+            
+            try:
+                analysis = analyze_plan(plan_input)
+            except ValueError as e:
+                st.info(f"ℹ️ Plan analysis supports PostgreSQL EXPLAIN output in text or JSON format ({e}).")
+                return
+            summary = analysis["summary"]
+            
+            # Metrics from the parsed plan
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Total Cost", f"{summary['total_cost']:,.2f}", f"{summary['nodes']:,} operators",
+                          delta_color="off")
+                if summary["actual_rows"] is not None:
+                    st.metric("Actual Rows", f"{summary['actual_rows']:,}", f"estimated {summary['estimated_rows']:,}",
+                              delta_color="off")
+                else:
+                    st.metric("Expected Rows", f"{summary['estimated_rows']:,}")
+            with col_b:
+                joins = ", ".join(f"{name} ×{count}" for name, count in summary["joins"].items())
+                st.metric("Join Types", joins or "None")
+                if summary["index_usage"] is not None:
+                    st.metric("Index Usage", f"{summary['index_usage']:.0%}",
+                              f"{summary['index_scans']} of {summary['scans']} table scans", delta_color="off")
+            if summary["execution_ms"] is not None:
+                col_c, col_d = st.columns(2)
+                col_c.metric("Execution Time", f"{summary['execution_ms']:,.2f} ms")
+                if summary["cache_hit_ratio"] is not None:
+                    col_d.metric("Buffer Cache Hit Ratio", f"{summary['cache_hit_ratio']:.1%}")
+            
+            # Issues found in the plan
+            st.markdown("### ⚠️ Issues Identified")
+            warnings = [message for severity, message in analysis["issues"] if severity == "warning"]
+            notes = [message for severity, message in analysis["issues"] if severity != "warning"]
+            if warnings:
+                items = "".join(f"<li>{html.escape(message)}</li>" for message in warnings)
+                st.markdown(f"""
+            <div class="warning-card">
+                <h4>Performance Concerns:</h4>
+                <ul>{items}</ul>
+            </div>
+            """, unsafe_allow_html=True)
+            else:
+                st.markdown("""
+            <div class="success-card">
+                <h4>No sequential scans over large tables, misestimates or disk spills found.</h4>
+            </div>
+            """, unsafe_allow_html=True)
+            for message in notes:
+                st.caption(f"ℹ️ {message}")
+            
+            if summary["slowest"]:
+                st.markdown("### ⏱️ Where the Time Goes")
+                st.dataframe([{"Operator": label, "Self time (ms)": round(ms, 3)}
+                              for label, ms in summary["slowest"]], use_container_width=True)
+            
+            # Visual plan representation
+            st.markdown("### 🌳 Visual Plan Tree")
+            st.code(analysis["tree"], language="text")
+
+
+@st.cache_resource(max_entries=16)
+def analyze_plan(plan_text):
+    """Summary, issues and tree text of a plan; the node tree itself is not kept"""
+    plan = parse_plan(plan_text)
+    return {
+        "summary": summarize(plan),
+        "issues": [(severity, message) for severity, _, message in find_issues(plan)],
+        "tree": format_tree(plan),
+    }
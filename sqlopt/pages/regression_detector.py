@@ -0,0 +1,470 @@
+"""Performance Regression Detector."""
+import html
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from sqlopt.alert_rules import RULE_SETTINGS, read_notifications
+from sqlopt.baselines import load_summary
+from sqlopt.core import DATABASE_URL, get_monitor
+from sqlopt.monitor import (BASELINE_SUMMARY_FILE, CHECK_FREQUENCIES, HISTORY_DAYS, SAMPLE_QUERIES, SampleSource,
+                            check_interval, load_config, read_status, save_config)
+from sqlopt.plan_diff import diff_plans, format_change
+
+RETENTION_DAYS = {"7 days": 7, "30 days": 30, "90 days": 90, "1 year": 365}
+BASELINE_WINDOWS = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
+# Per-query override columns -> alert setting
+OVERRIDE_COLUMNS = {"Response_ms": "response_threshold_ms", "Regression_%": "regression_threshold_pct",
+                    "Error_%": "error_threshold_pct"}
+
+
+@st.cache_resource(max_entries=2)
+def load_baselines(path, mtime, size):
+    """The monitor's latest per-series baseline summary (mtime keys the cache)"""
+    return load_summary(path, size)
+
+
+def overrides_frame(overrides):
+    """Editable table of per-query threshold overrides"""
+    return pd.DataFrame([dict({"Query": key}, **{column: settings.get(setting)
+                                                  for column, setting in OVERRIDE_COLUMNS.items()})
+                         for key, settings in overrides.items()],
+                        columns=["Query", *OVERRIDE_COLUMNS]).astype({column: float for column in OVERRIDE_COLUMNS})
+
+
+def overrides_from_frame(frame):
+    """Saved form of the edited overrides table, leaving out blank rows and cells"""
+    overrides = {}
+    for row in frame.to_dict("records"):
+        query = str(row["Query"] or "").strip()
+        settings = {setting: float(row[column]) for column, setting in OVERRIDE_COLUMNS.items()
+                    if row[column] is not None and not pd.isna(row[column])}
+        if query and query != "nan" and settings:
+            overrides[query] = settings
+    return overrides
+
+
+def option_index(options, value, default=0):
+    """Position of a saved setting among a selectbox's option values"""
+    values = list(options.values()) if isinstance(options, dict) else list(options)
+    return values.index(value) if value in values else default
+
+
+# Before/after plans for the sample regressions
+SAMPLE_PLANS = {
+    "Q_001": ("""Index Scan using idx_users_email on users  (cost=0.42..8.44 rows=1 width=120)
+  Index Cond: ((email)::text = 'user@example.com'::text)
+  Filter: ((status)::text = 'active'::text)""",
+              """Seq Scan on users  (cost=0.00..28450.00 rows=1 width=120)
+  Filter: (((email)::text = 'user@example.com'::text) AND ((status)::text = 'active'::text))"""),
+    "Q_045": ("""Hash Join  (cost=12.25..2150.40 rows=25 width=180)
+  Hash Cond: (p.category_id = c.category_id)
+  ->  Index Scan using idx_products_name on products p  (cost=0.42..2137.20 rows=2500 width=160)
+        Index Cond: ((name)::text ~~ 'laptop%'::text)
+  ->  Hash  (cost=7.50..7.50 rows=380 width=28)
+        ->  Seq Scan on categories c  (cost=0.00..7.50 rows=380 width=28)""",
+              """Nested Loop  (cost=0.70..9850.10 rows=1 width=180)
+  ->  Seq Scan on products p  (cost=0.00..9400.00 rows=1 width=160)
+        Filter: ((name)::text ~~ 'laptop%'::text)
+  ->  Index Scan using categories_pkey on categories c  (cost=0.28..8.30 rows=1 width=28)
+        Index Cond: (category_id = p.category_id)"""),
+    "Q_123": ("""HashAggregate  (cost=18250.00..18262.50 rows=1000 width=44)
+  Group Key: o.user_id
+  ->  Index Scan using idx_orders_date on orders o  (cost=0.43..17500.00 rows=150000 width=16)
+        Index Cond: (order_date >= '2024-07-01'::date)""",
+              """GroupAggregate  (cost=120500.00..131900.00 rows=1000 width=44)
+  Group Key: o.user_id
+  ->  Sort  (cost=120500.00..123000.00 rows=1000000 width=16)
+        Sort Key: o.user_id
+        ->  Seq Scan on orders o  (cost=0.00..45000.00 rows=1000000 width=16)
+              Filter: (order_date >= '2024-07-01'::date)"""),
+}
+
+
+def call_summary(counts, totals, errors):
+    """(calls, mean ms, error %) of a run of store buckets"""
+    calls = float(np.sum(counts, dtype=np.float64))
+    if not calls:
+        return 0.0, np.nan, np.nan
+    return calls, float(np.sum(totals, dtype=np.float64)) / calls, float(np.sum(errors, dtype=np.float64)) / calls * 100
+
+
+def recommend_actions(changes):
+    """Follow-up actions for the kinds of plan change found"""
+    actions = []
+    for change in changes:
+        if change.kind == "access_path" and " using " in change.before:
+            index = change.before.split(" using ")[1]
+            actions.append(f"Check that index {index} on {change.where} still exists and is valid")
+        elif change.kind == "index" and change.before:
+            actions.append(f"Check that index {change.before} on {change.where} still exists and is valid")
+        elif change.kind == "rows":
+            actions.append(f"Run ANALYZE: estimates for {change.where} moved from {change.before:,} to {change.after:,} rows")
+        elif change.kind in ("join_method", "join_order"):
+            actions.append("Compare row estimates feeding the join; pin the previous plan while statistics are fixed")
+    return list(dict.fromkeys(actions))[:5] or ["Update table statistics and review recent schema changes"]
+
+
+def render(ctx):
+    """Draw the page"""
+    st.title("📈 Performance Regression Detector")
+    st.markdown("Monitor and identify when queries start performing poorly over time.")
+    
+    tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "🔍 Query Analysis", "⚙️ Configuration"])
+    
+    # Collection and checks run in the background monitor; this page only reads their results
+    monitor = get_monitor()
+    store = monitor.store
+    config = load_config(store.path)
+    status = read_status(store.path)
+    if status is None and monitor.lock_file is not None:
+        with st.spinner("Collecting the first query metrics..."):
+            monitor.checked.wait(60)
+        status = read_status(store.path)
+    if status is None:
+        st.info("⏳ Waiting for the first check of the regression monitor (`python -m sqlopt.monitor`).")
+        return
+    now = int(time.time())
+    series = store.series()
+    
+    if DATABASE_URL and isinstance(monitor.source, SampleSource):
+        st.info("ℹ️ The configured database has no statement statistics to monitor (PostgreSQL and MySQL do); "
+                "showing the sample queries instead.")
+    age = now - status["checked_at"]
+    if status.get("error"):
+        st.error(f"❌ Last monitor check failed: {status['error']}"
+                 + (" Showing the results of the last successful check." if "series" in status else ""))
+    elif age > 2 * check_interval(config) + 60:
+        st.warning(f"⚠️ Monitor has not checked in for {age / 60:,.0f} minutes")
+    else:
+        st.caption(f"🛰️ Last check {age:.0f}s ago ({status['check_frequency'].lower()}) · "
+                   f"{status.get('series', 0):,} queries in {status.get('duration_s', 0):.2f}s")
+    
+    baselines_path = os.path.join(store.path, BASELINE_SUMMARY_FILE)
+    baseline = None
+    if os.path.exists(baselines_path):
+        baseline = load_baselines(baselines_path, os.stat(baselines_path).st_mtime_ns, len(series))
+    
+    with tab1:
+        # Fleet-wide hourly totals: every monitored query's calls, time and errors
+        hours, counts = store.matrix(now - HISTORY_DAYS * 86400, now, "1h", "count")
+        _, totals = store.matrix(now - HISTORY_DAYS * 86400, now, "1h", "total_ms")
+        _, failures = store.matrix(now - HISTORY_DAYS * 86400, now, "1h", "errors")
+        calls = counts.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_response = np.where(calls > 0, totals.sum(axis=0) / calls, np.nan)
+            error_rate = np.where(calls > 0, failures.sum(axis=0) / calls * 100, np.nan)
+        found = status.get("regressions", [])
+        last_day = totals[:, -24:].sum() / max(counts[:, -24:].sum(), 1)
+        previous_day = totals[:, -48:-24].sum() / max(counts[:, -48:-24].sum(), 1)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Queries Monitored", f"{len(series):,}")
+        with col2:
+            new_today = sum(regression["onset"] >= now - 86400 for regression in found)
+            st.metric("Regressions Detected", len(found), f"+{new_today} today" if new_today else None,
+                      delta_color="inverse")
+        with col3:
+            st.metric("Avg Response Time", f"{last_day:,.0f}ms",
+                      f"{(last_day - previous_day) / previous_day:+.0%}" if previous_day else None,
+                      delta_color="inverse")
+        with col4:
+            # Share of monitored queries with no alert firing
+            healthy = 1 - status.get("alerting_series", 0) / max(status.get("series", 0), 1)
+            st.metric("System Health", f"{healthy:.0%}",
+                      f"{status['alerting_series']} alerting" if status.get("alerting_series") else None,
+                      delta_color="inverse")
+        
+        # Performance trend over time
+        st.subheader("📈 System Performance Trends")
+        
+        perf_data = pd.DataFrame({
+            'timestamp': pd.to_datetime(hours, unit='s'),
+            'avg_response_time': avg_response,
+            'query_count': calls,
+            'error_rate': error_rate,
+        })
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig1 = px.line(perf_data, x='timestamp', y='avg_response_time',
+                          title="Average Response Time Trend")
+            fig1.add_hline(y=config["response_threshold_ms"], line_dash="dash", line_color="red", 
+                          annotation_text="Warning Threshold")
+            st.plotly_chart(fig1, use_container_width=True)
+        
+        with col2:
+            fig2 = px.line(perf_data, x='timestamp', y='error_rate',
+                          title="Error Rate Trend")
+            fig2.add_hline(y=config["error_threshold_pct"], line_dash="dash", line_color="red",
+                          annotation_text="Critical Threshold")
+            st.plotly_chart(fig2, use_container_width=True)
+        
+        # Recent regressions
+        st.subheader("🚨 Recent Performance Regressions")
+        
+        labels = [regression["label"].partition(": ") for regression in found]
+        # Baselines are null for queries with no calls before their regression; those cells stay blank
+        baseline_ms = pd.Series([regression["baseline_ms"] for regression in found], dtype=float)
+        current_ms = pd.Series([regression["current_ms"] for regression in found], dtype=float)
+        regressions = pd.DataFrame({
+            'Query_ID': [query_id for query_id, _, _ in labels],
+            'Query_Type': [kind for _, _, kind in labels],
+            'Baseline_ms': baseline_ms.round().astype('Int64'),
+            'Baseline_p95_ms': pd.Series([regression["baseline_p95_ms"] for regression in found],
+                                         dtype=float).round().astype('Int64'),
+            'Current_ms': current_ms.round().astype('Int64'),
+            'Regression_%': ((current_ms / baseline_ms - 1) * 100).round().astype('Int64'),
+            'Confidence': [round(regression["confidence"], 4) for regression in found],
+            'Detected_At': pd.to_datetime([regression["onset"] for regression in found], unit='s')
+                             .strftime('%Y-%m-%d %H:%M'),
+            'Status': np.where(current_ms >= baseline_ms * (1 + config["regression_threshold_pct"] / 100),
+                               '🔴 Critical', '🟡 Warning'),
+        })
+        
+        if regressions.empty:
+            st.success("✅ No latency regressions detected in the last 30 days")
+        else:
+            st.dataframe(regressions, use_container_width=True)
+        
+        # Alert rules evaluated by the monitor on every check
+        st.subheader("🔔 Active Alerts")
+        
+        firing = status.get("alerts_firing", {})
+        alert_cols = st.columns(len(RULE_SETTINGS))
+        for column, (rule, (_, _, description)) in zip(alert_cols, RULE_SETTINGS.items()):
+            with column:
+                st.metric(description.capitalize(), firing.get(rule, 0))
+        if status.get("alerts"):
+            st.dataframe(pd.DataFrame({
+                'Rule': [alert["rule"] for alert in status["alerts"]],
+                'Query': [alert["label"] for alert in status["alerts"]],
+                'Value': [round(alert["value"], 1) for alert in status["alerts"]],
+                'Threshold': [alert["threshold"] for alert in status["alerts"]],
+                'Since': pd.to_datetime([alert["since"] for alert in status["alerts"]], unit='s')
+                           .strftime('%Y-%m-%d %H:%M'),
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.success("✅ No alerts firing")
+        
+        if config["dashboard_alerts"]:
+            notifications = read_notifications(store.path, 10)
+            if notifications:
+                with st.expander(f"📨 Recent Notifications ({len(notifications)})"):
+                    for notification in reversed(notifications):
+                        sent = ", ".join(notification["delivered"]) or "dashboard only"
+                        if notification.get("error"):
+                            sent += f" (⚠️ {notification['error']})"
+                        st.markdown(f"**{pd.to_datetime(notification['at'], unit='s'):%Y-%m-%d %H:%M}** · "
+                                    f"{html.escape(notification['message'])} · *{sent}*")
+    
+    with tab2:
+        st.subheader("🔍 Individual Query Analysis")
+        
+        # Every monitored query, the latest regressions first
+        regressed = [regression["fingerprint"] for regression in found]
+        labels = {entry.fingerprint: entry.label for entry in series}
+        options = [key for key in regressed if key in labels]
+        options += sorted(set(labels) - set(options), key=labels.get)
+        selected_key = st.selectbox("Select Query for Deep Analysis", options,
+                                    format_func=lambda key: labels[key][:100])
+        
+        if selected_key is None:
+            st.info("ℹ️ No queries have been recorded yet.")
+        else:
+            selected_query = labels[selected_key]
+            query_id = selected_query.partition(":")[0]
+            series_id = {entry.fingerprint: entry.id for entry in series}[selected_key]
+            # The monitor's latest change point for this query, if it regressed
+            change = next((regression for regression in found if regression["fingerprint"] == selected_key), None)
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                # Hourly history of the selected query from the metrics store
+                times, response_times = store.read(selected_key, now - HISTORY_DAYS * 86400, now, "1h", "mean_ms")
+                query_dates = pd.to_datetime(times, unit='s')
+                query_perf = pd.DataFrame({
+                    'timestamp': query_dates,
+                    'response_time': response_times,
+                })
+                
+                fig = px.line(query_perf, x='timestamp', y='response_time',
+                             title=f"Performance History: {selected_query[:80]}")
+                baseline_p95 = change["baseline_p95_ms"] if change else \
+                    baseline["p95_ms"][series_id] if baseline is not None else None
+                if baseline_p95 is not None and np.isfinite(baseline_p95):
+                    fig.add_hline(y=baseline_p95, line_dash="dot", line_color="green",
+                                  annotation_text="Baseline p95")
+                
+                if change:
+                    regression_date = pd.to_datetime(change["onset"], unit='s')
+                    
+                    # Use add_shape which is more reliable with datetime data
+                    fig.add_shape(
+                        type="line",
+                        x0=regression_date, x1=regression_date,
+                        y0=0, y1=1,
+                        yref="paper",
+                        line=dict(color="red", width=2, dash="dash"),
+                    )
+                    
+                    # Add annotation separately
+                    fig.add_annotation(
+                        x=regression_date,
+                        y=np.nanmax(response_times) * 0.9,
+                        text=f"Regression Detected ({change['current_ms'] / change['before_ms'] - 1:+.0%})",
+                        showarrow=True,
+                        arrowhead=2,
+                        arrowcolor="red",
+                        bgcolor="white",
+                        bordercolor="red"
+                    )
+                
+                st.plotly_chart(fig, use_container_width=True)
+                
+                if change:
+                    st.markdown(f"**Change point:** {regression_date:%Y-%m-%d %H:%M} · "
+                                f"**Mean:** {change['before_ms']:,.0f}ms → {change['current_ms']:,.0f}ms · "
+                                f"**Confidence:** {change['confidence']:.2%}")
+                else:
+                    st.info("No latency regression in the last 30 days.")
+                
+                # Root cause analysis
+                st.markdown("### 🔍 Root Cause Analysis")
+                
+                sample_before, sample_after = SAMPLE_PLANS.get(query_id, ("", ""))
+                plan_col1, plan_col2 = st.columns(2)
+                with plan_col1:
+                    plan_before = st.text_area("Plan before the regression", sample_before, height=200,
+                                               key=f"plan_before_{selected_key}")
+                with plan_col2:
+                    plan_after = st.text_area("Plan after the regression", sample_after, height=200,
+                                              key=f"plan_after_{selected_key}")
+                
+                try:
+                    changes = diff_plans(plan_before, plan_after)
+                except ValueError as e:
+                    st.info(f"ℹ️ Paste PostgreSQL EXPLAIN output (text or JSON) for both plans to compare them ({e}).")
+                    changes = None
+                if changes:
+                    items = "".join(f"<li>{html.escape(format_change(change))}</li>" for change in changes[:8])
+                    actions = "".join(f"<li>{html.escape(action)}</li>" for action in recommend_actions(changes))
+                    st.markdown(f"""
+                    <div class="warning-card">
+                        <h4>🔍 Plan changes, largest cost impact first:</h4>
+                        <ul>{items}</ul>
+                        
+                        <h4>📋 Recommended Actions:</h4>
+                        <ul>{actions}</ul>
+                    </div>
+                    """, unsafe_allow_html=True)
+                elif changes is not None:
+                    st.success("✅ The plan did not change; look for data growth, locking or resource contention instead.")
+            
+            with col2:
+                st.markdown("### 📊 Query Details")
+                
+                query_sql = SAMPLE_QUERIES[query_id][1] if query_id in SAMPLE_QUERIES else selected_query
+                st.code(query_sql, language="sql")
+                st.text(f"Fingerprint: {selected_key}")
+                
+                # Last 24 hours against the baseline and the 24 hours before
+                day_times, day_counts = store.read(selected_key, now - 2 * 86400, now, "1h", "count")
+                _, day_totals = store.read(selected_key, now - 2 * 86400, now, "1h", "total_ms")
+                _, day_errors = store.read(selected_key, now - 2 * 86400, now, "1h", "errors")
+                recent = day_times >= now - 86400
+                calls, mean_ms, error_pct = call_summary(day_counts[recent], day_totals[recent], day_errors[recent])
+                calls_before, _, error_pct_before = call_summary(day_counts[~recent], day_totals[~recent],
+                                                                 day_errors[~recent])
+                baseline_ms = change["baseline_ms"] if change else \
+                    baseline["mean_ms"][series_id] if baseline is not None else None
+                
+                st.markdown("### 📈 Current Metrics")
+                if not calls:
+                    st.info("No calls in the last 24 hours.")
+                else:
+                    st.metric("Response Time", f"{mean_ms:,.0f}ms",
+                              f"{mean_ms / baseline_ms - 1:+.0%} vs baseline"
+                              if baseline_ms is not None and np.isfinite(baseline_ms) else None,
+                              delta_color="inverse")
+                    st.metric("Calls per Hour", f"{calls / 24:,.0f}",
+                              f"{calls / calls_before - 1:+.0%}" if calls_before else None)
+                    st.metric("Error Rate", f"{error_pct:.2f}%",
+                              f"{error_pct - error_pct_before:+.2f}%" if calls_before else None,
+                              delta_color="inverse")
+    
+    with tab3:
+        st.subheader("⚙️ Monitoring Configuration")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### Alert Thresholds")
+            
+            response_threshold = st.slider("Response Time Warning (ms)", 100, 5000, config["response_threshold_ms"])
+            regression_threshold = st.slider("Regression Percentage (%)", 25, 200, config["regression_threshold_pct"])
+            error_threshold = st.slider("Error Rate Warning (%)", 1, 10, config["error_threshold_pct"])
+            
+            st.markdown("Per-query overrides (query id such as `Q_001`, label or fingerprint):")
+            overrides = st.data_editor(overrides_frame(config["overrides"]), num_rows="dynamic",
+                                       hide_index=True, use_container_width=True, key="alert_overrides")
+            
+            st.markdown("#### Monitoring Scope")
+            
+            monitor_all = st.checkbox("Monitor All Queries", value=True)
+            if not monitor_all:
+                st.multiselect("Select Query Types", 
+                              ["Login", "Search", "Reports", "Analytics", "Transactions"])
+            
+            monitoring_frequency = st.selectbox("Check Frequency", list(CHECK_FREQUENCIES),
+                                                index=option_index(CHECK_FREQUENCIES, config["check_frequency"]))
+        
+        with col2:
+            st.markdown("#### Notification Settings")
+            
+            email_alerts = st.checkbox("Email Alerts", value=config["email_alerts"])
+            alert_email = config["alert_email"]
+            if email_alerts:
+                alert_email = st.text_input("Alert Email", alert_email)
+            
+            slack_alerts = st.checkbox("Slack Integration", value=config["slack_alerts"])
+            dashboard_alerts = st.checkbox("Dashboard Notifications", value=config["dashboard_alerts"])
+            
+            st.markdown("#### Historical Data")
+            
+            retention_period = st.selectbox("Data Retention", list(RETENTION_DAYS),
+                                            index=option_index(RETENTION_DAYS, config["retention_days"], 3))
+            
+            auto_baseline = st.checkbox("Auto-update Baselines", value=config["auto_baseline"])
+            baseline_window = st.selectbox("Baseline Window", list(BASELINE_WINDOWS),
+                                           index=option_index(BASELINE_WINDOWS, config["baseline_window_days"]))
+            if baseline is not None and status.get("baselines_to"):
+                st.caption(f"Baselines weigh {np.nansum(baseline['calls']):,.0f} calls up to "
+                           f"{pd.to_datetime(status['baselines_to'], unit='s'):%Y-%m-%d %H:%M} UTC, "
+                           f"older calls fading over {status['baseline_window_days']:g} days.")
+        
+        if st.button("💾 Save Configuration", type="primary"):
+            save_config(store.path, {
+                "check_frequency": monitoring_frequency,
+                "response_threshold_ms": response_threshold,
+                "regression_threshold_pct": regression_threshold,
+                "error_threshold_pct": error_threshold,
+                "auto_baseline": auto_baseline,
+                "baseline_window_days": BASELINE_WINDOWS[baseline_window],
+                "retention_days": RETENTION_DAYS[retention_period],
+                "email_alerts": email_alerts,
+                "alert_email": alert_email,
+                "slack_alerts": slack_alerts,
+                "dashboard_alerts": dashboard_alerts,
+                "overrides": overrides_from_frame(overrides),
+            })
+            st.success("✅ Configuration saved successfully!")
+            st.info("Changes take effect at the monitor's next check, within a few seconds.")
@@ -0,0 +1,203 @@
+"""Structural diff of two execution plans of the same query.
+
+Nodes are aligned by what they operate on rather than by position: a scan by
+its table alias, a join or aggregate by the set of aliases beneath it. A
+plan flip therefore shows up as a few precise changes (join method, access
+path, index used, join order, row estimates) instead of a cascade of
+mismatches after the first reshaped subtree. Changes are ranked by how much
+they moved the estimated cost.
+
+Command line::
+
+    python -m sqlopt.plan_diff before.txt after.txt
+    python -m sqlopt.plan_diff --pairs nightly.jsonl --top 50
+"""
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlopt.plan_parser import Plan, parse_plan
+
+PlanChange = namedtuple("PlanChange", ["kind", "where", "before", "after", "cost_delta"])
+PlanDiff = namedtuple("PlanDiff", ["query_id", "cost_before", "cost_after", "changes"])
+
+CHANGE_TITLES = {
+    "join_method": "Join method changed",
+    "join_order": "Join order changed",
+    "access_path": "Access path changed",
+    "index": "Different index used",
+    "aggregate": "Aggregation strategy changed",
+    "rows": "Row estimate changed",
+}
+
+# Estimates that moved by less than this factor are noise from ANALYZE sampling
+ROW_ESTIMATE_FACTOR = 4
+POOL_MIN_PAIRS = 64
+
+_JOINS = {"Hash Join", "Merge Join", "Nested Loop"}
+
+
+def _align(plan):
+    """Map alignment keys to nodes: ("scan", alias), ("join", aliases) or ("aggregate", aliases)
+
+    Relation sets are built bottom-up in one reverse pass over the pre-order node list.
+    """
+    below = {}
+    keyed = defaultdict(list)
+    for node in reversed(plan.nodes):
+        names = set()
+        for child in node.children:
+            names |= below[id(child)]
+        if node.relation:
+            names.add(node.alias or node.relation)
+            keyed["scan", node.alias or node.relation].append(node)
+        names = frozenset(names)
+        below[id(node)] = names
+        if node.node_type in _JOINS:
+            keyed["join", names].append(node)
+        elif node.node_type == "Aggregate" and names:
+            keyed["aggregate", names].append(node)
+    # The reverse pass collected nodes bottom-up; restore plan order so duplicates pair up in order
+    for nodes in keyed.values():
+        nodes.reverse()
+    return keyed
+
+
+def _describe(node):
+    text = f"Parallel {node.node_type}" if node.parallel else node.node_type
+    if node.node_type in _JOINS and node.join_type not in (None, "Inner"):
+        text += f" ({node.join_type})"
+    if node.node_type == "Aggregate" and node.strategy:
+        text += f" ({node.strategy})"
+    return text
+
+
+def _cost_delta(old, new):
+    return (new.total_cost or 0.0) - (old.total_cost or 0.0)
+
+
+def _where(key):
+    kind, names = key
+    return names if kind == "scan" else " ⋈ ".join(sorted(names))
+
+
+def diff_plans(old, new):
+    """PlanChanges between two plans (Plan objects or EXPLAIN text), largest cost movement first"""
+    old = old if isinstance(old, Plan) else parse_plan(old)
+    new = new if isinstance(new, Plan) else parse_plan(new)
+    old_keys = _align(old)
+    new_keys = _align(new)
+    changes = []
+    for key, old_nodes in old_keys.items():
+        for old_node, new_node in zip(old_nodes, new_keys.get(key, ())):
+            where = _where(key)
+            delta = _cost_delta(old_node, new_node)
+            if key[0] == "scan":
+                if (old_node.node_type, old_node.parallel) != (new_node.node_type, new_node.parallel):
+                    changes.append(PlanChange("access_path", where, _scan_text(old_node), _scan_text(new_node), delta))
+                elif old_node.index != new_node.index:
+                    changes.append(PlanChange("index", where, old_node.index, new_node.index, delta))
+            elif _describe(old_node) != _describe(new_node):
+                kind = "join_method" if key[0] == "join" else "aggregate"
+                changes.append(PlanChange(kind, where, _describe(old_node), _describe(new_node), delta))
+            old_rows, new_rows = old_node.plan_rows or 0, new_node.plan_rows or 0
+            if max(old_rows, new_rows) >= ROW_ESTIMATE_FACTOR * max(min(old_rows, new_rows), 1):
+                changes.append(PlanChange("rows", f"{_describe(new_node)} on {where}", old_rows, new_rows, delta))
+
+    # Joins over relation sets that exist in only one plan mean the tables are combined in another order
+    old_joins = [key[1] for key in old_keys if key[0] == "join" and key not in new_keys]
+    new_joins = [key[1] for key in new_keys if key[0] == "join" and key not in old_keys]
+    if old_joins or new_joins:
+        changes.append(PlanChange("join_order", "", _join_order(old_joins), _join_order(new_joins),
+                                  new.total_cost - old.total_cost))
+    changes.sort(key=lambda change: -abs(change.cost_delta))
+    return changes
+
+
+def _scan_text(node):
+    text = f"Parallel {node.node_type}" if node.parallel else node.node_type
+    return f"{text} using {node.index}" if node.index else text
+
+
+def _join_order(sets):
+    return "; ".join("(" + " ⋈ ".join(sorted(names)) + ")" for names in sorted(sets, key=len))
+
+
+def format_change(change):
+    """One readable line for a PlanChange"""
+    where = f" on {change.where}" if change.where and change.kind != "rows" else ""
+    before = f"{change.before:,}" if isinstance(change.before, int) else change.before or "none"
+    after = f"{change.after:,}" if isinstance(change.after, int) else change.after or "none"
+    line = f"{CHANGE_TITLES[change.kind]}{where}: {before} → {after}"
+    if change.kind == "rows":
+        line += f" ({change.where})"
+    return f"{line} (cost {change.cost_delta:+,.2f})"
+
+
+def _diff_pair(pair):
+    query_id, old_text, new_text = pair
+    try:
+        old, new = parse_plan(old_text), parse_plan(new_text)
+    except ValueError:
+        return PlanDiff(query_id, None, None, [])
+    return PlanDiff(query_id, old.total_cost, new.total_cost, diff_plans(old, new))
+
+
+def diff_many(pairs, workers=None):
+    """Diff (query_id, old plan, new plan) triples, in a process pool when there are many; yields PlanDiffs"""
+    pairs = list(pairs)
+    if len(pairs) < POOL_MIN_PAIRS or workers == 1:
+        yield from map(_diff_pair, pairs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_diff_pair, pairs, chunksize=16)
+
+
+def read_pairs(path):
+    """(query_id, old plan, new plan) triples from a JSON-lines file with those three keys"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["query_id"], record["old_plan"], record["new_plan"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare execution plans and report plan flips")
+    parser.add_argument("plans", nargs="*", help="before and after EXPLAIN output files")
+    parser.add_argument("--pairs", help="JSON-lines file of {query_id, old_plan, new_plan} records")
+    parser.add_argument("--top", type=int, default=20, help="queries to show, largest cost increase first")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    if not args.pairs:
+        if len(args.plans) != 2:
+            parser.error("give a before and an after plan, or --pairs")
+        with open(args.plans[0], encoding="utf-8") as before, open(args.plans[1], encoding="utf-8") as after:
+            changes = diff_plans(before.read(), after.read())
+        for change in changes:
+            print(format_change(change))
+        if not changes:
+            print("Plans have the same shape")
+        return 0
+
+    started = time.perf_counter()
+    diffs = list(diff_many(read_pairs(args.pairs), args.workers))
+    elapsed = time.perf_counter() - started
+    flipped = [d for d in diffs if any(c.kind != "rows" for c in d.changes)]
+    flipped.sort(key=lambda d: -((d.cost_after or 0.0) - (d.cost_before or 0.0)))
+    for diff in flipped[:args.top]:
+        print(f"{diff.query_id}: cost {diff.cost_before:,.2f} → {diff.cost_after:,.2f}")
+        for change in diff.changes:
+            if change.kind != "rows":
+                print(f"    {format_change(change)}")
+    unparsed = sum(1 for d in diffs if d.cost_before is None)
+    print(f"\n{len(diffs):,} plan pairs, {len(flipped):,} flipped, {unparsed:,} unparseable in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
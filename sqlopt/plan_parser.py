@@ -0,0 +1,475 @@
+"""Parse PostgreSQL EXPLAIN output into a typed plan tree.
+
+Both the text format (with or without ANALYZE, BUFFERS and COSTS) and the
+JSON format are supported, and produce the same ``PlanNode`` fields, named
+after the JSON keys: text-format labels such as ``HashAggregate`` or
+``Parallel Index Scan Backward`` are normalized to the JSON node type plus
+attributes. Parsing and every derived statistic run in a single pass over
+the input, so cost grows linearly with plan size (100k-node plans included).
+"""
+import json
+import re
+from collections import Counter
+
+# A sequential scan reading more rows than this is worth an index
+SEQ_SCAN_WARN_ROWS = 1000
+# Actual rows off from the estimate by this factor or more mean stale statistics
+MISESTIMATE_FACTOR = 10
+
+_COSTS = re.compile(r"\(cost=([\d.]+)\.\.([\d.]+) rows=([\d.]+) width=(\d+)\)")
+_ACTUAL = re.compile(r"\(actual (?:time=([\d.]+)\.\.([\d.]+) )?rows=([\d.]+) loops=(\d+)\)")
+_JOIN = re.compile(r"(Hash|Merge|Nested Loop) (Left|Right|Full|Semi|Anti|Right Semi|Right Anti) Join$")
+_BUFFER_COUNTER = re.compile(r"(?:(shared|local|temp) )?(\w+)=(\d+)")
+_SUBPLAN_LABEL = re.compile(r"(SubPlan \d+|InitPlan \d+(?: \(returns .*\))?|CTE \S+)\s*$")
+_ROW_COUNT = re.compile(r"\(\d+ rows?\)")
+
+_AGGREGATE_STRATEGIES = {"HashAggregate": "Hashed", "GroupAggregate": "Sorted", "MixedAggregate": "Mixed",
+                         "Aggregate": "Plain"}
+_JOIN_TYPES = {"Hash Join", "Merge Join", "Nested Loop"}
+_INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+_JSON_FIELDS = {
+    "Startup Cost": "startup_cost", "Total Cost": "total_cost", "Plan Rows": "plan_rows",
+    "Plan Width": "plan_width", "Actual Startup Time": "actual_startup_ms",
+    "Actual Total Time": "actual_total_ms", "Actual Rows": "actual_rows", "Actual Loops": "loops",
+    "Relation Name": "relation", "Alias": "alias", "Index Name": "index", "Join Type": "join_type",
+    "Strategy": "strategy", "Parent Relationship": "parent_relationship", "Subplan Name": "subplan_name",
+    "Parallel Aware": "parallel", "Partial Mode": "partial_mode", "Scan Direction": "scan_direction",
+}
+_JSON_BUFFERS = {
+    "Shared Hit Blocks": "shared_hit", "Shared Read Blocks": "shared_read", "Shared Dirtied Blocks": "shared_dirtied",
+    "Shared Written Blocks": "shared_written", "Local Hit Blocks": "local_hit", "Local Read Blocks": "local_read",
+    "Local Dirtied Blocks": "local_dirtied", "Local Written Blocks": "local_written",
+    "Temp Read Blocks": "temp_read", "Temp Written Blocks": "temp_written",
+}
+
+
+class PlanNode:
+    """One operator of an execution plan"""
+
+    __slots__ = ("node_type", "label", "relation", "alias", "index", "join_type", "strategy", "partial_mode",
+                 "parallel", "scan_direction", "parent_relationship", "subplan_name", "startup_cost",
+                 "total_cost", "plan_rows", "plan_width", "actual_startup_ms", "actual_total_ms", "actual_rows",
+                 "loops", "never_executed", "buffers", "details", "children", "parent", "depth")
+
+    def __init__(self, node_type, label=""):
+        self.node_type = node_type
+        self.label = label or node_type
+        self.relation = self.alias = self.index = self.join_type = self.strategy = None
+        self.partial_mode = self.scan_direction = self.parent_relationship = self.subplan_name = None
+        self.parallel = False
+        self.startup_cost = self.total_cost = self.plan_rows = self.plan_width = None
+        self.actual_startup_ms = self.actual_total_ms = self.actual_rows = self.loops = None
+        self.never_executed = False
+        self.buffers = {}
+        self.details = {}
+        self.children = []
+        self.parent = None
+        self.depth = 0
+
+    @property
+    def analyzed(self):
+        return self.loops is not None
+
+    @property
+    def total_actual_rows(self):
+        """Rows produced across all loops (EXPLAIN ANALYZE reports a per-loop average)"""
+        return (self.actual_rows or 0) * (self.loops or 0)
+
+    @property
+    def inclusive_ms(self):
+        """Time spent in this node and its children across all loops"""
+        return (self.actual_total_ms or 0.0) * (self.loops or 0)
+
+    def __repr__(self):
+        return f"PlanNode({self.label!r}, cost={self.total_cost}, rows={self.plan_rows})"
+
+
+class Plan:
+    """A parsed execution plan: root operators plus plan-level timings"""
+
+    def __init__(self, roots, nodes, fmt):
+        self.roots = roots
+        self.nodes = nodes
+        self.format = fmt
+        self.planning_ms = None
+        self.execution_ms = None
+        self.planning_buffers = {}
+
+    @property
+    def root(self):
+        return self.roots[0]
+
+    @property
+    def analyzed(self):
+        return any(node.analyzed for node in self.roots)
+
+    @property
+    def total_cost(self):
+        return sum(root.total_cost or 0.0 for root in self.roots)
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text else value
+
+
+def _parse_buffers(text, buffers):
+    kind = None
+    for new_kind, name, value in _BUFFER_COUNTER.findall(text):
+        kind = new_kind or kind
+        key = f"{kind}_{name}"
+        buffers[key] = buffers.get(key, 0) + int(value)
+
+
+def _parse_estimates(node, text):
+    costs = _COSTS.search(text)
+    if costs:
+        node.startup_cost = float(costs.group(1))
+        node.total_cost = float(costs.group(2))
+        node.plan_rows = _number(costs.group(3))
+        node.plan_width = int(costs.group(4))
+    actual = _ACTUAL.search(text)
+    if actual:
+        if actual.group(2) is not None:
+            node.actual_startup_ms = float(actual.group(1))
+            node.actual_total_ms = float(actual.group(2))
+        node.actual_rows = _number(actual.group(3))
+        node.loops = int(actual.group(4))
+    elif "(never executed)" in text:
+        node.never_executed = True
+        node.loops = 0
+        node.actual_rows = 0
+
+
+def _normalize_label(node, label):
+    """Fill node type and scan/join attributes from a text-format label"""
+    head, _, target = label.partition(" on ")
+    node_type, _, index = head.partition(" using ")
+    relation, _, alias = target.partition(" ")
+    if node_type.startswith("Parallel "):
+        node.parallel = True
+        node_type = node_type[9:]
+    for mode in ("Partial ", "Finalize "):
+        if node_type.startswith(mode):
+            node.partial_mode = mode.strip()
+            node_type = node_type[len(mode):]
+    if node_type.endswith(" Backward"):
+        node.scan_direction = "Backward"
+        node_type = node_type[:-9]
+    join = _JOIN.match(node_type)
+    if join:
+        node_type = "Nested Loop" if join.group(1) == "Nested Loop" else f"{join.group(1)} Join"
+        node.join_type = join.group(2)
+    elif node_type in _JOIN_TYPES:
+        node.join_type = "Inner"
+    if node_type in _AGGREGATE_STRATEGIES:
+        node.strategy = _AGGREGATE_STRATEGIES[node_type]
+        node_type = "Aggregate"
+    elif node_type in ("HashSetOp", "SetOp"):
+        node.strategy = "Hashed" if node_type == "HashSetOp" else "Sorted"
+        node_type = "SetOp"
+
+    if node_type == "Bitmap Index Scan":
+        node.index = relation or None
+    else:
+        node.relation = relation or None
+        node.alias = alias or None
+        node.index = index or None
+        if relation and node_type in ("Insert", "Update", "Delete", "Merge"):
+            node_type = "ModifyTable"
+    node.node_type = node_type
+
+
+def _strip_psql(lines):
+    """Drop psql's header, separator and row-count footer, and aligned-mode continuation marks"""
+    kept = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped == "QUERY PLAN":
+            continue
+        if stripped[0] in "-+(" and (set(stripped) <= {"-", "+"} or _ROW_COUNT.fullmatch(stripped)):
+            continue
+        if line.endswith("+"):
+            line = line[:-1].rstrip()
+        kept.append(line)
+    return kept
+
+
+def parse_text(text):
+    """Parse text-format EXPLAIN output"""
+    return _parse_text_lines(_strip_psql(text.splitlines()))
+
+
+def _parse_text_lines(lines):
+    nodes = []
+    roots = []
+    stack = []
+    plan = Plan(roots, nodes, "text")
+    pending_label = None
+    planning = False
+    base_indent = 0
+    for line in lines:
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        is_node = stripped.startswith("->")
+        if is_node:
+            stripped = stripped[2:].lstrip()
+        elif not roots:
+            is_node = True
+            base_indent = indent
+        elif indent <= base_indent:
+            # Another top-level plan pasted after the first one
+            is_node = "(cost=" in stripped or "(actual " in stripped
+
+        if is_node:
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            # Costs and timings follow the label after two spaces (one in some GUI copies)
+            cut = stripped.find("  (")
+            if cut < 0:
+                cut = stripped.find(" (cost=")
+            node = PlanNode(stripped if cut < 0 else stripped[:cut])
+            _normalize_label(node, node.label)
+            if cut >= 0:
+                _parse_estimates(node, stripped[cut:])
+            if stack:
+                parent = stack[-1][1]
+                node.parent = parent
+                node.depth = parent.depth + 1
+                parent.children.append(node)
+                if pending_label and pending_label[0] is parent:
+                    # Same naming as the JSON format, where CTEs are init plans
+                    kind = pending_label[1].split()[0]
+                    node.parent_relationship = "InitPlan" if kind == "CTE" else kind
+                    node.subplan_name = pending_label[1]
+                    pending_label = None
+            else:
+                roots.append(node)
+            nodes.append(node)
+            stack.append((indent, node))
+            planning = False
+            continue
+
+        # A property line belongs to the closest node indented less than it
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        key, _, value = stripped.partition(":")
+        value = value.strip()
+        if not stack:
+            if key == "Planning Time":
+                plan.planning_ms = float(value.split()[0])
+            elif key in ("Execution Time", "Total runtime"):
+                plan.execution_ms = float(value.split()[0])
+            elif key == "Planning":
+                planning = True
+            elif key == "Buffers" and planning:
+                _parse_buffers(value, plan.planning_buffers)
+            continue
+        node = stack[-1][1]
+        label = _SUBPLAN_LABEL.match(stripped)
+        if label and not value:
+            pending_label = (node, label.group(1))
+        elif key == "Buffers":
+            _parse_buffers(value, node.buffers)
+        elif key in node.details:
+            node.details[key] += "; " + value
+        else:
+            node.details[key] = value
+    if len(nodes) < 2 and not any(node.total_cost is not None or node.analyzed for node in nodes):
+        # Any first line parses as a node, so demand some sign that this really was a plan
+        raise ValueError("No plan nodes found: expected PostgreSQL EXPLAIN output")
+    return plan
+
+
+def parse_json(text):
+    """Parse JSON-format EXPLAIN output (FORMAT JSON)"""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = [data]
+    nodes = []
+    roots = []
+    plan = Plan(roots, nodes, "json")
+    for entry in data:
+        if not isinstance(entry, dict) or "Plan" not in entry:
+            raise ValueError("JSON plan has no \"Plan\" key")
+        if "Planning Time" in entry:
+            plan.planning_ms = (plan.planning_ms or 0.0) + entry["Planning Time"]
+        if "Execution Time" in entry:
+            plan.execution_ms = (plan.execution_ms or 0.0) + entry["Execution Time"]
+        for key, name in _JSON_BUFFERS.items():
+            if key in entry.get("Planning", {}):
+                plan.planning_buffers[name] = entry["Planning"][key]
+        # Depth-first with an explicit stack so very deep plans cannot hit the recursion limit
+        work = [(entry["Plan"], None)]
+        while work:
+            raw, parent = work.pop()
+            node = PlanNode(raw.get("Node Type", "Unknown"))
+            for key, value in raw.items():
+                if key in _JSON_FIELDS:
+                    setattr(node, _JSON_FIELDS[key], value)
+                elif key in _JSON_BUFFERS:
+                    if value:
+                        node.buffers[_JSON_BUFFERS[key]] = value
+                elif key not in ("Plans", "Node Type", "Workers", "Output"):
+                    node.details[key] = value if isinstance(value, str) else json.dumps(value)
+            node.label = _json_label(node, raw)
+            if raw.get("Actual Loops") == 0:
+                node.never_executed = True
+            if parent is None:
+                roots.append(node)
+            else:
+                node.parent = parent
+                node.depth = parent.depth + 1
+                parent.children.append(node)
+            nodes.append(node)
+            for child in reversed(raw.get("Plans", ())):
+                work.append((child, node))
+    if not roots:
+        raise ValueError("No plan nodes found: expected PostgreSQL EXPLAIN output")
+    return plan
+
+
+def _json_label(node, raw):
+    """Text-format style label, e.g. "Index Scan using idx on orders o\""""
+    label = node.node_type
+    if node.node_type == "Aggregate" and node.strategy in ("Hashed", "Sorted", "Mixed"):
+        label = {"Hashed": "HashAggregate", "Sorted": "GroupAggregate", "Mixed": "MixedAggregate"}[node.strategy]
+    elif node.node_type in _JOIN_TYPES and node.join_type not in (None, "Inner"):
+        label = f"{'Nested Loop' if node.node_type == 'Nested Loop' else node.node_type[:-5]} {node.join_type} Join"
+    elif node.node_type == "ModifyTable" and raw.get("Operation"):
+        label = raw["Operation"]
+    if node.scan_direction == "Backward":
+        label += " Backward"
+    if node.partial_mode and node.partial_mode != "Simple":
+        label = f"{node.partial_mode} {label}"
+    if node.parallel:
+        label = f"Parallel {label}"
+    if node.index and node.node_type != "Bitmap Index Scan":
+        label += f" using {node.index}"
+    target = node.relation or (node.index if node.node_type == "Bitmap Index Scan" else None)
+    if target:
+        label += f" on {target}"
+        if node.alias and node.alias != node.relation:
+            label += f" {node.alias}"
+    return label
+
+
+def parse_plan(text):
+    """Parse EXPLAIN output in text or JSON format"""
+    lines = _strip_psql(text.splitlines())
+    if lines and lines[0].lstrip().startswith(("[", "{")):
+        return parse_json("\n".join(lines))
+    return _parse_text_lines(lines)
+
+
+# Derived statistics
+
+def exclusive_times(plan):
+    """Per-node time excluding children (ms across all loops), keyed by node id; linear time"""
+    exclusive = {}
+    for node in plan.nodes:
+        exclusive[id(node)] = node.inclusive_ms
+    for node in plan.nodes:
+        if node.parent is not None and node.parent_relationship not in ("InitPlan",):
+            exclusive[id(node.parent)] -= node.inclusive_ms
+    return {key: max(value, 0.0) for key, value in exclusive.items()}
+
+
+def find_issues(plan):
+    """(severity, node, message) findings: large seq scans, misestimates, spills and wasted filtering"""
+    issues = []
+    for node in plan.nodes:
+        rows = node.total_actual_rows if node.analyzed else (node.plan_rows or 0) * (node.loops or 1)
+        removed = node.details.get("Rows Removed by Filter")
+        if node.node_type == "Seq Scan" and node.relation:
+            scanned = rows + (int(float(removed)) * (node.loops or 1) if removed else 0)
+            if scanned >= SEQ_SCAN_WARN_ROWS:
+                where = f" filtered by {node.details['Filter']}" if "Filter" in node.details else ""
+                issues.append(("warning", node, f"Sequential scan on {node.relation} reads ~{scanned:,.0f} rows{where}"))
+            else:
+                issues.append(("info", node, f"Sequential scan on {node.relation} (small: ~{scanned:,.0f} rows)"))
+        if node.analyzed and not node.never_executed and node.plan_rows:
+            estimated, actual = node.plan_rows, node.actual_rows or 0
+            if max(estimated, actual) >= MISESTIMATE_FACTOR * max(min(estimated, actual), 1) and max(estimated, actual) >= 100:
+                issues.append(("warning", node, f"{node.label}: estimated {estimated:,} rows but got {actual:,} "
+                                                f"per loop; run ANALYZE on the tables involved"))
+        sort_method = node.details.get("Sort Method", "")
+        if "external" in sort_method or "Disk" in sort_method:
+            issues.append(("warning", node, f"{node.label} spilled to disk ({sort_method}); raise work_mem "
+                                            "or add an index that provides the order"))
+        if node.node_type == "Nested Loop" and node.analyzed and node.children:
+            inner = node.children[-1]
+            if inner.loops and inner.loops >= 1000 and inner.node_type == "Seq Scan":
+                issues.append(("warning", inner, f"Sequential scan on {inner.relation} repeated {inner.loops:,} "
+                                                 "times inside a nested loop"))
+        if node.buffers.get("temp_written"):
+            issues.append(("info", node, f"{node.label} wrote {node.buffers['temp_written']:,} temp blocks"))
+    return issues
+
+
+def summarize(plan, slowest=5):
+    """Headline metrics of a plan for display"""
+    scans = [node for node in plan.nodes if node.relation and "Scan" in node.node_type]
+    index_scans = [node for node in scans if node.node_type in _INDEX_SCANS]
+    joins = Counter(node.node_type for node in plan.nodes if node.node_type in _JOIN_TYPES)
+    buffers = Counter()
+    for root in plan.roots:
+        # Buffer counts are cumulative, so the roots already include their children
+        buffers.update(root.buffers)
+    exclusive = exclusive_times(plan) if plan.analyzed else {}
+    return {
+        "format": plan.format,
+        "nodes": len(plan.nodes),
+        "depth": max(node.depth for node in plan.nodes) + 1,
+        "total_cost": plan.total_cost,
+        "estimated_rows": sum(root.plan_rows or 0 for root in plan.roots),
+        "actual_rows": sum(root.total_actual_rows for root in plan.roots) if plan.analyzed else None,
+        "execution_ms": plan.execution_ms if plan.execution_ms is not None else (
+            sum(root.inclusive_ms for root in plan.roots) if plan.analyzed else None),
+        "planning_ms": plan.planning_ms,
+        "joins": dict(joins),
+        "scans": len(scans),
+        "index_scans": len(index_scans),
+        "index_usage": len(index_scans) / len(scans) if scans else None,
+        "seq_scans": sum(1 for node in scans if node.node_type == "Seq Scan"),
+        "cache_hit_ratio": (buffers["shared_hit"] / (buffers["shared_hit"] + buffers["shared_read"])
+                            if buffers["shared_hit"] + buffers["shared_read"] else None),
+        "buffers": dict(buffers),
+        "slowest": [(node.label, exclusive[id(node)]) for node in
+                    sorted(plan.nodes, key=lambda n: -exclusive.get(id(n), 0.0))[:slowest]] if exclusive else [],
+    }
+
+
+_ICONS = {"Seq Scan": "🔍", "Index Scan": "📇", "Index Only Scan": "📇", "Bitmap Heap Scan": "📇",
+          "Bitmap Index Scan": "📇", "Hash": "📋", "Hash Join": "📊", "Merge Join": "📊", "Nested Loop": "🔄",
+          "Sort": "🔃", "Aggregate": "∑", "Limit": "✂️", "Gather": "🧵", "Gather Merge": "🧵"}
+
+
+def format_tree(plan, max_nodes=500):
+    """Indented tree of the plan, flagging large sequential scans; truncated after max_nodes"""
+    flagged = {id(node) for severity, node, _ in find_issues(plan) if severity == "warning"}
+    lines = []
+    work = [(root, "", True, True) for root in reversed(plan.roots)]
+    while work and len(lines) < max_nodes:
+        node, prefix, last, is_root = work.pop()
+        text = f"{_ICONS.get(node.node_type, '•')} {node.label}"
+        if node.total_cost is not None:
+            text += f" (cost={node.startup_cost:.2f}..{node.total_cost:.2f}"
+            text += f" rows={node.plan_rows:,})" if node.plan_rows is not None else ")"
+        if node.analyzed:
+            text += " (never executed)" if node.never_executed else \
+                f" [actual {node.actual_total_ms or 0:.2f} ms × {node.loops} rows={node.actual_rows:,}]"
+        if node.subplan_name:
+            text = f"{node.subplan_name}: {text}"
+        if id(node) in flagged:
+            text += " ⚠️"
+        elif node.node_type in _INDEX_SCANS:
+            text += " ✓"
+        lines.append(text if is_root else f"{prefix}{'└── ' if last else '├── '}{text}")
+        child_prefix = "" if is_root else prefix + ("    " if last else "│   ")
+        for i, child in enumerate(reversed(node.children)):
+            work.append((child, child_prefix, i == 0, False))
+    if len(plan.nodes) > len(lines):
+        lines.append(f"... {len(plan.nodes) - len(lines):,} more nodes")
+    return "\n".join(lines)
@@ -0,0 +1,32 @@
+"""Prompt templates shared by the app and the offline batch jobs."""
+
+
+def build_performance_prompt(sql_query):
+    """Build the performance analysis prompt for one query"""
+    return f"""You are a database performance expert. Analyze this SQL query for performance issues and optimization opportunities.
+
+SQL QUERY:
+```sql
+{sql_query}
+```
+
+Please provide:
+1. **Performance Issues Identified:**
+   - List specific bottlenecks
+   - Explain why each is problematic
+
+2. **Optimization Recommendations:**
+   - Specific improvements with expected impact
+   - Index recommendations
+   - Query rewrite suggestions
+
+3. **Optimized Version:**
+   - Provide an improved version of the query
+   - Explain the changes made
+
+4. **Expected Performance Improvement:**
+   - Estimate percentage improvement
+   - Key metrics that will improve
+
+Format your response clearly with sections and bullet points.
+"""
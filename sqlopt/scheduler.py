@@ -0,0 +1,317 @@
+"""Rate-limit-aware scheduling for Claude API calls.
+
+One AIScheduler is shared by every session in a Streamlit process. It paces
+requests with token buckets for requests-per-minute and tokens-per-minute,
+retries transient failures (429, 529, 5xx, connection errors) with jittered
+exponential backoff that honours ``retry-after``, and trips a circuit breaker
+after repeated failures so callers can switch to fallback responses at once
+instead of waiting on timeouts.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting calls"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Claude API circuit open; retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def status_code_of(exc):
+    """HTTP status code carried by an API exception, if any"""
+    return getattr(exc, "status_code", None)
+
+
+def default_is_retryable(exc):
+    """Whether a failed call is worth retrying"""
+    if status_code_of(exc) in RETRYABLE_STATUS_CODES:
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def retry_after_seconds(exc):
+    """Server-requested delay from a ``retry-after`` header, if present"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0 if per_minute else 0.0
+        self.capacity = burst or per_minute or 0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount tokens and return how long to wait before they are available"""
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, amount):
+        """Return unused tokens to the bucket"""
+        if not self.rate or amount <= 0:
+            return
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures → half-open trial after a cool-down"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        """Admit a call, or raise CircuitOpenError"""
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            raise CircuitOpenError(self.retry_in())
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class AIScheduler:
+    """Shared pacing, retry and circuit-breaking policy for all AI calls"""
+
+    def __init__(self, requests_per_minute=50, tokens_per_minute=80000, max_retries=4,
+                 base_delay=1.0, max_delay=30.0, failure_threshold=5, reset_timeout=30.0,
+                 is_retryable=default_is_retryable):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.is_retryable = is_retryable
+
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "succeeded": 0, "failed": 0, "retries": 0,
+                         "throttled": 0, "short_circuited": 0}
+        self.waits = deque(maxlen=1000)
+
+    def available(self):
+        """Whether calls are currently being admitted"""
+        return self.breaker.state != "open"
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _track_waiting(self, delta):
+        with self.lock:
+            self.waiting += delta
+
+    def _admit(self, tokens):
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self._count("short_circuited")
+            raise
+        return max(self.request_bucket.reserve(1), self.token_bucket.reserve(tokens))
+
+    def acquire(self, tokens):
+        """Block until a request of roughly `tokens` tokens may be sent"""
+        delay = self._admit(tokens)
+        self._track_waiting(1)
+        try:
+            if delay:
+                time.sleep(delay)
+        finally:
+            self._track_waiting(-1)
+        with self.lock:
+            self.waits.append(delay)
+            self.counters["requests"] += 1
+            self.in_flight += 1
+
+    async def acquire_async(self, tokens):
+        """Async variant of acquire"""
+        delay = self._admit(tokens)
+        self._track_waiting(1)
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self._track_waiting(-1)
+        with self.lock:
+            self.waits.append(delay)
+            self.counters["requests"] += 1
+            self.in_flight += 1
+
+    def record_success(self, reserved_tokens=0, response=None):
+        """Close the breaker and refund tokens the response did not use"""
+        self.breaker.record_success()
+        usage = getattr(response, "usage", response)
+        used = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+        if used and reserved_tokens:
+            self.token_bucket.refund(reserved_tokens - used)
+        with self.lock:
+            self.counters["succeeded"] += 1
+            self.in_flight -= 1
+
+    def record_failure(self, exc):
+        """Count a failed attempt; only transient failures count towards opening the breaker"""
+        if status_code_of(exc) in (429, 529):
+            self._count("throttled")
+        if self.is_retryable(exc):
+            self.breaker.record_failure()
+        else:
+            # The API answered (e.g. 400/401), so the service itself is reachable
+            self.breaker.record_success()
+        with self.lock:
+            self.counters["failed"] += 1
+            self.in_flight -= 1
+
+    def should_retry(self, exc, attempt):
+        return attempt < self.max_retries and self.is_retryable(exc) and self.available()
+
+    def retry_delay(self, attempt, exc=None):
+        """Full-jitter exponential backoff, never shorter than the server's retry-after"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after_seconds(exc) if exc is not None else None
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+    def backoff(self, attempt, exc=None):
+        """Sleep before retry number `attempt`"""
+        delay = self.retry_delay(attempt, exc)
+        self._count("retries")
+        self._track_waiting(1)
+        try:
+            time.sleep(delay)
+        finally:
+            self._track_waiting(-1)
+        with self.lock:
+            self.waits.append(delay)
+
+    async def backoff_async(self, attempt, exc=None):
+        """Async variant of backoff"""
+        delay = self.retry_delay(attempt, exc)
+        self._count("retries")
+        self._track_waiting(1)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._track_waiting(-1)
+        with self.lock:
+            self.waits.append(delay)
+
+    def call(self, fn, tokens):
+        """Run fn() under the rate limits, retrying transient failures"""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = fn()
+            except Exception as exc:
+                self.record_failure(exc)
+                if not self.should_retry(exc, attempt):
+                    raise
+                self.backoff(attempt, exc)
+                attempt += 1
+                continue
+            self.record_success(tokens, result)
+            return result
+
+    async def call_async(self, fn, tokens):
+        """Await fn() under the rate limits, retrying transient failures"""
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            try:
+                result = await fn()
+            except Exception as exc:
+                self.record_failure(exc)
+                if not self.should_retry(exc, attempt):
+                    raise
+                await self.backoff_async(attempt, exc)
+                attempt += 1
+                continue
+            self.record_success(tokens, result)
+            return result
+
+    def metrics(self):
+        """Queue depth, wait times, counters and breaker state"""
+        with self.lock:
+            waits = sorted(self.waits)
+            snapshot = dict(self.counters)
+            snapshot["queue_depth"] = self.waiting
+            snapshot["in_flight"] = self.in_flight
+        snapshot["avg_wait_s"] = sum(waits) / len(waits) if waits else 0.0
+        snapshot["p95_wait_s"] = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        snapshot["max_wait_s"] = waits[-1] if waits else 0.0
+        snapshot["circuit"] = self.breaker.state
+        snapshot["circuit_retry_in_s"] = self.breaker.retry_in()
+        return snapshot
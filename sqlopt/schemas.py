@@ -0,0 +1,16 @@
+"""Sample database schemas shared by the demo pages and the index simulator."""
+
+# Sample schemas for demo
+SCHEMAS = {
+    "E-commerce": {
+        "users": ["user_id", "username", "email", "created_at", "status"],
+        "orders": ["order_id", "user_id", "total_amount", "order_date", "status"],
+        "products": ["product_id", "name", "price", "category_id", "stock_quantity"],
+        "order_items": ["order_id", "product_id", "quantity", "unit_price"]
+    },
+    "HR System": {
+        "employees": ["employee_id", "first_name", "last_name", "department_id", "salary", "hire_date"],
+        "departments": ["department_id", "department_name", "manager_id"],
+        "projects": ["project_id", "project_name", "start_date", "end_date", "budget"]
+    }
+}
@@ -0,0 +1,349 @@
+"""Semantic near-duplicate cache for Natural Language to SQL answers.
+
+Questions are embedded (sentence-transformers when installed, otherwise a
+hashed bag-of-words fallback) and stored per schema in a NumPy-backed vector
+index. A new question whose cosine similarity to a cached one clears the
+threshold, and which mentions the same numbers, reuses the cached SQL.
+
+Each save writes the questions added since the previous one as a new chunk
+(``.npy`` vectors plus ``.jsonl`` entries, each renamed into place), so
+saving costs only the new rows and never rewrites what another process
+saved. Loading skips chunks whose vector and entry counts differ, and merges
+the chunks once there are more than ``COMPACT_AFTER_CHUNKS``.
+
+The index searches exactly with one matrix-vector product while small, and
+switches to an inverted-file (IVF) layout -- k-means centroids plus posting
+lists, probing only the closest few lists -- once it holds enough vectors
+for that to pay off.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_SEMANTIC_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sqlopt", "semantic")
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+COMPACT_AFTER_CHUNKS = 64
+
+_WORD = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+class HashingEmbedder:
+    """Dependency-free fallback: L2-normalised hashed unigrams and bigrams"""
+
+    name = "hashing"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Sentence embeddings from sentence-transformers (loaded on first use)"""
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def load_embedder(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Best available embedder: sentence-transformers if installed, else hashing"""
+    try:
+        return SentenceTransformerEmbedder(model_name)
+    except ImportError:
+        return HashingEmbedder()
+
+
+class VectorIndex:
+    """Append-only cosine-similarity index over unit vectors"""
+
+    def __init__(self, dim, dtype=np.float32, ivf_threshold=20000, nprobe=16):
+        self.dim = dim
+        self.dtype = dtype
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.vectors = np.zeros((1024, dim), dtype=dtype)
+        self.size = 0
+        self.centroids = None
+        self.lists = []
+        self.list_arrays = []
+        self.trained_size = 0
+
+    def add(self, vector):
+        """Append one unit vector and return its id"""
+        if self.size == len(self.vectors):
+            grown = np.zeros((len(self.vectors) * 2, self.dim), dtype=self.dtype)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size] = vector
+        vector_id = self.size
+        self.size += 1
+
+        if self.centroids is not None:
+            nearest = int(np.argmax(self.centroids @ np.asarray(vector, dtype=np.float32)))
+            self.lists[nearest].append(vector_id)
+            self.list_arrays[nearest] = None
+        if self.size >= self.ivf_threshold and self.size >= 2 * max(self.trained_size, self.ivf_threshold // 2):
+            self.train()
+        return vector_id
+
+    def extend(self, vectors):
+        """Append many unit vectors at once (used when loading a saved index)"""
+        vectors = np.asarray(vectors)
+        if self.centroids is not None or len(vectors) == 0:
+            for vector in vectors:
+                self.add(vector)
+            return
+        needed = self.size + len(vectors)
+        if needed > len(self.vectors):
+            grown = np.zeros((max(needed, len(self.vectors) * 2), self.dim), dtype=self.dtype)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:needed] = vectors
+        self.size = needed
+        if self.size >= self.ivf_threshold:
+            self.train()
+
+    def train(self, iterations=8, sample_size=20000, seed=0):
+        """(Re)build the IVF layout with spherical k-means on a sample"""
+        data = self.vectors[:self.size].astype(np.float32, copy=False)
+        nlist = max(1, int(np.sqrt(self.size)))
+        rng = np.random.default_rng(seed)
+        sample = data[rng.choice(self.size, size=min(sample_size, self.size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        assignment = np.empty(self.size, dtype=np.int64)
+        for start in range(0, self.size, 50000):
+            block = data[start:start + 50000]
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+
+        self.centroids = centroids
+        self.lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(nlist)]
+        self.list_arrays = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+        self.trained_size = self.size
+
+    def _candidates(self, query):
+        probes = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+        arrays = []
+        for probe in probes:
+            if self.list_arrays[probe] is None:
+                self.list_arrays[probe] = np.asarray(self.lists[probe], dtype=np.int64)
+            arrays.append(self.list_arrays[probe])
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+
+    def search(self, query, k=1, exact=False):
+        """Return up to k (id, cosine similarity) pairs, best first"""
+        if self.size == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        if self.centroids is None or exact:
+            ids = None
+            scores = self.vectors[:self.size].astype(np.float32, copy=False) @ query
+        else:
+            ids = self._candidates(query)
+            scores = self.vectors[ids].astype(np.float32, copy=False) @ query
+        if len(scores) == 0:
+            return []
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if ids is not None:
+            return [(int(ids[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+def schema_fingerprint(schema_info):
+    """Stable id for a schema description"""
+    return hashlib.sha256(schema_info.encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticCache:
+    """Per-schema embedding index of past questions and their SQL answers"""
+
+    def __init__(self, path=DEFAULT_SEMANTIC_CACHE_DIR, embedder=None, compact=False,
+                 ivf_threshold=20000, autosave_every=25):
+        self.path = path
+        self.embedder = embedder or load_embedder()
+        self.dtype = np.float16 if compact else np.float32
+        self.ivf_threshold = ivf_threshold
+        self.autosave_every = autosave_every
+        self.indexes = {}
+        self.entries = {}
+        self.unsaved = 0
+        self.saved = {}     # schema id -> rows already written to disk
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def _index(self, schema_id):
+        if schema_id not in self.indexes:
+            self.indexes[schema_id] = VectorIndex(self.embedder.dim, self.dtype, self.ivf_threshold)
+            self.entries[schema_id] = []
+        return self.indexes[schema_id]
+
+    def lookup(self, schema_info, question, threshold=0.85):
+        """Cached answer for a near-duplicate question, or None
+
+        Returns a dict with the cached ``question``, ``answer`` and ``score``.
+        """
+        schema_id = schema_fingerprint(schema_info)
+        query = self.embedder.encode([question])[0]
+        numbers = sorted(_NUMBER.findall(question))
+        with self.lock:
+            index = self.indexes.get(schema_id)
+            matches = index.search(query, k=5) if index is not None else []
+            for vector_id, score in matches:
+                if score < threshold:
+                    break
+                entry = self.entries[schema_id][vector_id]
+                # "top 5 ..." and "top 10 ..." embed closely but need different SQL
+                if entry["numbers"] != numbers:
+                    continue
+                self.hits += 1
+                return {"question": entry["question"], "answer": entry["answer"], "score": score}
+            self.misses += 1
+        return None
+
+    def add(self, schema_info, question, answer):
+        """Remember the answer to a question"""
+        schema_id = schema_fingerprint(schema_info)
+        vector = self.embedder.encode([question])[0]
+        with self.lock:
+            self._index(schema_id).add(vector)
+            self.entries[schema_id].append({
+                "question": question,
+                "answer": answer,
+                "numbers": sorted(_NUMBER.findall(question)),
+            })
+            self.unsaved += 1
+            if self.autosave_every and self.unsaved >= self.autosave_every:
+                self._save()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(index.size for index in self.indexes.values()),
+            "schemas": len(self.indexes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "embedder": self.embedder.name,
+        }
+
+    def _files(self, schema_id, chunk=""):
+        prefix = os.path.join(self.path, f"{self.embedder.name.replace('/', '_')}-{schema_id}")
+        if chunk:
+            prefix += f".{chunk}"
+        return prefix + ".npy", prefix + ".jsonl"
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        """Write the rows added since the last save as one new chunk per schema"""
+        os.makedirs(self.path, exist_ok=True)
+        chunk = f"{time.time_ns()}-{os.getpid()}"
+        for schema_id, index in self.indexes.items():
+            start = self.saved.get(schema_id, 0)
+            if index.size > start:
+                self._write_chunk(schema_id, chunk, index.vectors[start:index.size], self.entries[schema_id][start:])
+                self.saved[schema_id] = index.size
+        self.unsaved = 0
+
+    def _write_chunk(self, schema_id, chunk, vectors, entries):
+        # Entries are renamed into place first: a chunk is only read once its vectors exist too
+        vector_file, entry_file = self._files(schema_id, chunk)
+        temporary = f"{vector_file}.{os.getpid()}.tmp"
+        with open(temporary + ".jsonl", "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        np.save(temporary + ".npy", vectors)
+        os.replace(temporary + ".jsonl", entry_file)
+        os.replace(temporary + ".npy", vector_file)
+
+    def _read_chunk(self, schema_id, chunk):
+        """(vectors, entries) of a saved chunk, or None if it is incomplete or inconsistent"""
+        vector_file, entry_file = self._files(schema_id, chunk)
+        try:
+            vectors = np.load(vector_file)
+            with open(entry_file, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return None
+        if vectors.ndim != 2 or vectors.shape[1] != self.embedder.dim or len(vectors) != len(entries):
+            return None
+        return vectors, entries
+
+    def load(self):
+        if not os.path.isdir(self.path):
+            return
+        prefix = f"{self.embedder.name.replace('/', '_')}-"
+        chunks = {}
+        for name in sorted(os.listdir(self.path)):
+            if not (name.startswith(prefix) and name.endswith(".npy")) or ".tmp" in name:
+                continue
+            schema_id, _, chunk = name[len(prefix):-len(".npy")].partition(".")
+            chunks.setdefault(schema_id, []).append(chunk)
+        for schema_id, names in chunks.items():
+            vectors, entries = [], []
+            for chunk in names:
+                loaded = self._read_chunk(schema_id, chunk)
+                if loaded is not None:
+                    vectors.append(loaded[0])
+                    entries.extend(loaded[1])
+            if not vectors:
+                continue
+            vectors = np.concatenate(vectors)
+            if len(names) > COMPACT_AFTER_CHUNKS:
+                self._compact(schema_id, names, vectors, entries)
+            index = self._index(schema_id)
+            index.extend(vectors)
+            self.entries[schema_id] = entries
+            self.saved[schema_id] = index.size
+
+    def _compact(self, schema_id, names, vectors, entries):
+        """Replace many chunks with one; processes compacting the same chunks write the same file"""
+        merged = "merged-" + hashlib.sha256(" ".join(names).encode("utf-8")).hexdigest()[:16]
+        self._write_chunk(schema_id, merged, vectors, entries)
+        for chunk in names:
+            for path in self._files(schema_id, chunk):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,311 @@
+"""Streaming parsers for slow-query logs.
+
+Reads PostgreSQL logs (stderr/``log_min_duration_statement`` output or
+csvlog) and MySQL slow-query logs line by line, memory-mapping plain files
+and decompressing ``.gz`` files on the fly, and yields one ``SlowQuery``
+(timestamp, duration_ms, rows, statement) per logged statement. Memory use
+does not grow with the log: records can be rolled up into per-template
+statistics (see ``sqlopt.fingerprint``) as they stream past.
+
+Command line::
+
+    python -m sqlopt.slow_log /var/log/postgresql/postgresql.log --top 20
+    python -m sqlopt.slow_log mysql-slow.log.gz --order-by max_ms
+"""
+import argparse
+import csv
+import gzip
+import mmap
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlopt.fingerprint import WorkloadAggregator
+
+SlowQuery = namedtuple("SlowQuery", ["timestamp", "duration_ms", "rows", "statement"])
+
+FORMATS = {
+    "postgres": "PostgreSQL (stderr)",
+    "postgres_csv": "PostgreSQL (csvlog)",
+    "mysql": "MySQL slow log",
+}
+
+# Parse and bind steps of the extended protocol are logged separately; only execution counts
+_PG_DURATION = re.compile(r"duration: ([0-9.]+) ms\s+(?:statement|execute [^:]*):\s?(.*)", re.DOTALL)
+_PG_LEVELS = {"LOG", "ERROR", "WARNING", "NOTICE", "INFO", "FATAL", "PANIC", "DETAIL", "HINT",
+              "CONTEXT", "STATEMENT", "QUERY", "LOCATION", "DEBUG", "DEBUG1", "DEBUG2", "DEBUG3",
+              "DEBUG4", "DEBUG5"}
+_TIMESTAMP = re.compile(r"\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:\.\d+)?")
+_CSV_LINE = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?(?: [A-Z+\-0-9]+)?,")
+_MYSQL_QUERY_TIME = re.compile(r"# Query_time: ([0-9.]+)(?:.*?Rows_examined: (\d+))?")
+_MYSQL_SET_TIMESTAMP = re.compile(r"SET timestamp=(\d+);")
+_MYSQL_BANNER = re.compile(r"(?:\S+, Version: |Tcp port: |Time\s+Id\s+Command\s+Argument)")
+
+_EPOCH = datetime(1970, 1, 1)
+
+# csvlog column positions (unchanged since PostgreSQL 9.0)
+_CSV_LOG_TIME = 0
+_CSV_MESSAGE = 13
+
+
+@contextmanager
+def open_lines(source):
+    """Iterate the raw lines (bytes) of a path or binary file object, memory-mapped where possible"""
+    if hasattr(source, "read"):
+        if _is_gzip(source):
+            with gzip.GzipFile(fileobj=source) as f:
+                yield iter(f.readline, b"")
+        else:
+            yield iter(source.readline, b"")
+    elif source.endswith(".gz"):
+        with gzip.open(source, "rb") as f:
+            yield iter(f.readline, b"")
+    else:
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                yield iter(())
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                yield iter(mapped.readline, b"")
+
+
+def _is_gzip(source):
+    return str(getattr(source, "name", "")).endswith(".gz")
+
+
+def _decode(lines):
+    for line in lines:
+        yield line.decode("utf-8", errors="replace")
+
+
+def _parse_timestamp(text):
+    match = _TIMESTAMP.match(text)
+    if match is None:
+        return None
+    try:
+        return datetime.fromisoformat(match.group())
+    except ValueError:
+        return None
+
+
+def _head(source, size=65536):
+    if hasattr(source, "read"):
+        position = source.tell()
+        if _is_gzip(source):
+            head = gzip.GzipFile(fileobj=source).read(size)
+        else:
+            head = source.read(size)
+        source.seek(position)
+    elif source.endswith(".gz"):
+        with gzip.open(source, "rb") as f:
+            head = f.read(size)
+    else:
+        with open(source, "rb") as f:
+            head = f.read(size)
+    return head.decode("utf-8", errors="replace")
+
+
+def detect_format(source):
+    """Guess the log format from the first lines: one of FORMATS"""
+    head = _head(source)
+    if "# Query_time:" in head or "# Time:" in head or "# User@Host:" in head:
+        return "mysql"
+    if any(_CSV_LINE.match(line) for line in head.splitlines()[:20]):
+        return "postgres_csv"
+    return "postgres"
+
+
+def _pg_level_message(line):
+    """(level, message) of a line that starts a new PostgreSQL log entry, else None"""
+    end = line.find(":  ")
+    if end <= 0:
+        return None
+    start = line.rfind(" ", 0, end) + 1
+    if line[start:end] not in _PG_LEVELS:
+        return None
+    return line[start:end], line[end + 3:]
+
+
+def parse_postgres(lines):
+    """SlowQuery records from PostgreSQL stderr log lines"""
+    current = None
+    for line in lines:
+        entry = _pg_level_message(line)
+        if entry is None:
+            # Continuation of a multi-line statement
+            if current is not None:
+                current[2].append(line)
+            continue
+        if current is not None:
+            yield SlowQuery(current[0], current[1], None, "".join(current[2]).strip())
+            current = None
+        level, message = entry
+        if level == "LOG" and message.startswith("duration: "):
+            match = _PG_DURATION.match(message)
+            if match:
+                current = [_parse_timestamp(line), float(match.group(1)), [match.group(2)]]
+    if current is not None:
+        yield SlowQuery(current[0], current[1], None, "".join(current[2]).strip())
+
+
+def parse_postgres_csv(lines):
+    """SlowQuery records from PostgreSQL csvlog lines"""
+    for row in csv.reader(lines):
+        if len(row) <= _CSV_MESSAGE or not row[_CSV_MESSAGE].startswith("duration: "):
+            continue
+        match = _PG_DURATION.match(row[_CSV_MESSAGE])
+        if match:
+            yield SlowQuery(_parse_timestamp(row[_CSV_LOG_TIME]), float(match.group(1)), None,
+                            match.group(2).strip())
+
+
+def parse_mysql(lines):
+    """SlowQuery records from MySQL slow-query log lines; rows are Rows_examined"""
+    header = time_text = epoch = None
+    statement = []
+    for line in lines:
+        first = line[:1]
+        if first == "#":
+            if statement:
+                if header is not None:
+                    yield _mysql_record(header, epoch, time_text, statement)
+                    header = None
+                statement = []
+            if line.startswith("# Query_time: "):
+                match = _MYSQL_QUERY_TIME.match(line)
+                if match:
+                    rows = match.group(2)
+                    header = (float(match.group(1)) * 1000, int(rows) if rows is not None else None)
+                    epoch = None
+            elif line.startswith("# Time: "):
+                # Only written when the second changes, so it carries over to later entries
+                time_text = line[8:]
+            continue
+        if header is None:
+            continue
+        if not statement:
+            # Session bookkeeping logged ahead of the statement itself
+            if first == "S" and line.startswith("SET timestamp="):
+                match = _MYSQL_SET_TIMESTAMP.match(line)
+                if match:
+                    epoch = int(match.group(1))
+                continue
+            if first == "u" and line.startswith("use "):
+                continue
+        if _is_mysql_banner(line):
+            # A server restart banner ends the entry
+            if statement:
+                yield _mysql_record(header, epoch, time_text, statement)
+            header = None
+            statement = []
+            continue
+        statement.append(line)
+    if statement and header is not None:
+        yield _mysql_record(header, epoch, time_text, statement)
+
+
+def _is_mysql_banner(line):
+    return ("Version: " in line or line.startswith(("Tcp port: ", "Time "))) and _MYSQL_BANNER.match(line)
+
+
+def _mysql_record(header, epoch, time_text, statement):
+    if epoch is not None:
+        # SET timestamp is epoch seconds; kept naive UTC like the "# Time:" header
+        timestamp = _EPOCH + timedelta(seconds=epoch)
+    else:
+        timestamp = _parse_mysql_time(time_text.strip()) if time_text else None
+    return SlowQuery(timestamp, header[0], header[1], "".join(statement).strip())
+
+
+def _parse_mysql_time(text):
+    if text[:1].isdigit() and " " in text[:7]:
+        # MySQL 5.6 and older: "# Time: 240101 12:00:00"
+        try:
+            return datetime.strptime(text, "%y%m%d %H:%M:%S")
+        except ValueError:
+            return None
+    return _parse_timestamp(text)
+
+
+_PARSERS = {
+    "postgres": parse_postgres,
+    "postgres_csv": parse_postgres_csv,
+    "mysql": parse_mysql,
+}
+
+
+def parse_log(source, fmt="auto"):
+    """Stream SlowQuery records from a log file path or binary file object"""
+    if fmt == "auto":
+        fmt = detect_format(source)
+    if fmt not in _PARSERS:
+        raise ValueError(f"Unknown log format: {fmt}")
+    with open_lines(source) as lines:
+        for record in _PARSERS[fmt](_decode(lines)):
+            if record.statement:
+                yield record
+
+
+def summarize(records, aggregator=None):
+    """Roll records up into per-template statistics"""
+    aggregator = aggregator or WorkloadAggregator()
+    for record in records:
+        aggregator.add(record.statement, record.duration_ms, rows=record.rows)
+    return aggregator
+
+
+def log_files(directory):
+    """Names of the log files directly inside a directory, newest first"""
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+    except OSError:
+        return []
+    return [entry.name for entry in sorted(entries, key=lambda entry: -entry.stat().st_mtime)]
+
+
+def resolve_log_path(directory, name):
+    """Absolute path of a log file inside directory; raises ValueError for paths that leave it"""
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"{name} is not a file in the slow-log directory")
+    return path
+
+
+def summarize_log(source, fmt="auto"):
+    """Parse a whole log into per-template statistics without holding its records"""
+    return summarize(parse_log(source, fmt))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a slow-query log by query template")
+    parser.add_argument("path")
+    parser.add_argument("--format", default="auto", choices=["auto", *FORMATS])
+    parser.add_argument("--top", type=int, default=20, help="templates to show")
+    parser.add_argument("--order-by", default="total_ms", choices=["total_ms", "calls", "max_ms", "mean_ms", "rows"])
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.path) if args.format == "auto" else args.format
+    started = time.perf_counter()
+    summary = summarize_log(args.path, fmt)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'calls':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10} {'rows':>10}  template")
+    for template in summary.templates(args.order_by)[:args.top]:
+        print(f"{template.calls:>8} {template.total_ms:>12.1f} {template.mean_ms:>10.1f} "
+              f"{template.max_ms or 0:>10.1f} {template.rows:>10}  {template.template[:100]}")
+    megabytes = os.path.getsize(args.path) / (1024 * 1024)
+    print(f"\n{FORMATS[fmt]}: {summary.statements:,} statements, {len(summary):,} templates "
+          f"in {elapsed:.1f}s ({megabytes / max(elapsed, 1e-9):.0f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())